@@ -0,0 +1,169 @@
+"""
+JSON responses for job data: ETag/304 by content hash, gzip or brotli negotiated
+per request, and serialized bodies of finished jobs cached as bytes.
+"""
+
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from app.core.config import (
+    RESPONSE_BROTLI_QUALITY,
+    RESPONSE_CACHE_MAX_BYTES,
+    RESPONSE_COMPRESS_MIN_BYTES,
+    RESPONSE_GZIP_LEVEL,
+)
+from app.core.serialization import dumps
+from app.services.job_store import FINISHED_STATUSES
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+
+def negotiate_encoding(accept_encoding: str) -> str | None:
+    """Best supported coding in an Accept-Encoding header (brotli wins ties), or None for identity."""
+    accepted: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if coding.strip():
+            accepted[coding.strip().lower()] = q
+    best, best_q = None, 0.0
+    for coding in (["br"] if brotli is not None else []) + ["gzip"]:
+        q = accepted.get(coding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def _compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=RESPONSE_BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=RESPONSE_GZIP_LEVEL, mtime=0)
+
+
+class EncodedBody:
+    """A JSON body serialized on first use; each compressed variant is made once."""
+
+    def __init__(self, data: dict[str, Any]) -> None:
+        self._data: dict[str, Any] | None = data
+        self._variants: dict[str | None, bytes] = {}
+        self._etag: str | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        return sum(len(b) for b in self._variants.values())
+
+    @property
+    def etag(self) -> str:
+        """
+        Hash of the serialized body, so it changes with any field the client sees.
+        Weak: the identity, gzip and brotli variants share it.
+        """
+        with self._lock:
+            if self._etag is None:
+                self._etag = f'W/"{hashlib.blake2b(self._identity(), digest_size=12).hexdigest()}"'
+            return self._etag
+
+    def _identity(self) -> bytes:
+        identity = self._variants.get(None)
+        if identity is None:
+            identity = self._variants[None] = dumps(self._data)
+            self._data = None
+        return identity
+
+    def body(self, encoding: str | None) -> tuple[bytes, str | None]:
+        """The body in encoding (None = identity) and the coding actually applied."""
+        with self._lock:
+            identity = self._identity()
+            if encoding is None or len(identity) < RESPONSE_COMPRESS_MIN_BYTES:
+                return identity, None
+            encoded = self._variants.get(encoding)
+            if encoded is None:
+                encoded = self._variants[encoding] = _compress(identity, encoding)
+            return encoded, encoding
+
+
+class ResponseCache:
+    """LRU of encoded bodies, bounded by their total size including compressed variants."""
+
+    def __init__(self, max_bytes: int = RESPONSE_CACHE_MAX_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, EncodedBody]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> EncodedBody | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: Hashable, entry: EncodedBody) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+
+    def discard(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def trim(self) -> None:
+        """Evict least recently used entries until within max_bytes (variants grow entries after put)."""
+        with self._lock:
+            total = sum(e.size for e in self._entries.values())
+            while total > self.max_bytes and self._entries:
+                _, entry = self._entries.popitem(last=False)
+                total -= entry.size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def send(request: Request, entry: EncodedBody) -> Response:
+    """
+    Serve an encoded body: 304 if If-None-Match has its ETag (weak comparison),
+    else compressed as negotiated.
+    """
+    etag = entry.etag
+    headers = {"ETag": etag, "Vary": "Accept-Encoding"}
+    if_none_match = request.headers.get("if-none-match", "")
+    tags = (t.strip().removeprefix("W/") for t in if_none_match.split(","))
+    if if_none_match.strip() == "*" or etag.removeprefix("W/") in tags:
+        return Response(status_code=304, headers=headers)
+    content, encoding = entry.body(negotiate_encoding(request.headers.get("accept-encoding", "")))
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content, media_type="application/json", headers=headers)
+
+
+def job_response(request: Request, data: dict[str, Any], cache_key: Hashable | None = None) -> Response:
+    """
+    JSON response for job data tagged with its content hash. Finished jobs never
+    change, so with a cache_key their encoded bodies are kept in response_cache.
+    """
+    entry = EncodedBody(data)
+    if cache_key is None or data.get("status") not in FINISHED_STATUSES:
+        return send(request, entry)
+    response_cache.put(cache_key, entry)
+    response = send(request, entry)
+    response_cache.trim()
+    return response
+
+
+# Singleton instance shared across routes
+response_cache = ResponseCache()
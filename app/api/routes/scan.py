@@ -1,28 +1,173 @@
 """Scan API routes."""
 
-from fastapi import APIRouter, HTTPException
+import asyncio
+import time
+from typing import AsyncIterator, Literal
 
+from fastapi import APIRouter, Header, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
+
+from app.api.responses import job_response, response_cache, send
 from app.api.schemas import ScanRequest
+from app.core.config import SCAN_EVENTS_KEEPALIVE, SCAN_EVENTS_POLL_INTERVAL
+from app.core.serialization import dumps
+from app.services.job_queue import QueueFull
+from app.services.job_store import FINISHED_STATUSES
 from app.services.scan_service import scan_service
 
 router = APIRouter()
 
 
+def _cached(request: Request, key: tuple, job_id: str) -> Response | None:
+    """The cached response for key, unless the job has expired from the store since."""
+    cached = response_cache.get(key)
+    if cached is None:
+        return None
+    if not scan_service.exists(job_id):
+        response_cache.discard(key)
+        return None
+    return send(request, cached)
+
+
+def _sse(event: str, data: dict, event_id: int | None = None) -> str:
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {dumps(data).decode()}\n\n"
+
+
+async def _event_stream(request: Request, job_id: str, after: int | None) -> AsyncIterator[str]:
+    """
+    Server-Sent Events for one job. Without a resume id the stream opens with a
+    "snapshot" event (the status document); then it relays the job's event log and
+    ends after the final "status" event. Queued jobs also get unnumbered "queue"
+    events when their position changes.
+    """
+    yield "retry: 2000\n\n"
+    queue_position = None
+    if after is None:
+        job = await asyncio.to_thread(scan_service.get_status, job_id)
+        if job is None:
+            return
+        after = job.get("event_id", 0)
+        queue_position = job.get("queue_position")
+        yield _sse("snapshot", job, after)
+        if job.get("status") in FINISHED_STATUSES:
+            return
+    last_sent = time.monotonic()
+    while not await request.is_disconnected():
+        events = await asyncio.to_thread(scan_service.events, job_id, after)
+        for after, event, data in events:
+            yield _sse(event, data, after)
+            if event == "status" and data.get("status") in FINISHED_STATUSES:
+                return
+        if events:
+            last_sent = time.monotonic()
+            continue
+        job = await asyncio.to_thread(scan_service.get_status, job_id)
+        if job is None or (job.get("status") in FINISHED_STATUSES and job.get("event_id", 0) <= after):
+            return
+        if job.get("status") == "queued" and job.get("queue_position") != queue_position:
+            queue_position = job.get("queue_position")
+            yield _sse("queue", {k: job.get(k) for k in ("queue_position", "estimated_start")})
+            last_sent = time.monotonic()
+        elif time.monotonic() - last_sent > SCAN_EVENTS_KEEPALIVE:
+            yield ": keepalive\n\n"
+            last_sent = time.monotonic()
+        await asyncio.sleep(SCAN_EVENTS_POLL_INTERVAL)
+
+
 @router.post("", response_model=dict)
-def start_scan(request: ScanRequest) -> dict:
-    """Start a new security scan. Returns job_id for polling."""
+def start_scan(request: ScanRequest, x_tenant: str | None = Header(default=None)) -> dict:
+    """
+    Queue a new security scan for the X-Tenant tenant. Returns job_id for polling;
+    the job reports its queue position until it starts. 429 when the queue is full.
+    """
     if not request.servers:
         raise HTTPException(400, "At least one server required")
 
     servers = [s.model_dump() for s in request.servers]
-    job_id = scan_service.start_scan(servers, auto_mode=request.auto_mode)
+    try:
+        job_id = scan_service.start_scan(
+            servers,
+            auto_mode=request.auto_mode,
+            scan_options=request.scan_options(),
+            deadline=request.deadline_seconds,
+            priority=request.priority,
+            tenant=(x_tenant or "").strip() or "default",
+        )
+    except QueueFull as e:
+        raise HTTPException(429, str(e)) from e
     return {"job_id": job_id}
 
 
-@router.get("/{job_id}/status", response_model=dict)
-def get_scan_status(job_id: str) -> dict:
-    """Poll scan progress and results."""
-    data = scan_service.get_status(job_id)
+@router.get("/{job_id}/status", response_model=None)
+def get_scan_status(
+    job_id: str,
+    request: Request,
+    view: Literal["full", "compact"] = "full",
+    since: int | None = Query(default=None, ge=0),
+) -> Response:
+    """
+    Poll scan progress. Returns the whole job document; view=compact has only state,
+    progress, version and per-server and per-tool states, and with since=<version>
+    adds the results and live findings that changed after that version.
+    Responses carry an ETag (a matching If-None-Match returns 304) and are compressed
+    as the client accepts; finished jobs are served from a cache of encoded bodies.
+    """
+    if view == "full":
+        since = None
+    key = ("status", job_id, view, since)
+    cached = _cached(request, key, job_id)
+    if cached is not None:
+        return cached
+    data = scan_service.get_status(job_id) if view == "full" else scan_service.get_summary(job_id, since)
+    if not data:
+        raise HTTPException(404, "Job not found")
+    return job_response(request, data, key)
+
+
+@router.get("/{job_id}/results", response_model=None)
+def get_scan_results(
+    job_id: str,
+    request: Request,
+    section: Literal["servers", "network_scans"] = "servers",
+    offset: int = Query(default=0, ge=0),
+    limit: int = Query(default=50, ge=1, le=500),
+) -> Response:
+    """Page through full results ("servers" or "network_scans"), ordered by name."""
+    key = ("results", job_id, section, offset, limit)
+    cached = _cached(request, key, job_id)
+    if cached is not None:
+        return cached
+    data = scan_service.get_results(job_id, section, offset, limit)
+    if not data:
+        raise HTTPException(404, "Job not found")
+    return job_response(request, data, key)
+
+
+@router.get("/{job_id}/events")
+def stream_scan_events(
+    job_id: str,
+    request: Request,
+    last_event_id: int | None = Header(default=None),
+    after: int | None = None,
+) -> StreamingResponse:
+    """
+    Stream progress, per-server and per-tool completion, findings and status changes
+    as Server-Sent Events. Reconnects resume after the Last-Event-ID header (or ?after=).
+    """
+    if scan_service.get_status(job_id) is None:
+        raise HTTPException(404, "Job not found")
+    return StreamingResponse(
+        _event_stream(request, job_id, last_event_id if last_event_id is not None else after),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.delete("/{job_id}", response_model=dict)
+def cancel_scan(job_id: str) -> dict:
+    """Cancel a running scan. It stops shortly after with status "cancelled" and partial results."""
+    data = scan_service.cancel_scan(job_id)
     if not data:
         raise HTTPException(404, "Job not found")
-    return data
+    return {"job_id": job_id, "status": data.get("status")}
@@ -0,0 +1,25 @@
+"""External tool registry API routes."""
+
+from fastapi import APIRouter
+
+from app.scanner import process_stats, tool_registry
+
+router = APIRouter()
+
+
+@router.get("", response_model=dict)
+def list_tools() -> dict:
+    """Detected scan tools: availability, path, version and capabilities."""
+    return tool_registry.snapshot()
+
+
+@router.post("/refresh", response_model=dict)
+def refresh_tools() -> dict:
+    """Re-detect all scan tools now (e.g. after installing one)."""
+    return tool_registry.refresh()
+
+
+@router.get("/stats", response_model=dict)
+def tool_stats() -> dict:
+    """Per-tool process stats since startup: runs, failures, timeouts, wall time, peak output size."""
+    return process_stats.snapshot()
@@ -1,5 +1,5 @@
 """Pydantic schemas for API requests/responses."""
 
-from app.api.schemas.scan import ReportRequest, ScanRequest, ServerInput
+from app.api.schemas.scan import NucleiOptions, ReportRequest, ScanRequest, ServerInput
 
-__all__ = ["ReportRequest", "ScanRequest", "ServerInput"]
+__all__ = ["NucleiOptions", "ReportRequest", "ScanRequest", "ServerInput"]
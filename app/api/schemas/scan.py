@@ -1,6 +1,8 @@
 """Scan-related Pydantic schemas."""
 
-from pydantic import BaseModel
+from typing import Literal
+
+from pydantic import BaseModel, Field
 
 
 class ServerInput(BaseModel):
@@ -12,6 +14,15 @@ class ServerInput(BaseModel):
     key_base64: str
 
 
+class NucleiOptions(BaseModel):
+    """Nuclei tuning; unset fields use nuclei's defaults."""
+
+    severity: str = "critical,high,medium"
+    concurrency: int | None = Field(default=None, ge=1, le=500)
+    rate_limit: int | None = Field(default=None, ge=1, le=10000)
+    bulk_size: int | None = Field(default=None, ge=1, le=1000)
+
+
 class ScanRequest(BaseModel):
     """Request body for starting a scan."""
 
@@ -21,6 +32,38 @@ class ScanRequest(BaseModel):
     urls: list[str] | None = None
     subnet: str | None = None
     openvas_config: dict | None = None
+    max_parallel_servers: int | None = Field(default=None, ge=1, le=1024)
+    ssh_backend: Literal["paramiko", "asyncssh"] = "paramiko"
+    check_mode: Literal["sequential", "batch", "parallel"] | None = None
+    reuse_connections: bool = True
+    ssh_compression: bool | None = None
+    bulk_compression: bool | None = None
+    force: bool = False
+    nmap_profile: Literal["polite", "normal", "standard", "aggressive", "insane"] | None = None
+    preflight: bool = True
+    nuclei_options: NucleiOptions | None = None
+    # Cancel the job after this many seconds, keeping partial results (default SCAN_JOB_DEADLINE)
+    deadline_seconds: int | None = Field(default=None, ge=1)
+    # Queue priority: higher-priority jobs start first when run slots are busy
+    priority: Literal["high", "normal", "low"] = "normal"
+
+    def scan_options(self) -> dict:
+        """Per-job tuning options passed through to run_scan (unset ones use config defaults)."""
+        return self.model_dump(
+            include={
+                "max_parallel_servers",
+                "ssh_backend",
+                "check_mode",
+                "reuse_connections",
+                "ssh_compression",
+                "bulk_compression",
+                "force",
+                "nmap_profile",
+                "preflight",
+                "nuclei_options",
+            },
+            exclude_none=True,
+        )
 
 
 class ReportRequest(BaseModel):
@@ -1,5 +1,17 @@
 """Core configuration and utilities."""
 
-from app.core.config import REPORTS_DIR
+from app.core.config import (
+    REPORTS_DIR,
+    SCAN_GLOBAL_MAX_SERVERS,
+    SCAN_MAX_ASYNC_SERVERS,
+    SCAN_MAX_PARALLEL_SERVERS,
+    SCAN_PHASE_LIMITS,
+)
 
-__all__ = ["REPORTS_DIR"]
+__all__ = [
+    "REPORTS_DIR",
+    "SCAN_GLOBAL_MAX_SERVERS",
+    "SCAN_MAX_ASYNC_SERVERS",
+    "SCAN_MAX_PARALLEL_SERVERS",
+    "SCAN_PHASE_LIMITS",
+]
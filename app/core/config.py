@@ -1,7 +1,152 @@
 """Application configuration."""
 
+import os
 from pathlib import Path
 
 # Base paths
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 REPORTS_DIR = BASE_DIR / "reports"
+
+# Scan concurrency
+# Max servers scanned in parallel within one job (overridable per request)
+SCAN_MAX_PARALLEL_SERVERS = int(os.environ.get("SCAN_MAX_PARALLEL_SERVERS", "16"))
+# Default per-job limit when the asyncssh backend drives all hosts from one event loop
+SCAN_MAX_ASYNC_SERVERS = int(os.environ.get("SCAN_MAX_ASYNC_SERVERS", "256"))
+# Max servers scanned in parallel across all running jobs in this process
+SCAN_GLOBAL_MAX_SERVERS = int(os.environ.get("SCAN_GLOBAL_MAX_SERVERS", "64"))
+# Default per-job deadline in seconds after which the job is cancelled (0 = none)
+SCAN_JOB_DEADLINE = int(os.environ.get("SCAN_JOB_DEADLINE", "0"))
+# Job admission: jobs running at once, running jobs per tenant (X-Tenant header),
+# and jobs allowed to wait in the queue before new ones are rejected
+SCAN_MAX_RUNNING_JOBS = int(os.environ.get("SCAN_MAX_RUNNING_JOBS", "4"))
+SCAN_MAX_JOBS_PER_TENANT = int(os.environ.get("SCAN_MAX_JOBS_PER_TENANT", "2"))
+SCAN_QUEUE_MAX = int(os.environ.get("SCAN_QUEUE_MAX", "100"))
+# Job duration (seconds) assumed for queue start estimates until jobs have finished
+SCAN_QUEUE_DEFAULT_JOB_SECONDS = int(os.environ.get("SCAN_QUEUE_DEFAULT_JOB_SECONDS", "300"))
+
+# Where scans run: "inline" (threads of the API process) or "worker" (separate
+# `python -m app.worker` processes pulling from the shared SQLite queue in JOB_STORE_PATH)
+SCAN_EXECUTION = os.environ.get("SCAN_EXECUTION", "inline")
+# Worker: jobs run at once per worker process, seconds between queue polls
+WORKER_CONCURRENCY = int(os.environ.get("WORKER_CONCURRENCY", "2"))
+WORKER_POLL_INTERVAL = float(os.environ.get("WORKER_POLL_INTERVAL", "1.0"))
+# A claimed job is leased for this many seconds and renewed by heartbeats; a job whose
+# lease runs out (worker crashed) is re-queued, and failed after WORKER_MAX_ATTEMPTS claims
+WORKER_LEASE_SECONDS = int(os.environ.get("WORKER_LEASE_SECONDS", "60"))
+WORKER_HEARTBEAT_INTERVAL = float(os.environ.get("WORKER_HEARTBEAT_INTERVAL", "10"))
+WORKER_MAX_ATTEMPTS = int(os.environ.get("WORKER_MAX_ATTEMPTS", "3"))
+# Fernet key encrypting queued job parameters (they carry SSH keys). Empty: a key is
+# generated once into a 0600 file next to JOB_STORE_PATH and shared by workers on the host
+JOB_QUEUE_KEY = os.environ.get("JOB_QUEUE_KEY", "")
+
+# Job store: "sqlite" (shared by every worker process on this host) or "memory" (single process)
+JOB_STORE_BACKEND = os.environ.get("JOB_STORE_BACKEND", "sqlite")
+JOB_STORE_PATH = Path(os.environ.get("JOB_STORE_PATH", str(BASE_DIR / "data" / "jobs.db")))
+# Finished jobs are deleted this many seconds after they finish (0 = keep forever)
+JOB_STORE_TTL = int(os.environ.get("JOB_STORE_TTL", str(7 * 24 * 3600)))
+# Finished jobs kept decoded in memory per process (LRU)
+JOB_STORE_HOT_SIZE = int(os.environ.get("JOB_STORE_HOT_SIZE", "32"))
+# How often (seconds) a running job checks the store for a cancel request from another worker
+JOB_CANCEL_POLL_INTERVAL = float(os.environ.get("JOB_CANCEL_POLL_INTERVAL", "1.0"))
+# A running job's progress, findings and finished servers (document and events) are written
+# to the store at most once per this many seconds (coalesced); status changes are written at once
+JOB_STORE_FLUSH_INTERVAL = float(os.environ.get("JOB_STORE_FLUSH_INTERVAL", "0.5"))
+
+# Event stream (GET /api/scan/{job_id}/events): seconds between checks of the job's
+# event log, and between keepalive comments on an idle stream
+SCAN_EVENTS_POLL_INTERVAL = float(os.environ.get("SCAN_EVENTS_POLL_INTERVAL", "0.25"))
+SCAN_EVENTS_KEEPALIVE = float(os.environ.get("SCAN_EVENTS_KEEPALIVE", "15"))
+# "finding" events logged per job; later findings are only counted (live_findings_total)
+SCAN_FINDING_EVENTS_MAX = int(os.environ.get("SCAN_FINDING_EVENTS_MAX", "1000"))
+
+# API responses: gzip (or brotli, when installed and accepted) bodies of at least this many bytes
+RESPONSE_COMPRESS_MIN_BYTES = int(os.environ.get("RESPONSE_COMPRESS_MIN_BYTES", "1024"))
+RESPONSE_GZIP_LEVEL = int(os.environ.get("RESPONSE_GZIP_LEVEL", "6"))
+RESPONSE_BROTLI_QUALITY = int(os.environ.get("RESPONSE_BROTLI_QUALITY", "5"))
+# Serialized (and compressed) responses for finished jobs kept per process, total bytes (LRU)
+RESPONSE_CACHE_MAX_BYTES = int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Max concurrent SSH session channels per host connection (OpenSSH MaxSessions defaults to 10)
+SSH_MAX_CHANNELS_PER_HOST = int(os.environ.get("SSH_MAX_CHANNELS_PER_HOST", "8"))
+
+# Per-stream cap on captured remote command output (head + tail are kept)
+SSH_OUTPUT_MAX_BYTES = int(os.environ.get("SSH_OUTPUT_MAX_BYTES", str(256 * 1024)))
+# SSH transport compression (zlib) for new connections; helps over slow WAN links/bastions
+SSH_COMPRESSION = os.environ.get("SSH_COMPRESSION", "false").lower() in ("1", "true", "yes")
+# gzip large check outputs (CHECKS "bulk") on the remote host and decompress while streaming
+SSH_BULK_COMPRESSION = os.environ.get("SSH_BULK_COMPRESSION", "false").lower() in ("1", "true", "yes")
+# SSH keepalive interval in seconds (0 disables)
+SSH_KEEPALIVE_INTERVAL = int(os.environ.get("SSH_KEEPALIVE_INTERVAL", "30"))
+# Process-wide SSH connection pool reused across jobs (paramiko backend)
+SSH_POOL_MAX_SIZE = int(os.environ.get("SSH_POOL_MAX_SIZE", "128"))
+SSH_POOL_IDLE_TIMEOUT = int(os.environ.get("SSH_POOL_IDLE_TIMEOUT", "300"))
+
+# Built-in check execution: "sequential" (one exec per check), "batch" (one exec per host)
+# or "parallel" (one channel per check over a shared connection)
+SCAN_CHECK_MODE = os.environ.get("SCAN_CHECK_MODE", "batch")
+
+# Built-in check result cache: results are reused while the check's remote fingerprint
+# is unchanged and the entry is younger than the TTL in seconds (0 disables caching)
+SCAN_CHECK_CACHE_TTL = int(os.environ.get("SCAN_CHECK_CACHE_TTL", "3600"))
+SCAN_CHECK_CACHE_SIZE = int(os.environ.get("SCAN_CHECK_CACHE_SIZE", "4096"))
+
+# Reuse a Lynis report younger than this many seconds instead of re-running the audit (0 = always run)
+LYNIS_REPORT_MAX_AGE = int(os.environ.get("LYNIS_REPORT_MAX_AGE", "0"))
+
+# External tool registry: re-detect binaries/versions/capabilities after this many seconds
+TOOLS_REFRESH_TTL = int(os.environ.get("TOOLS_REFRESH_TTL", "600"))
+
+# Preflight TCP connect probe: per-connection timeout (seconds) and max concurrent connects
+PROBE_TIMEOUT = float(os.environ.get("PROBE_TIMEOUT", "2.0"))
+PROBE_CONCURRENCY = int(os.environ.get("PROBE_CONCURRENCY", "1000"))
+
+# Nmap: one run over all hosts; profile is a key of nmap.NMAP_PROFILES (timing + host-group parallelism).
+# "standard" keeps the original -T4 timing; "aggressive"/"insane" are opt-in
+NMAP_PROFILE = os.environ.get("NMAP_PROFILE", "standard")
+# Give up on a single host after this many seconds, and on the whole run after NMAP_TIMEOUT
+NMAP_HOST_TIMEOUT = int(os.environ.get("NMAP_HOST_TIMEOUT", "300"))
+NMAP_TIMEOUT = int(os.environ.get("NMAP_TIMEOUT", "3600"))
+
+# Nikto: concurrent nikto processes per job, and at most this many against one target host
+NIKTO_MAX_PARALLEL = int(os.environ.get("NIKTO_MAX_PARALLEL", "8"))
+NIKTO_MAX_PER_HOST = int(os.environ.get("NIKTO_MAX_PER_HOST", "2"))
+
+# ZMap: packets/s for the single multi-port sweep, and its overall timeout
+ZMAP_RATE = int(os.environ.get("ZMAP_RATE", "10000"))
+ZMAP_TIMEOUT = int(os.environ.get("ZMAP_TIMEOUT", "300"))
+# Responsive IPs kept per port in results (full counts are always reported)
+ZMAP_MAX_IPS_PER_PORT = int(os.environ.get("ZMAP_MAX_IPS_PER_PORT", "100"))
+# Unprivileged TCP connect-scan fallback when ZMap is missing or lacks raw sockets
+ZMAP_FALLBACK_RATE = float(os.environ.get("ZMAP_FALLBACK_RATE", "500"))
+ZMAP_FALLBACK_MAX_HOSTS = int(os.environ.get("ZMAP_FALLBACK_MAX_HOSTS", "4096"))
+
+# Nuclei: overall run timeout and structured findings kept per job (all are counted)
+NUCLEI_TIMEOUT = int(os.environ.get("NUCLEI_TIMEOUT", "600"))
+NUCLEI_MAX_FINDINGS = int(os.environ.get("NUCLEI_MAX_FINDINGS", "500"))
+
+# Vuls: concurrent `vuls scan` processes (one per server), per-server timeout, and
+# packages kept per server in the CVE summary (highest CVSS first)
+VULS_MAX_PARALLEL = int(os.environ.get("VULS_MAX_PARALLEL", "4"))
+VULS_TIMEOUT = int(os.environ.get("VULS_TIMEOUT", "600"))
+VULS_MAX_PACKAGES = int(os.environ.get("VULS_MAX_PACKAGES", "100"))
+
+# Local tool processes: bytes kept per stream (head + tail), rlimits (0 = unlimited)
+PROCESS_OUTPUT_MAX_BYTES = int(os.environ.get("PROCESS_OUTPUT_MAX_BYTES", str(256 * 1024)))
+PROCESS_CPU_LIMIT = int(os.environ.get("PROCESS_CPU_LIMIT", "0"))
+PROCESS_MEMORY_LIMIT_MB = int(os.environ.get("PROCESS_MEMORY_LIMIT_MB", "0"))
+# Max concurrent processes per tool across all jobs in this process
+PROCESS_TOOL_LIMITS = {
+    "nmap": int(os.environ.get("PROCESS_LIMIT_NMAP", "2")),
+    "nikto": int(os.environ.get("PROCESS_LIMIT_NIKTO", "16")),
+    "zmap": int(os.environ.get("PROCESS_LIMIT_ZMAP", "1")),
+    "nuclei": int(os.environ.get("PROCESS_LIMIT_NUCLEI", "2")),
+    "vuls": int(os.environ.get("PROCESS_LIMIT_VULS", "8")),
+    "default": int(os.environ.get("PROCESS_LIMIT_DEFAULT", "8")),
+}
+
+# Scan phase scheduler: max concurrent phases per resource class
+SCAN_PHASE_LIMITS = {
+    "cpu": int(os.environ.get("SCAN_PHASE_LIMIT_CPU", str(os.cpu_count() or 2))),
+    "network": int(os.environ.get("SCAN_PHASE_LIMIT_NETWORK", "4")),
+    "ssh": int(os.environ.get("SCAN_PHASE_LIMIT_SSH", "2")),
+}
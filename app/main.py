@@ -1,5 +1,7 @@
 """Server Security Scanner - FastAPI application."""
 
+import threading
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 from fastapi import FastAPI
@@ -7,11 +9,21 @@ from fastapi.responses import FileResponse
 from fastapi.staticfiles import StaticFiles
 
 from app.api.routes import api_router
+from app.scanner import tool_registry
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    """Detect external scan tools once at startup, off the request path."""
+    threading.Thread(target=tool_registry.refresh, daemon=True).start()
+    yield
+
 
 app = FastAPI(
     title="Server Security Scanner",
     version="2.0.0",
     description="Web-based security scanner with PDF reports",
+    lifespan=lifespan,
 )
 
 # Mount API routes first
@@ -20,6 +20,7 @@ def generate_pdf_report(scan_data: dict, output_path: str) -> None:
     network_scans = scan_data.get("network_scans", {})
     timestamp = scan_data.get("timestamp", "Unknown")
     error = scan_data.get("error")
+    cancelled = scan_data.get("cancel_reason") if scan_data.get("status") == "cancelled" else None
 
     # Compute pass/warn/fail summary from all checks
     summary = {"pass": 0, "warn": 0, "fail": 0}
@@ -40,6 +41,7 @@ def generate_pdf_report(scan_data: dict, output_path: str) -> None:
         timestamp=timestamp,
         server_count=len(servers),
         error=error,
+        cancelled=cancelled,
         summary=summary,
     )
 
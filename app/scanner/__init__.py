@@ -1,4 +1,21 @@
+from .async_executor import AsyncSSHExecutor
+from .cancel import CancelToken
 from .executor import SSHExecutor
 from .orchestrator import run_scan
+from .pool import SSHConnectionPool, ssh_pool
+from .process import process_stats, run_process, run_process_async
+from .tools import ToolRegistry, tool_registry
 
-__all__ = ["SSHExecutor", "run_scan"]
+__all__ = [
+    "AsyncSSHExecutor",
+    "CancelToken",
+    "SSHConnectionPool",
+    "SSHExecutor",
+    "ToolRegistry",
+    "process_stats",
+    "run_process",
+    "run_process_async",
+    "run_scan",
+    "ssh_pool",
+    "tool_registry",
+]
@@ -0,0 +1,233 @@
+"""Async SSH executor (asyncssh) for driving many hosts from one event loop."""
+
+import asyncio
+import time
+from typing import Callable, Optional
+
+from app.core.config import SSH_COMPRESSION, SSH_MAX_CHANNELS_PER_HOST
+
+from .output import (
+    ChunkCallback,
+    OutputBuffer,
+    StreamSink,
+    cancelled_result,
+    command_result,
+    gzip_wrap,
+    timeout_result,
+)
+
+try:
+    import asyncssh
+except ImportError:  # optional backend
+    asyncssh = None
+
+_RECV_CHUNK = 32768
+
+
+class AsyncSSHExecutor:
+    """
+    Execute commands on remote servers via asyncssh.
+    Same contract as SSHExecutor (connect/run/run_many/close, same result dict) but awaitable.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        user: str,
+        key_data: bytes,
+        port: int = 22,
+        timeout: int = 30,
+        max_channels: int = SSH_MAX_CHANNELS_PER_HOST,
+        compress: bool = SSH_COMPRESSION,
+    ):
+        self.host = host
+        self.user = user
+        self.key_data = key_data
+        self.port = port
+        self.timeout = timeout
+        self.max_channels = max(1, max_channels)
+        self.compress = compress
+        self._conn: Optional["asyncssh.SSHClientConnection"] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._aborted = False
+        self._connect_lock = asyncio.Lock()
+        self._channel_slots = asyncio.Semaphore(self.max_channels)
+
+    def _load_pkey(self):
+        """Load private key (RSA, Ed25519, ECDSA and other formats asyncssh understands)."""
+        key_str = self.key_data.decode("utf-8") if isinstance(self.key_data, bytes) else self.key_data
+        try:
+            return asyncssh.import_private_key(key_str)
+        except (asyncssh.KeyImportError, ValueError) as e:
+            raise ValueError(f"Could not load key: {e}") from e
+
+    async def connect(self) -> tuple[bool, str | None]:
+        """Establish SSH connection. Returns (success, error_message)."""
+        if asyncssh is None:
+            return False, "asyncssh not installed"
+        try:
+            pkey = self._load_pkey()
+        except Exception as e:
+            return False, f"Invalid key format: {e}"
+
+        self._loop = asyncio.get_running_loop()
+        try:
+            self._conn = await asyncio.wait_for(
+                asyncssh.connect(
+                    self.host,
+                    port=self.port,
+                    username=self.user,
+                    client_keys=[pkey],
+                    known_hosts=None,
+                    agent_path=None,
+                    compression_algs=["zlib@openssh.com", "zlib", "none"] if self.compress else ["none"],
+                ),
+                timeout=self.timeout,
+            )
+            return True, None
+        except asyncio.TimeoutError:
+            return False, f"Connection timed out after {self.timeout}s"
+        except Exception as e:
+            return False, str(e) or "Connection failed"
+
+    async def run(
+        self,
+        command: str,
+        timeout: int = 60,
+        max_bytes: Optional[int] = None,
+        on_chunk: Optional[ChunkCallback] = None,
+        compress_output: bool = False,
+    ) -> dict:
+        """
+        Run command on remote server.
+        Streams are drained while the command runs (see SSHExecutor.run).
+        Returns dict with: success, stdout, stderr, exit_code, error,
+        stdout_bytes, stderr_bytes, truncated, elapsed_ms (+ wire_bytes with compress_output)
+        """
+        if self._aborted:
+            return cancelled_result()
+        async with self._connect_lock:
+            if self._conn is None:
+                ok, err = await self.connect()
+                if not ok:
+                    return {
+                        "success": False,
+                        "stdout": "",
+                        "stderr": "",
+                        "exit_code": -1,
+                        "error": err or "Failed to connect",
+                    }
+
+        async with self._channel_slots:
+            start = time.monotonic()
+            r = await self._run_channel(command, timeout, max_bytes, on_chunk, compress_output)
+        if self._aborted:
+            r = cancelled_result()
+        r["elapsed_ms"] = int((time.monotonic() - start) * 1000)
+        return r
+
+    async def _run_channel(
+        self,
+        command: str,
+        timeout: int,
+        max_bytes: Optional[int],
+        on_chunk: Optional[ChunkCallback],
+        compress_output: bool = False,
+    ) -> dict:
+        """Run command on a new session channel of the connection."""
+        out = OutputBuffer(max_bytes)
+        err = OutputBuffer(max_bytes)
+        out_sink = StreamSink("stdout", out, on_chunk, gunzip=compress_output)
+        err_sink = StreamSink("stderr", err, on_chunk)
+
+        async def drain(reader, sink: StreamSink) -> None:
+            while True:
+                data = await reader.read(_RECV_CHUNK)
+                if not data:
+                    sink.close()
+                    return
+                sink.write(data)
+
+        process = None
+        try:
+            process = await self._conn.create_process(
+                gzip_wrap(command) if compress_output else command,
+                encoding=None,
+                stdin=asyncssh.DEVNULL,
+            )
+
+            async def collect() -> int:
+                await asyncio.gather(drain(process.stdout, out_sink), drain(process.stderr, err_sink))
+                await process.wait_closed()
+                return process.exit_status
+
+            exit_status = await asyncio.wait_for(collect(), timeout=timeout)
+            return command_result(exit_status if exit_status is not None else -1, out_sink, err_sink, compress_output)
+        except asyncio.TimeoutError:
+            return timeout_result(timeout, out, err)
+        except Exception as e:
+            return {
+                "success": False,
+                "stdout": "",
+                "stderr": "",
+                "exit_code": -1,
+                "error": str(e),
+            }
+        finally:
+            if process is not None:
+                process.close()
+
+    async def read_file(self, path: str, on_chunk: Callable[[bytes], None]) -> None:
+        """Stream a remote file over SFTP (see SSHExecutor.read_file). Raises on failure."""
+        if self._aborted:
+            raise ConnectionError("Cancelled")
+        async with self._connect_lock:
+            if self._conn is None:
+                ok, err = await self.connect()
+                if not ok:
+                    raise ConnectionError(err or "Failed to connect")
+        async with self._channel_slots:
+            async with self._conn.start_sftp_client() as sftp:
+                async with sftp.open(path, "rb", encoding=None) as f:
+                    while True:
+                        data = await f.read(_RECV_CHUNK)
+                        if not data:
+                            break
+                        on_chunk(data)
+
+    async def run_many(self, commands: list[tuple[str, int, bool]], max_bytes: Optional[int] = None) -> list[dict]:
+        """
+        Run (command, timeout, compress_output) tuples concurrently, at most
+        max_channels at a time. Results in input order.
+        """
+        return list(await asyncio.gather(*(
+            self.run(cmd, timeout=t, max_bytes=max_bytes, compress_output=gz) for cmd, t, gz in commands
+        )))
+
+    def abort(self) -> None:
+        """Thread-safe: drop the connection and fail in-flight and later run() calls (see SSHExecutor.abort)."""
+        self._aborted = True
+        if self._conn is not None and self._loop is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._conn.abort)
+            except RuntimeError:
+                # Event loop already closed
+                pass
+
+    async def close(self):
+        """Close SSH connection."""
+        if self._conn:
+            try:
+                self._conn.close()
+                await self._conn.wait_closed()
+            except Exception:
+                pass
+            self._conn = None
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
@@ -1,13 +1,28 @@
 """Built-in security checks run via SSH on each server."""
 
+import re
+import shlex
+import uuid
 from typing import Any
 
-from .executor import SSHExecutor
+from app.core.config import SSH_OUTPUT_MAX_BYTES
 
+from .async_executor import AsyncSSHExecutor
+from .cache import check_cache
+from .executor import SSHExecutor
+from .steps import Steps, drive, drive_async
+
+# "serial": True marks disk-heavy scanners; in batch mode they run one after another
+# (alongside the other checks) instead of all at once.
+# "bulk": True marks checks with large output, gzip-compressed in transit when bulk
+# compression is enabled.
+# "fingerprint" is a cheap command whose output changes whenever the check's result
+# may change; checks with one are served from check_cache while it is unchanged.
 CHECKS = {
     "ssh_config": {
         "command": "sshd -T 2>/dev/null || true",
         "timeout": 10,
+        "fingerprint": "cat /etc/ssh/sshd_config /etc/ssh/sshd_config.d/*.conf 2>/dev/null",
         "parse": lambda r: _parse_ssh_config(r),
     },
     "firewall": {
@@ -23,6 +38,8 @@ CHECKS = {
     "updates": {
         "command": "apt list --upgradable 2>/dev/null | tail -n +2 || (yum check-update 2>/dev/null | tail -n +2 || echo '')",
         "timeout": 60,
+        "bulk": True,
+        "fingerprint": "stat -c '%n %Y' /var/lib/dpkg/status /var/lib/apt/lists /var/cache/apt/pkgcache.bin /var/lib/rpm /var/cache/yum /var/cache/dnf 2>/dev/null",
         "parse": lambda r: _parse_updates(r),
     },
     "open_ports": {
@@ -43,16 +60,23 @@ CHECKS = {
     "clamav": {
         "command": "clamscan --version 2>/dev/null && clamscan -r /tmp --infected 2>/dev/null | tail -5 || echo 'CLAMAV_NOT_INSTALLED'",
         "timeout": 60,
+        "serial": True,
+        "fingerprint": "command -v clamscan; stat -c '%n %Y' /var/lib/clamav/* 2>/dev/null; find /tmp -xdev -mindepth 1 -printf '%p %T@ %s\\n' 2>/dev/null",
         "parse": lambda r: _parse_clamav(r),
     },
     "rkhunter": {
         "command": "rkhunter --version 2>/dev/null && rkhunter -c --skip-keypress 2>/dev/null | tail -50 || echo 'RKHUNTER_NOT_INSTALLED'",
         "timeout": 120,
+        "serial": True,
+        "bulk": True,
+        "fingerprint": "command -v rkhunter; stat -c '%n %Y' /var/lib/rkhunter/db/* /etc/rkhunter.conf 2>/dev/null; stat -c '%n %Y' /bin /sbin /usr/bin /usr/sbin /usr/local/bin /usr/local/sbin /etc/passwd /etc/shadow 2>/dev/null",
         "parse": lambda r: _parse_rkhunter(r),
     },
     "chkrootkit": {
         "command": "chkrootkit -V 2>/dev/null && chkrootkit 2>/dev/null | tail -30 || echo 'CHKROOTKIT_NOT_INSTALLED'",
         "timeout": 120,
+        "serial": True,
+        "fingerprint": "command -v chkrootkit; stat -c '%n %Y' /bin /sbin /usr/bin /usr/sbin /usr/local/bin /usr/local/sbin /etc/passwd /etc/shadow 2>/dev/null",
         "parse": lambda r: _parse_chkrootkit(r),
     },
     "auditd": {
@@ -68,11 +92,13 @@ CHECKS = {
     "unattended_upgrades": {
         "command": "(dpkg -l unattended-upgrades 2>/dev/null | grep -q ^ii && cat /etc/apt/apt.conf.d/50unattended-upgrades 2>/dev/null) || echo 'UNATTENDED_UPGRADES_NOT_INSTALLED'",
         "timeout": 10,
+        "fingerprint": "stat -c '%n %Y' /var/lib/dpkg/status /etc/apt/apt.conf.d 2>/dev/null; cat /etc/apt/apt.conf.d/50unattended-upgrades 2>/dev/null",
         "parse": lambda r: _parse_unattended_upgrades(r),
     },
     "sudo_users": {
         "command": "getent group sudo 2>/dev/null || grep -E '^sudo:' /etc/group 2>/dev/null || echo 'N/A'",
         "timeout": 10,
+        "fingerprint": "cat /etc/group 2>/dev/null",
         "parse": lambda r: _parse_sudo_users(r),
     },
     "ssl_cert": {
@@ -147,7 +173,24 @@ def _parse_open_ports(r: dict) -> dict:
     out = r.get("stdout", "")
     lines = [l.strip() for l in out.split("\n") if l.strip()]
     fixes = ["Review open ports and close unnecessary services", "Use firewall to restrict access to required ports only"]
-    return {"status": "info", "ports": lines, "raw": out, "fixes": fixes}
+    # Neither ss nor netstat ran: the ports are unknown, not closed
+    listening = None if not lines or lines == ["N/A"] else _listening_ports(lines)
+    return {"status": "info", "ports": lines, "listening": listening, "raw": out, "fixes": fixes}
+
+
+def _listening_ports(lines: list[str]) -> list[int]:
+    """TCP ports bound to a non-loopback address in ss/netstat -tln output."""
+    ports = set()
+    for line in lines:
+        # Local address is the first host:port column (0.0.0.0:22, [::]:80, *:443)
+        local = next((t for t in line.split() if re.fullmatch(r"\S*:\d+", t)), None)
+        if local is None:
+            continue
+        addr, port = local.rsplit(":", 1)
+        if addr.strip("[]").startswith(("127.", "::1")) or addr.strip("[]") == "localhost":
+            continue
+        ports.add(int(port))
+    return sorted(ports)
 
 
 def _parse_disk(r: dict) -> dict:
@@ -257,19 +300,224 @@ def _parse_ssl_cert(r: dict) -> dict:
     return {"status": status, "message": "SSL cert info", "raw_preview": out[:400]}
 
 
-def run_builtin_checks(
-    executor: SSHExecutor, tests: list[str]
-) -> dict[str, Any]:
-    """Run selected built-in checks and return results."""
-    results = {}
-    for name in tests:
-        if name not in CHECKS:
-            continue
+CHECK_MODES = ("sequential", "batch", "parallel")
+
+# Slack on top of the longest remote check timeout for the whole batch exec
+_BATCH_TIMEOUT_SLACK = 15
+# Timeout for the single exec computing all check fingerprints on a host
+_FINGERPRINT_TIMEOUT = 20
+
+_BATCH_PRELUDE = """d=$(mktemp -d 2>/dev/null || (mkdir -p /tmp/sss.$$ && echo /tmp/sss.$$))
+trap 'rm -rf "$d"' EXIT
+_now() { t=$(date +%s%N 2>/dev/null); case "$t" in *N|'') echo $(( $(date +%s) * 1000000000 ));; *) echo "$t";; esac; }
+_run() {
+  s=$(_now)
+  if command -v timeout >/dev/null 2>&1; then
+    timeout "$2" sh -c "$3" >"$d/$1.out" 2>"$d/$1.err" </dev/null
+  else
+    sh -c "$3" >"$d/$1.out" 2>"$d/$1.err" </dev/null
+  fi
+  echo $? >"$d/$1.rc"
+  e=$(_now)
+  echo $(( (e - s) / 1000000 )) >"$d/$1.ms"
+}
+"""
+
+
+def _build_batch_script(names: list[str], marker: str) -> str:
+    """
+    Build one remote sh script running checks `names` and framing each result:
+      <marker> BEGIN name / stdout / <marker> STDERR name / stderr / <marker> END name rc elapsed_ms
+    Non-serial checks run concurrently; serial checks run in one background chain.
+    """
+    lines = [_BATCH_PRELUDE]
+    serial = []
+    for name in names:
         cfg = CHECKS[name]
-        r = executor.run(cfg["command"], timeout=cfg["timeout"])
-        if r.get("error"):
-            results[name] = {"status": "error", "error": r["error"]}
+        call = f"_run {name} {int(cfg['timeout'])} {shlex.quote(cfg['command'])}"
+        if cfg.get("serial"):
+            serial.append(call)
         else:
-            results[name] = cfg["parse"](r)
-            results[name]["success"] = r.get("success", False)
-    return results
+            lines.append(f"{call} &")
+    if serial:
+        lines.append("( " + "; ".join(serial) + " ) &")
+    lines.append("wait")
+    for name in names:
+        lines.append(
+            f"printf '%s BEGIN {name}\\n' {marker}; cat \"$d/{name}.out\"; "
+            f"printf '\\n%s STDERR {name}\\n' {marker}; cat \"$d/{name}.err\"; "
+            f"printf '\\n%s END {name} %s %s\\n' {marker} \"$(cat \"$d/{name}.rc\")\" \"$(cat \"$d/{name}.ms\")\""
+        )
+    # Run under sh explicitly; the login shell may not be POSIX
+    return "sh -c " + shlex.quote("\n".join(lines) + "\n")
+
+
+def _batch_timeout(names: list[str]) -> int:
+    """Overall exec timeout: the slower of the parallel checks and the serial chain."""
+    parallel = [CHECKS[n]["timeout"] for n in names if not CHECKS[n].get("serial")]
+    serial = sum(CHECKS[n]["timeout"] for n in names if CHECKS[n].get("serial"))
+    return max(parallel + [serial]) + _BATCH_TIMEOUT_SLACK
+
+
+def _split_batch_output(out: str, marker: str) -> dict[str, dict]:
+    """Split framed batch output into per-check executor-style result dicts."""
+    m = re.escape(marker)
+    pattern = re.compile(
+        rf"{m} BEGIN (\w+)\n(.*?)\n{m} STDERR \1\n(.*?)\n{m} END \1 (-?\d*) (\d*)\n",
+        re.DOTALL,
+    )
+    parsed = {}
+    for name, stdout, stderr, rc, ms in pattern.findall(out):
+        exit_code = int(rc) if rc else -1
+        r = {
+            "success": exit_code == 0,
+            "stdout": stdout,
+            "stderr": stderr,
+            "exit_code": exit_code,
+            "error": None,
+            "elapsed_ms": int(ms) if ms else None,
+        }
+        # coreutils timeout exits 124 when the check exceeded its CHECKS timeout
+        if exit_code == 124:
+            r["error"] = f"Command timed out after {CHECKS[name]['timeout']}s"
+        parsed[name] = r
+    return parsed
+
+
+def _slowest_first(names: list[str]) -> list[str]:
+    """Order checks by timeout, longest first, so slow scanners start before cheap checks."""
+    return sorted(names, key=lambda n: CHECKS[n]["timeout"], reverse=True)
+
+
+def _compress(name: str, bulk_compression: bool) -> bool:
+    return bulk_compression and bool(CHECKS[name].get("bulk"))
+
+
+def _check_result(name: str, r: dict) -> dict[str, Any]:
+    """Turn a raw executor result for check `name` into its parsed result."""
+    if r.get("cancelled"):
+        return {"status": "cancelled", "error": r["error"]}
+    if r.get("error"):
+        return {"status": "error", "error": r["error"]}
+    result = CHECKS[name]["parse"](r)
+    result["success"] = r.get("success", False)
+    if r.get("truncated"):
+        result["truncated"] = True
+    return result
+
+
+def _build_fingerprint_script(names: list[str], marker: str) -> str:
+    """One remote sh script printing "<marker> name <cksum> <size>" per check fingerprint."""
+    lines = [
+        f"printf '%s {name} ' {marker}; ( {CHECKS[name]['fingerprint']} ) 2>/dev/null </dev/null | cksum"
+        for name in names
+    ]
+    return "sh -c " + shlex.quote("\n".join(lines) + "\n")
+
+
+def _parse_fingerprints(out: str, marker: str) -> dict[str, str]:
+    return dict(re.findall(rf"^{re.escape(marker)} (\w+) (\d+ \d+)$", out, re.MULTILINE))
+
+
+def _fingerprint_names(names: list[str]) -> list[str]:
+    if check_cache.ttl <= 0:
+        return []
+    return [n for n in names if CHECKS[n].get("fingerprint")]
+
+
+def _cache_key(executor: SSHExecutor | AsyncSSHExecutor, name: str) -> tuple[str, int, str, str]:
+    return (executor.host, executor.port, executor.user, name)
+
+
+def _cached_results(executor: SSHExecutor | AsyncSSHExecutor, fingerprints: dict[str, str]) -> dict[str, Any]:
+    """Cache hits among the fingerprinted checks."""
+    hits = {}
+    for name, fp in fingerprints.items():
+        cached = check_cache.get(_cache_key(executor, name), fp)
+        if cached is not None:
+            hits[name] = cached
+    return hits
+
+
+def _store_result(executor: SSHExecutor | AsyncSSHExecutor, name: str, fingerprints: dict[str, str], result: dict, r: dict) -> None:
+    # Only checks whose command ran to completion are cached
+    if name in fingerprints and not r.get("error") and not r.get("cancelled"):
+        check_cache.put(_cache_key(executor, name), fingerprints[name], result, r.get("elapsed_ms"))
+
+
+def _check_steps(
+    executor: SSHExecutor | AsyncSSHExecutor,
+    tests: list[str],
+    mode: str,
+    bulk_compression: bool,
+    force: bool,
+) -> Steps:
+    """The plan shared by run_builtin_checks and run_builtin_checks_async (see steps.drive)."""
+    names = [name for name in tests if name in CHECKS]
+    fingerprints: dict[str, str] = {}
+    fp_names = _fingerprint_names(names)
+    if fp_names:
+        marker = f"__SSS_{uuid.uuid4().hex}__"
+        r = yield lambda: executor.run(_build_fingerprint_script(fp_names, marker), timeout=_FINGERPRINT_TIMEOUT)
+        fingerprints = _parse_fingerprints(r.get("stdout", ""), marker)
+    results = {} if force else _cached_results(executor, fingerprints)
+    names = [name for name in names if name not in results]
+
+    raw: dict[str, dict] = {}
+    if mode == "batch" and names:
+        marker = f"__SSS_{uuid.uuid4().hex}__"
+        r = yield lambda: executor.run(
+            _build_batch_script(names, marker),
+            timeout=_batch_timeout(names),
+            max_bytes=SSH_OUTPUT_MAX_BYTES * len(names),
+            compress_output=bulk_compression,
+        )
+        raw = _split_batch_output(r.get("stdout", ""), marker)
+    elif mode == "parallel":
+        ordered = _slowest_first(names)
+        commands = [(CHECKS[n]["command"], CHECKS[n]["timeout"], _compress(n, bulk_compression)) for n in ordered]
+        raw = dict(zip(ordered, (yield lambda: executor.run_many(commands, max_bytes=SSH_OUTPUT_MAX_BYTES))))
+
+    for name in names:
+        if name not in raw:
+            cfg = CHECKS[name]
+            raw[name] = yield lambda: executor.run(
+                cfg["command"],
+                timeout=cfg["timeout"],
+                max_bytes=SSH_OUTPUT_MAX_BYTES,
+                compress_output=_compress(name, bulk_compression),
+            )
+        results[name] = _check_result(name, raw[name])
+        _store_result(executor, name, fingerprints, results[name], raw[name])
+    return {name: results[name] for name in tests if name in results}
+
+
+def run_builtin_checks(
+    executor: SSHExecutor,
+    tests: list[str],
+    mode: str = "sequential",
+    bulk_compression: bool = False,
+    force: bool = False,
+) -> dict[str, Any]:
+    """
+    Run selected built-in checks and return results.
+    mode: "sequential" (one exec per check), "batch" (one exec for all checks;
+    checks missing from the batch output fall back to sequential) or "parallel"
+    (concurrent channels over the executor's connection, slowest checks first).
+    bulk_compression gzips "bulk" checks (or the whole batch) in transit.
+    Checks with a "fingerprint" reuse a cached result while the remote fingerprint is
+    unchanged (one extra exec per host); force re-runs them and refreshes the cache.
+    Cached results carry cached, cached_at and saved_seconds.
+    """
+    return drive(_check_steps(executor, tests, mode, bulk_compression, force))
+
+
+async def run_builtin_checks_async(
+    executor: AsyncSSHExecutor,
+    tests: list[str],
+    mode: str = "sequential",
+    bulk_compression: bool = False,
+    force: bool = False,
+) -> dict[str, Any]:
+    """Async variant of run_builtin_checks for AsyncSSHExecutor."""
+    return await drive_async(_check_steps(executor, tests, mode, bulk_compression, force))
@@ -0,0 +1,78 @@
+"""Per-host cache of built-in check results, validated by a cheap remote fingerprint."""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any
+
+from app.core.config import SCAN_CHECK_CACHE_SIZE, SCAN_CHECK_CACHE_TTL
+
+CacheKey = tuple[str, int, str, str]
+# Results of checks that did not finish; never served from the cache
+_UNFINISHED_STATUSES = ("error", "cancelled")
+
+
+class CheckResultCache:
+    """
+    Parsed check results keyed by (host, port, user, check). An entry is reused only
+    while its fingerprint matches the host's current one and it is younger than ttl
+    seconds; the least recently used entries are dropped beyond max_entries.
+    """
+
+    def __init__(self, ttl: int = SCAN_CHECK_CACHE_TTL, max_entries: int = SCAN_CHECK_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max(0, max_entries)
+        # key -> (fingerprint, result, stored_at monotonic, stored_at iso, elapsed_ms)
+        self._entries: "OrderedDict[CacheKey, tuple[str, dict, float, str, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: CacheKey, fingerprint: str) -> dict[str, Any] | None:
+        """Cached result marked with cached/cached_at/saved_seconds, or None on a miss."""
+        if self.ttl <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            fp, result, stored, stored_iso, elapsed_ms = entry
+            if fp != fingerprint or time.monotonic() - stored > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        return {**result, "cached": True, "cached_at": stored_iso, "saved_seconds": round(elapsed_ms / 1000, 3)}
+
+    def put(self, key: CacheKey, fingerprint: str, result: dict[str, Any], elapsed_ms: int | None) -> None:
+        """Store a freshly computed result (errors and cancelled checks are never cached)."""
+        if self.ttl <= 0 or self.max_entries == 0:
+            return
+        if result.get("status") in _UNFINISHED_STATUSES or result.get("cancelled"):
+            return
+        with self._lock:
+            self._entries[key] = (
+                fingerprint, dict(result), time.monotonic(), datetime.utcnow().isoformat(), elapsed_ms or 0,
+            )
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def cache_summary(checks: dict[str, dict]) -> dict[str, Any]:
+    """Per-server cache stats: hits, misses (checks run) and total seconds saved."""
+    hits = [c for c in checks.values() if c.get("cached")]
+    return {
+        "hits": len(hits),
+        "misses": len(checks) - len(hits),
+        "saved_seconds": round(sum(c.get("saved_seconds", 0) for c in hits), 3),
+    }
+
+
+# Singleton cache shared by all scan jobs in this process
+check_cache = CheckResultCache()
@@ -0,0 +1,70 @@
+"""Cooperative cancellation of scan jobs."""
+
+import threading
+from typing import Callable, Optional
+
+
+class CancelToken:
+    """
+    Cancellation flag shared by everything working on one scan job.
+    Work checks `cancelled` before starting a step; blocking I/O registers an
+    on_cancel() callback that aborts it (close SSH connections, kill tool
+    process groups). With deadline (seconds) the token cancels itself.
+    """
+
+    def __init__(self, deadline: Optional[float] = None) -> None:
+        self.reason: Optional[str] = None
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: dict[int, Callable[[], None]] = {}
+        self._next_handle = 0
+        self._timer: Optional[threading.Timer] = None
+        if deadline:
+            self._timer = threading.Timer(deadline, self.cancel, args=(f"Deadline of {deadline:g}s exceeded",))
+            self._timer.daemon = True
+            self._timer.start()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "Cancelled by user") -> bool:
+        """Cancel and run every registered callback. Returns False if already cancelled."""
+        with self._lock:
+            if self._event.is_set():
+                return False
+            self.reason = reason
+            self._event.set()
+            callbacks = list(self._callbacks.values())
+            self._callbacks.clear()
+        if self._timer is not None:
+            self._timer.cancel()
+        for fn in callbacks:
+            try:
+                fn()
+            except Exception:
+                pass
+        return True
+
+    def on_cancel(self, fn: Callable[[], None]) -> Optional[int]:
+        """
+        Call fn (from the cancelling thread) when the token is cancelled. Runs fn
+        right away if it already is. Returns a handle for remove().
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._next_handle += 1
+                self._callbacks[self._next_handle] = fn
+                return self._next_handle
+        fn()
+        return None
+
+    def remove(self, handle: Optional[int]) -> None:
+        if handle is not None:
+            with self._lock:
+                self._callbacks.pop(handle, None)
+
+    def close(self) -> None:
+        """Stop the deadline timer (job finished)."""
+        if self._timer is not None:
+            self._timer.cancel()
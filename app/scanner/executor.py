@@ -1,13 +1,50 @@
 """SSH executor for running commands on remote servers."""
 
+import hashlib
 import io
-from typing import Optional
+import socket
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
 
 import paramiko
 
+from app.core.config import SSH_COMPRESSION, SSH_KEEPALIVE_INTERVAL, SSH_MAX_CHANNELS_PER_HOST
+
+from .output import (
+    ChunkCallback,
+    OutputBuffer,
+    StreamSink,
+    cancelled_result,
+    command_result,
+    gzip_wrap,
+    timeout_result,
+)
+
+_RECV_CHUNK = 32768
+# How long a blocking recv waits before re-checking stderr and the deadline
+_POLL_INTERVAL = 0.1
+
+# Parsed private keys by key_digest(), so repeated scans skip trying each key class
+_PKEY_CACHE_SIZE = 256
+_pkey_cache: "OrderedDict[str, paramiko.PKey]" = OrderedDict()
+_pkey_cache_lock = threading.Lock()
+
+
+def key_digest(key_data: bytes | str) -> str:
+    """Stable fingerprint of private key material (sha256 of the raw bytes)."""
+    raw = key_data.encode("utf-8") if isinstance(key_data, str) else key_data
+    return hashlib.sha256(raw).hexdigest()
+
 
 class SSHExecutor:
-    """Execute commands on remote servers via SSH."""
+    """
+    Execute commands on remote servers via SSH.
+    run() is thread-safe: concurrent calls share one transport, each on its own
+    session channel, with at most max_channels open at once.
+    """
 
     def __init__(
         self,
@@ -16,16 +53,32 @@ class SSHExecutor:
         key_data: bytes,
         port: int = 22,
         timeout: int = 30,
+        max_channels: int = SSH_MAX_CHANNELS_PER_HOST,
+        compress: bool = SSH_COMPRESSION,
     ):
         self.host = host
         self.user = user
         self.key_data = key_data
         self.port = port
         self.timeout = timeout
+        self.max_channels = max(1, max_channels)
+        self.compress = compress
+        # Set by SSHConnectionPool when an idle connection is handed out again
+        self.reused = False
         self._client: Optional[paramiko.SSHClient] = None
+        self._aborted = False
+        self._connect_lock = threading.Lock()
+        self._channel_slots = threading.BoundedSemaphore(self.max_channels)
 
     def _load_pkey(self):
-        """Load private key, trying RSA, Ed25519, ECDSA."""
+        """Load private key, trying RSA, Ed25519, ECDSA. Parsed keys are cached by digest."""
+        digest = key_digest(self.key_data)
+        with _pkey_cache_lock:
+            pkey = _pkey_cache.get(digest)
+            if pkey is not None:
+                _pkey_cache.move_to_end(digest)
+                return pkey
+
         # Paramiko expects text (PEM is ASCII), not bytes
         key_str = self.key_data.decode("utf-8") if isinstance(self.key_data, bytes) else self.key_data
         key_file = io.StringIO(key_str)
@@ -36,9 +89,14 @@ class SSHExecutor:
         ):
             try:
                 key_file.seek(0)
-                return key_class.from_private_key(key_file)
+                pkey = key_class.from_private_key(key_file)
             except (paramiko.ssh_exception.SSHException, ValueError):
                 continue
+            with _pkey_cache_lock:
+                _pkey_cache[digest] = pkey
+                while len(_pkey_cache) > _PKEY_CACHE_SIZE:
+                    _pkey_cache.popitem(last=False)
+            return pkey
         raise ValueError("Could not load key: not RSA, Ed25519, or ECDSA")
 
     def connect(self) -> tuple[bool, str | None]:
@@ -59,46 +117,105 @@ class SSHExecutor:
                     pkey=pkey,
                     port=self.port,
                     timeout=self.timeout,
+                    banner_timeout=self.timeout,
+                    auth_timeout=self.timeout,
+                    compress=self.compress,
                     allow_agent=False,
                     look_for_keys=False,
                 )
+                if SSH_KEEPALIVE_INTERVAL > 0:
+                    self._client.get_transport().set_keepalive(SSH_KEEPALIVE_INTERVAL)
                 return True, None
             except Exception as e:
                 last_error = str(e)
+                self.close()
                 break
 
         return False, last_error or "Connection failed"
 
-    def run(self, command: str, timeout: int = 60) -> dict:
+    def run(
+        self,
+        command: str,
+        timeout: int = 60,
+        max_bytes: Optional[int] = None,
+        on_chunk: Optional[ChunkCallback] = None,
+        compress_output: bool = False,
+    ) -> dict:
         """
         Run command on remote server.
-        Returns dict with: success, stdout, stderr, exit_code, error
+        stdout/stderr are drained while the command runs; with max_bytes only the
+        head and tail of each stream are kept. on_chunk(stream, data) sees every chunk.
+        compress_output gzips stdout on the remote host and decompresses it while
+        streaming (for large outputs over slow links).
+        Returns dict with: success, stdout, stderr, exit_code, error,
+        stdout_bytes, stderr_bytes, truncated, elapsed_ms (+ wire_bytes with compress_output)
         """
-        if self._client is None:
-            ok, err = self.connect()
-            if not ok:
-                return {
-                    "success": False,
-                    "stdout": "",
-                    "stderr": "",
-                    "exit_code": -1,
-                    "error": err or "Failed to connect",
-                }
+        if self._aborted:
+            return cancelled_result()
+        with self._connect_lock:
+            if self._client is None:
+                ok, err = self.connect()
+                if not ok:
+                    return {
+                        "success": False,
+                        "stdout": "",
+                        "stderr": "",
+                        "exit_code": -1,
+                        "error": err or "Failed to connect",
+                    }
+
+        with self._channel_slots:
+            start = time.monotonic()
+            r = self._run_channel(command, timeout, max_bytes, on_chunk, compress_output)
+        if self._aborted:
+            # Whatever the channel returned was cut short by abort()
+            r = cancelled_result()
+        r["elapsed_ms"] = int((time.monotonic() - start) * 1000)
+        return r
 
+    def _run_channel(
+        self,
+        command: str,
+        timeout: int,
+        max_bytes: Optional[int],
+        on_chunk: Optional[ChunkCallback],
+        compress_output: bool = False,
+    ) -> dict:
+        """Run command on a new session channel of the connected transport."""
+        out = OutputBuffer(max_bytes)
+        err = OutputBuffer(max_bytes)
+        out_sink = StreamSink("stdout", out, on_chunk, gunzip=compress_output)
+        err_sink = StreamSink("stderr", err, on_chunk)
+        deadline = time.monotonic() + timeout
+        channel = None
         try:
-            stdin, stdout, stderr = self._client.exec_command(
-                command, timeout=timeout
-            )
-            exit_code = stdout.channel.recv_exit_status()
-            out = stdout.read().decode("utf-8", errors="replace")
-            err = stderr.read().decode("utf-8", errors="replace")
-            return {
-                "success": exit_code == 0,
-                "stdout": out,
-                "stderr": err,
-                "exit_code": exit_code,
-                "error": None,
-            }
+            channel = self._client.get_transport().open_session(timeout=timeout)
+            channel.settimeout(_POLL_INTERVAL)
+            channel.exec_command(gzip_wrap(command) if compress_output else command)
+
+            # Drain both streams until EOF so a full remote window never stalls the command
+            streams = {"stdout": (channel.recv, out_sink), "stderr": (channel.recv_stderr, err_sink)}
+            while streams:
+                if time.monotonic() > deadline:
+                    return timeout_result(timeout, out, err)
+                for name in list(streams):
+                    recv, sink = streams[name]
+                    # Block on stdout (or stderr once stdout is done); only poll stderr otherwise
+                    if name == "stderr" and "stdout" in streams and not channel.recv_stderr_ready():
+                        continue
+                    try:
+                        data = recv(_RECV_CHUNK)
+                    except socket.timeout:
+                        continue
+                    if not data:
+                        sink.close()
+                        del streams[name]
+                        continue
+                    sink.write(data)
+
+            if not channel.status_event.wait(max(0.0, deadline - time.monotonic())):
+                return timeout_result(timeout, out, err)
+            return command_result(channel.recv_exit_status(), out_sink, err_sink, compress_output)
         except Exception as e:
             return {
                 "success": False,
@@ -107,6 +224,67 @@ class SSHExecutor:
                 "exit_code": -1,
                 "error": str(e),
             }
+        finally:
+            if channel is not None:
+                channel.close()
+
+    def read_file(self, path: str, on_chunk: Callable[[bytes], None]) -> None:
+        """
+        Stream a remote file over SFTP on this connection, passing each chunk to
+        on_chunk. Raises on connection, permission or missing-file errors.
+        """
+        if self._aborted:
+            raise ConnectionError("Cancelled")
+        with self._connect_lock:
+            if self._client is None:
+                ok, err = self.connect()
+                if not ok:
+                    raise ConnectionError(err or "Failed to connect")
+        with self._channel_slots:
+            sftp = self._client.open_sftp()
+            try:
+                with sftp.open(path, "rb") as f:
+                    f.prefetch()
+                    while True:
+                        data = f.read(_RECV_CHUNK)
+                        if not data:
+                            break
+                        on_chunk(data)
+            finally:
+                sftp.close()
+
+    def is_alive(self) -> bool:
+        """Health check: transport is up and still accepts a packet."""
+        transport = self._client.get_transport() if self._client else None
+        if transport is None or not transport.is_active():
+            return False
+        try:
+            # Same probe as paramiko's keepalive; servers reject an empty SSH_MSG_IGNORE
+            transport.global_request("keepalive@openssh.com", wait=False)
+        except Exception:
+            return False
+        return True
+
+    def run_many(self, commands: list[tuple[str, int, bool]], max_bytes: Optional[int] = None) -> list[dict]:
+        """
+        Run (command, timeout, compress_output) tuples concurrently over this connection,
+        at most max_channels at a time. Returns results in input order.
+        """
+        if not commands:
+            return []
+        with ThreadPoolExecutor(max_workers=min(len(commands), self.max_channels)) as pool:
+            return list(pool.map(
+                lambda c: self.run(c[0], timeout=c[1], max_bytes=max_bytes, compress_output=c[2]),
+                commands,
+            ))
+
+    def abort(self) -> None:
+        """
+        Close the connection from any thread and fail in-flight and later run()
+        calls with a cancelled result instead of reconnecting (job cancelled).
+        """
+        self._aborted = True
+        self.close()
 
     def close(self):
         """Close SSH connection."""
@@ -123,3 +301,4 @@ class SSHExecutor:
 
     def __exit__(self, *args):
         self.close()
+
@@ -1,35 +1,224 @@
 """Lynis security audit check."""
 
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
 from typing import Any
 
+from app.core.config import LYNIS_REPORT_MAX_AGE
+
+from .async_executor import AsyncSSHExecutor
 from .executor import SSHExecutor
+from .steps import Steps, drive, drive_async
 
+LYNIS_REPORT_PATH = "/var/log/lynis-report.dat"
+LYNIS_TIMEOUT = 300
 
-def run_lynis(executor: SSHExecutor) -> dict[str, Any]:
-    """Run Lynis audit on remote server. Returns parsed results or N/A if not installed."""
-    r = executor.run(
-        "lynis audit system --quick 2>/dev/null || lynis audit system 2>/dev/null || echo 'LYNIS_NOT_INSTALLED'",
-        timeout=300,
-    )
-    out = r.get("stdout", "")
-    if "LYNIS_NOT_INSTALLED" in out or not out.strip():
-        return {"status": "n/a", "message": "Lynis not installed on server"}
+# Runs the audit quietly (its stdout is not transferred) unless the report is
+# younger than LYNIS_REPORT_MAX_AGE, then prints "<mtime> <size>" of the report.
+LYNIS_COMMAND = (
+    "command -v lynis >/dev/null 2>&1 || { echo LYNIS_NOT_INSTALLED; exit 0; }; "
+    f"m=$(stat -c %Y {LYNIS_REPORT_PATH} 2>/dev/null || echo 0); "
+    f"if [ $(( $(date +%s) - m )) -ge {LYNIS_REPORT_MAX_AGE} ]; then "
+    "lynis audit system --quick --quiet --no-colors >/dev/null 2>&1; fi; "
+    f"stat -c '%Y %s' {LYNIS_REPORT_PATH} 2>/dev/null || echo NO_REPORT"
+)
+_CAT_REPORT = f"cat {LYNIS_REPORT_PATH} 2>/dev/null || sudo -n cat {LYNIS_REPORT_PATH}"
+# stderr kept from the compressed report read: enough for the exit marker and an error line
+# (stdout is parsed as it streams, so its buffer only needs to be small too)
+_CAT_MAX_BYTES = 4096
+
+# Parsed reports keyed by (host, port, mtime, size); unchanged reports are not re-parsed
+_REPORT_CACHE_SIZE = 512
+_report_cache: "OrderedDict[tuple, LynisReport]" = OrderedDict()
+_report_cache_lock = threading.Lock()
+
+
+@dataclass
+class LynisFinding:
+    """One warning[] or suggestion[] entry: TEST-ID|message|details|solution."""
+
+    test_id: str
+    message: str
+    details: str = ""
+    solution: str = ""
+
+
+@dataclass
+class LynisReport:
+    """Typed view of lynis-report.dat."""
+
+    hardening_index: int | None = None
+    lynis_version: str | None = None
+    report_datetime: str | None = None
+    warnings: list[LynisFinding] = field(default_factory=list)
+    suggestions: list[LynisFinding] = field(default_factory=list)
+    tests_executed: list[str] = field(default_factory=list)
 
-    result = {"status": "info", "hardening_index": None, "warnings": [], "suggestions": []}
+    def to_result(self) -> dict[str, Any]:
+        """Scan result dict; warnings/suggestions stay plain strings for the report template."""
+        return {
+            "status": "info",
+            "hardening_index": self.hardening_index,
+            "lynis_version": self.lynis_version,
+            "report_datetime": self.report_datetime,
+            "warnings": [_format_finding(f) for f in self.warnings],
+            "suggestions": [_format_finding(f) for f in self.suggestions],
+            "warning_details": [asdict(f) for f in self.warnings],
+            "suggestion_details": [asdict(f) for f in self.suggestions],
+            "tests_executed": self.tests_executed,
+        }
 
-    for line in out.split("\n"):
+
+class LynisReportParser:
+    """Incremental key=value parser for lynis-report.dat; feed() raw chunks, then close()."""
+
+    def __init__(self) -> None:
+        self.report = LynisReport()
+        # key=value lines seen; 0 means nothing that looks like a report arrived
+        self.entries = 0
+        self._partial = b""
+
+    def feed(self, data: bytes) -> None:
+        lines = (self._partial + data).split(b"\n")
+        self._partial = lines.pop()
+        for line in lines:
+            self._parse_line(line.decode("utf-8", errors="replace"))
+
+    def close(self) -> LynisReport:
+        if self._partial:
+            self._parse_line(self._partial.decode("utf-8", errors="replace"))
+            self._partial = b""
+        return self.report
+
+    def _parse_line(self, line: str) -> None:
         line = line.strip()
-        if "hardening_index=" in line:
+        if not line or line.startswith("#") or "=" not in line:
+            return
+        key, value = line.split("=", 1)
+        self.entries += 1
+        if key == "warning[]":
+            self.report.warnings.append(_parse_finding(value))
+        elif key == "suggestion[]":
+            self.report.suggestions.append(_parse_finding(value))
+        elif key == "hardening_index":
             try:
-                result["hardening_index"] = int(line.split("=")[-1].strip())
-            except (ValueError, IndexError):
+                self.report.hardening_index = int(value)
+            except ValueError:
                 pass
-        elif "[warning]" in line.lower():
-            result["warnings"].append(line.replace("[warning]", "").strip()[:200])
-        elif "[suggestion]" in line.lower():
-            result["suggestions"].append(line.replace("[suggestion]", "").strip()[:200])
-
-    result["warnings"] = result["warnings"][:10]
-    result["suggestions"] = result["suggestions"][:10]
-    result["raw_preview"] = out[:1500]
-    return result
+        elif key == "tests_executed":
+            self.report.tests_executed = [t for t in value.split("|") if t]
+        elif key == "lynis_version":
+            self.report.lynis_version = value
+        elif key == "report_datetime_end":
+            self.report.report_datetime = value
+
+
+def _parse_finding(value: str) -> LynisFinding:
+    parts = value.split("|")
+    parts += [""] * (4 - len(parts))
+    details, solution = (p if p != "-" else "" for p in parts[2:4])
+    return LynisFinding(test_id=parts[0], message=parts[1], details=details, solution=solution)
+
+
+def _format_finding(f: LynisFinding) -> str:
+    return f"[{f.test_id}] {f.message}" + (f" ({f.details})" if f.details else "")
+
+
+def _stdout_to(parser: LynisReportParser):
+    """on_chunk callback feeding only stdout into parser."""
+    def on_chunk(stream: str, data: bytes) -> None:
+        if stream == "stdout":
+            parser.feed(data)
+    return on_chunk
+
+
+def _parse_stat(out: str) -> tuple[int, int] | None:
+    parts = out.strip().split()
+    if len(parts) == 2 and parts[0].isdigit() and parts[1].isdigit():
+        return int(parts[0]), int(parts[1])
+    return None
+
+
+def _cache_get(key: tuple) -> LynisReport | None:
+    with _report_cache_lock:
+        report = _report_cache.get(key)
+        if report is not None:
+            _report_cache.move_to_end(key)
+        return report
+
+
+def _cache_put(key: tuple, report: LynisReport) -> None:
+    with _report_cache_lock:
+        _report_cache[key] = report
+        while len(_report_cache) > _REPORT_CACHE_SIZE:
+            _report_cache.popitem(last=False)
+
+
+def _precheck(r: dict) -> dict[str, Any] | tuple[int, int]:
+    """Interpret LYNIS_COMMAND output: an n/a or error result, or the report's (mtime, size)."""
+    out = r.get("stdout", "")
+    if r.get("cancelled"):
+        return {"status": "cancelled", "message": r["error"]}
+    if r.get("error"):
+        return {"status": "error", "message": r["error"]}
+    if "LYNIS_NOT_INSTALLED" in out or not out.strip():
+        return {"status": "n/a", "message": "Lynis not installed on server"}
+    stat = _parse_stat(out)
+    if stat is None:
+        return {
+            "status": "info",
+            "message": f"Lynis report not found at {LYNIS_REPORT_PATH}",
+            "fixes": ["Run the scan as root (or passwordless sudo) so Lynis can write its report"],
+        }
+    return stat
+
+
+def _unreadable(error: str) -> dict[str, Any]:
+    return {
+        "status": "info",
+        "message": f"Lynis report not readable: {error}"[:200],
+        "fixes": [f"Grant the scan user read access to {LYNIS_REPORT_PATH}"],
+    }
+
+
+def _lynis_steps(executor: SSHExecutor | AsyncSSHExecutor, compress_output: bool) -> Steps:
+    """The plan shared by run_lynis and run_lynis_async (see steps.drive)."""
+    pre = _precheck((yield lambda: executor.run(LYNIS_COMMAND, timeout=LYNIS_TIMEOUT)))
+    if isinstance(pre, dict):
+        return pre
+    key = (executor.host, executor.port, *pre)
+    report = _cache_get(key)
+    if report is None:
+        parser = LynisReportParser()
+        try:
+            if compress_output:
+                r = yield lambda: executor.run(
+                    _CAT_REPORT, timeout=60, max_bytes=_CAT_MAX_BYTES, compress_output=True,
+                    on_chunk=_stdout_to(parser),
+                )
+                if r.get("error") or r.get("exit_code") != 0:
+                    return _unreadable(r.get("error") or r.get("stderr", "").strip() or "cat failed")
+            else:
+                yield lambda: executor.read_file(LYNIS_REPORT_PATH, parser.feed)
+        except Exception as e:
+            return _unreadable(str(e))
+        report = parser.close()
+        if not parser.entries:
+            return _unreadable("report is empty")
+        _cache_put(key, report)
+    return report.to_result()
+
+
+def run_lynis(executor: SSHExecutor, compress_output: bool = False) -> dict[str, Any]:
+    """
+    Run Lynis audit on remote server and parse /var/log/lynis-report.dat, fetched over
+    SFTP on the same connection (or gzip-compressed cat with compress_output).
+    Returns parsed results or N/A if not installed.
+    """
+    return drive(_lynis_steps(executor, compress_output))
+
+
+async def run_lynis_async(executor: AsyncSSHExecutor, compress_output: bool = False) -> dict[str, Any]:
+    """Async variant of run_lynis for AsyncSSHExecutor."""
+    return await drive_async(_lynis_steps(executor, compress_output))
@@ -1,35 +1,87 @@
 """Nikto web vulnerability scanner."""
 
-import subprocess
-from typing import Any
+import asyncio
+from collections import defaultdict
+from typing import Any, Optional
+from urllib.parse import urlsplit
 
+from app.core.config import NIKTO_MAX_PARALLEL, NIKTO_MAX_PER_HOST
 
-def run_nikto(urls: list[str]) -> dict[str, Any]:
+from .cancel import CancelToken
+from .process import run_process_async
+from .tools import tool_registry
+
+NIKTO_TIMEOUT = 300
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def url_target(url: str) -> tuple[str, int]:
+    """(host, port) a URL connects to."""
+    parts = urlsplit(url)
+    return parts.hostname or "", parts.port or _DEFAULT_PORTS.get(parts.scheme, 80)
+
+
+def prune_urls(urls: list[str], open_ports: dict[str, set[int]]) -> tuple[list[str], list[str]]:
+    """
+    Drop URLs whose port is known to be closed. open_ports maps host -> open TCP
+    ports; hosts without data are kept. Returns (kept, skipped).
+    """
+    kept, skipped = [], []
+    for url in urls:
+        host, port = url_target(url)
+        if host in open_ports and port not in open_ports[host]:
+            skipped.append(url)
+        else:
+            kept.append(url)
+    return kept, skipped
+
+
+async def _scan_url(url: str, cancel: Optional[CancelToken] = None) -> dict[str, Any]:
+    r = await run_process_async(
+        ["nikto", "-h", url, "-Format", "txt"], "nikto", NIKTO_TIMEOUT, max_bytes=3000, cancel=cancel
+    )
+    if r.get("cancelled"):
+        return {"url": url, "output": r["error"], "success": False, "cancelled": True}
+    if r["timed_out"]:
+        return {"url": url, "output": "Scan timed out", "success": False}
+    if r["error"]:
+        return {"url": url, "output": r["error"], "success": False}
+    return {"url": url, "output": r["stdout"], "success": r["success"]}
+
+
+async def _scan_all(
+    targets: list[str], max_parallel: int, max_per_host: int, cancel: Optional[CancelToken]
+) -> list[dict[str, Any]]:
+    slots = asyncio.Semaphore(max(1, max_parallel))
+    host_slots: defaultdict[str, asyncio.Semaphore] = defaultdict(lambda: asyncio.Semaphore(max(1, max_per_host)))
+
+    async def scan(url: str) -> dict[str, Any]:
+        # Wait for the host first so a URL queued behind its host holds no global slot
+        async with host_slots[url_target(url)[0]]:
+            async with slots:
+                return await _scan_url(url, cancel)
+
+    return await asyncio.gather(*(scan(u) for u in targets))
+
+
+def run_nikto(
+    urls: list[str],
+    max_parallel: int = NIKTO_MAX_PARALLEL,
+    max_per_host: int = NIKTO_MAX_PER_HOST,
+    cancel: Optional[CancelToken] = None,
+) -> dict[str, Any]:
     """
     Run Nikto against list of URLs.
     Requires nikto binary on scan machine.
+    Up to max_parallel nikto processes run at once, at most max_per_host against
+    the same target host. Results keep the order of urls. Cancelling kills the
+    running scans; URLs not finished are marked cancelled.
     """
-    try:
-        subprocess.run(["nikto", "-Version"], capture_output=True, check=True, timeout=5)
-    except (subprocess.CalledProcessError, FileNotFoundError, subprocess.TimeoutExpired):
+    if not tool_registry.available("nikto"):
         return {"status": "n/a", "message": "Nikto not installed", "results": []}
 
-    results = []
-    for url in urls:
-        url = url.strip()
-        if not url or not url.startswith(("http://", "https://")):
-            continue
-        try:
-            r = subprocess.run(
-                ["nikto", "-h", url, "-Format", "txt"],
-                capture_output=True,
-                timeout=300,
-            )
-            out = r.stdout.decode("utf-8", errors="replace") if r.stdout else ""
-            results.append({"url": url, "output": out[:3000], "success": r.returncode == 0})
-        except subprocess.TimeoutExpired:
-            results.append({"url": url, "output": "Scan timed out", "success": False})
-        except Exception as e:
-            results.append({"url": url, "output": str(e), "success": False})
-
+    targets = [u.strip() for u in urls if u.strip().startswith(("http://", "https://"))]
+    results = asyncio.run(_scan_all(targets, max_parallel, max_per_host, cancel))
+    if any(r.get("cancelled") for r in results):
+        return {"status": "cancelled", "message": cancel.reason, "results": results}
     return {"status": "info", "results": results}
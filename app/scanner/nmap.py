@@ -1,44 +1,191 @@
 """Nmap port and service scanner."""
 
-import subprocess
-from typing import Any
+import xml.etree.ElementTree as ET
+from typing import Any, Callable, Optional
 
+from app.core.config import NMAP_HOST_TIMEOUT, NMAP_PROFILE, NMAP_TIMEOUT
 
-def run_nmap(hosts: list[str], ports: str = "22,80,443,8080") -> dict[str, Any]:
+from .cancel import CancelToken
+from .process import run_process
+from .tools import tool_registry
+
+# Timing / parallelism profiles: nmap scans the whole host list in one run and
+# these decide how many hosts it probes at once and how hard
+NMAP_PROFILES = {
+    "polite": ["-T2", "--max-hostgroup", "16", "--max-parallelism", "16"],
+    "normal": ["-T3"],
+    # The original per-host timing, leaving host-group sizes to nmap
+    "standard": ["-T4"],
+    "aggressive": ["-T4", "--min-hostgroup", "64", "--min-parallelism", "64"],
+    "insane": ["-T5", "--min-hostgroup", "256", "--min-parallelism", "256", "--max-retries", "1"],
+}
+
+
+def _port_record(port: ET.Element) -> dict[str, Any]:
+    state = port.find("state")
+    service = port.find("service")
+    svc = service.attrib if service is not None else {}
+    return {
+        "port": int(port.get("portid", "0")),
+        "protocol": port.get("protocol", "tcp"),
+        "state": state.get("state", "") if state is not None else "",
+        "service": svc.get("name", ""),
+        "product": svc.get("product", ""),
+        "version": svc.get("version", ""),
+        "extrainfo": svc.get("extrainfo", ""),
+    }
+
+
+def _host_record(host: ET.Element) -> dict[str, Any]:
+    """Structured record for one <host> element."""
+    status = host.find("status")
+    address = host.find("address")
+    names = [h.get("name", "") for h in host.iter("hostname")]
+    ports = [_port_record(p) for p in host.iter("port")]
+    lines = [
+        f"{p['port']}/{p['protocol']} {p['state']} {p['service']} {p['product']} {p['version']}".rstrip()
+        for p in ports
+    ]
+    state = status.get("state", "") if status is not None else ""
+    return {
+        "host": address.get("addr", "") if address is not None else "",
+        "hostnames": [n for n in names if n],
+        "state": state,
+        "ports": ports,
+        "open_ports": [p["port"] for p in ports if p["state"] == "open"],
+        "output": "\n".join(lines) or f"Host {state or 'unknown'}, no ports reported",
+        "success": state == "up",
+    }
+
+
+class NmapXMLStream:
     """
-    Run Nmap against list of hosts for port/service detection.
+    Incremental parser for `nmap -oX -`: feed() raw stdout chunks or lines; each completed
+    <host> is turned into a record (and passed to on_host) then freed, so memory
+    stays flat however large the fleet.
+    """
+
+    def __init__(self, on_host: Optional[Callable[[dict], None]] = None) -> None:
+        self._parser = ET.XMLPullParser(events=("start", "end"))
+        self._root: ET.Element | None = None
+        self.on_host = on_host
+        self.hosts: list[dict[str, Any]] = []
+
+    def feed(self, data: bytes) -> None:
+        self._parser.feed(data)
+        for event, elem in self._parser.read_events():
+            if event == "start" and self._root is None:
+                self._root = elem
+            elif event == "end" and elem.tag == "host":
+                record = _host_record(elem)
+                self.hosts.append(record)
+                if self.on_host:
+                    self.on_host(record)
+                if self._root is not None and elem in list(self._root):
+                    self._root.remove(elem)
+
+    def close(self) -> list[dict[str, Any]]:
+        try:
+            self._parser.close()
+        except ET.ParseError:
+            # Killed or failed runs leave the document unterminated; keep the hosts seen
+            pass
+        return self.hosts
+
+
+def _match_input(record: dict, remaining: set[str]) -> str | None:
+    """Input host (IP or name as given) a record belongs to."""
+    for candidate in [record["host"], *record["hostnames"]]:
+        if candidate in remaining:
+            return candidate
+    return None
+
+
+def run_nmap(
+    hosts: list[str],
+    ports: str = "22,80,443,8080",
+    profile: str = NMAP_PROFILE,
+    on_host: Optional[Callable[[dict], None]] = None,
+    cancel: Optional[CancelToken] = None,
+) -> dict[str, Any]:
+    """
+    Run one Nmap pass over all hosts for port/service detection.
     Requires nmap binary on scan machine.
-    Uses -sT (TCP connect) for speed; -sV adds service version but is slower.
+    Uses -sT (TCP connect) with -sV service versions; profile picks timing and
+    host-group parallelism (see NMAP_PROFILES). XML output is parsed as it streams;
+    on_host(record) is called for each host as soon as nmap finishes it.
+    Cancelling kills nmap and keeps the hosts finished so far.
     """
-    try:
-        subprocess.run(["nmap", "--version"], capture_output=True, check=True, timeout=5)
-    except (subprocess.CalledProcessError, FileNotFoundError, subprocess.TimeoutExpired):
+    if not tool_registry.available("nmap"):
         return {"status": "n/a", "message": "Nmap not installed", "results": []}
+    if profile not in NMAP_PROFILES:
+        return {"status": "error", "message": f"Unknown nmap profile: {profile}", "results": []}
 
-    results = []
+    targets = list(dict.fromkeys(h.strip() for h in hosts if h.strip()))
     port_list = ",".join(p.strip() for p in ports.split(",") if p.strip().isdigit()) or "22,80,443"
+    if not targets:
+        return {"status": "info", "results": [], "ports": port_list, "profile": profile}
 
-    for host in hosts:
-        host = host.strip()
-        if not host:
-            continue
-        try:
-            r = subprocess.run(
-                ["nmap", "-sT", "-sV", "-T4", "-p", port_list, host, "-oG", "-"],
-                capture_output=True,
-                timeout=300,
-            )
-            out = r.stdout.decode("utf-8", errors="replace") if r.stdout else ""
-            err = r.stderr.decode("utf-8", errors="replace") if r.stderr else ""
+    stream = NmapXMLStream(on_host)
+
+    def on_line(stream_name: str, line: bytes) -> None:
+        if stream_name == "stdout":
+            stream.feed(line + b"\n")
+
+    r = run_process(
+        [
+            "nmap", "-sT", "-sV", *NMAP_PROFILES[profile],
+            "--host-timeout", f"{NMAP_HOST_TIMEOUT}s",
+            "-p", port_list, "-oX", "-", "-iL", "-",
+        ],
+        "nmap",
+        NMAP_TIMEOUT,
+        stdin="\n".join(targets).encode() + b"\n",
+        max_bytes=4096,
+        on_line=on_line,
+        cancel=cancel,
+    )
+    cancelled = r.get("cancelled", False)
+    timed_out = not cancelled and r["timed_out"]
+    if r["error"] and not timed_out and not cancelled and not stream.hosts:
+        return {"status": "error", "message": r["error"], "results": []}
+
+    results = []
+    remaining = set(targets)
+    for record in stream.close():
+        name = _match_input(record, remaining)
+        if name is not None:
+            remaining.discard(name)
+            record = {**record, "host": name, "address": record["host"]}
+        results.append(record)
+    if cancelled:
+        message = r["error"]
+    elif timed_out:
+        message = "Scan timed out"
+    else:
+        message = r["stderr"].strip()[:200] or "Host down or not resolved"
+    for name in targets:
+        if name in remaining:
             results.append({
-                "host": host,
-                "output": out or err,
-                "success": r.returncode == 0,
-                "raw": out[:5000],
+                "host": name, "hostnames": [], "state": "unknown", "ports": [], "open_ports": [],
+                "output": message, "success": False,
             })
-        except subprocess.TimeoutExpired:
-            results.append({"host": host, "output": "Scan timed out", "success": False, "raw": ""})
-        except Exception as e:
-            results.append({"host": host, "output": str(e), "success": False, "raw": ""})
 
-    return {"status": "info", "results": results, "ports": port_list}
+    out = {"status": "info", "results": results, "ports": port_list, "profile": profile}
+    if cancelled:
+        out.update(status="cancelled", message=f"{r['error']}; partial results")
+    elif timed_out:
+        out["message"] = f"Nmap timed out after {NMAP_TIMEOUT}s; partial results"
+    return out
+
+
+def open_ports_by_host(nmap_result: dict[str, Any] | None) -> dict[str, list[int]]:
+    """
+    Open TCP ports per input host from a run_nmap() result. Only hosts nmap
+    actually scanned (state up) are included; down or timed-out hosts are unknown.
+    """
+    return {
+        r["host"]: r.get("open_ports", [])
+        for r in (nmap_result or {}).get("results", [])
+        if isinstance(r, dict) and r.get("host") and r.get("state") == "up"
+    }
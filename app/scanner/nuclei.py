@@ -1,22 +1,57 @@
 """Nuclei template-based vulnerability scanner."""
 
-import subprocess
+import json
 import tempfile
+from collections import Counter
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, Optional
 
+from app.core.config import NUCLEI_MAX_FINDINGS, NUCLEI_TIMEOUT
 
-def run_nuclei(urls: list[str], severity: str = "critical,high,medium") -> dict[str, Any]:
+from .cancel import CancelToken
+from .process import run_process
+from .tools import tool_registry
+
+
+def _finding(event: dict) -> dict[str, Any]:
+    """Structured record from one nuclei -jsonl event."""
+    info = event.get("info") or {}
+    record = {
+        "template_id": event.get("template-id", ""),
+        "name": info.get("name", ""),
+        "severity": info.get("severity", "unknown"),
+        "type": event.get("type", ""),
+        "host": event.get("host", ""),
+        "url": event.get("matched-at") or event.get("host", ""),
+        "matcher_name": event.get("matcher-name", ""),
+    }
+    # Summary line for the HTML report
+    record["output"] = f"[{record['severity']}] {record['template_id']}" + (f" - {record['name']}" if record["name"] else "")
+    return record
+
+
+def run_nuclei(
+    urls: list[str],
+    severity: str = "critical,high,medium",
+    concurrency: Optional[int] = None,
+    rate_limit: Optional[int] = None,
+    bulk_size: Optional[int] = None,
+    on_finding: Optional[Callable[[dict], None]] = None,
+    cancel: Optional[CancelToken] = None,
+) -> dict[str, Any]:
     """
     Run Nuclei against list of URLs.
     Requires nuclei binary on scan machine.
+    Output is read as JSON lines while nuclei runs; each finding becomes a record
+    (template_id, severity, url, ...) passed to on_finding as it arrives. Only the
+    first NUCLEI_MAX_FINDINGS records are kept; counts cover every finding.
+    concurrency (-c), rate_limit (-rl, requests/s) and bulk_size (-bs) default to nuclei's own.
+    Cancelling kills nuclei and keeps the findings received so far.
     """
-    try:
-        subprocess.run(["nuclei", "-version"], capture_output=True, check=True, timeout=5)
-    except (subprocess.CalledProcessError, FileNotFoundError, subprocess.TimeoutExpired):
+    tool = tool_registry.get("nuclei")
+    if not tool.available:
         return {"status": "n/a", "message": "Nuclei not installed", "results": []}
 
-    results = []
     valid_urls = [u.strip() for u in urls if u.strip() and u.startswith(("http://", "https://"))]
     if not valid_urls:
         return {"status": "info", "message": "No valid URLs to scan", "results": []}
@@ -25,32 +60,50 @@ def run_nuclei(urls: list[str], severity: str = "critical,high,medium") -> dict[
         f.write("\n".join(valid_urls))
         urls_file = f.name
 
+    cmd = ["nuclei", "-l", urls_file, "-severity", severity, "-jsonl", "-omit-raw", "-silent", "-no-color"]
+    for flag, value in (("-c", concurrency), ("-rl", rate_limit), ("-bs", bulk_size)):
+        if value:
+            cmd += [flag, str(value)]
+
+    findings: list[dict] = []
+    counts: Counter[str] = Counter()
+
+    def on_line(stream: str, line: bytes) -> None:
+        if stream != "stdout":
+            return
+        try:
+            event = json.loads(line)
+        except ValueError:
+            return
+        record = _finding(event)
+        counts[record["severity"]] += 1
+        if len(findings) < NUCLEI_MAX_FINDINGS:
+            findings.append(record)
+        if on_finding:
+            on_finding(record)
+
     try:
-        r = subprocess.run(
-            [
-                "nuclei",
-                "-l", urls_file,
-                "-severity", severity,
-                "-silent",
-                "-no-color",
-            ],
-            capture_output=True,
-            timeout=600,
-        )
-        out = r.stdout.decode("utf-8", errors="replace") if r.stdout else ""
-        err = r.stderr.decode("utf-8", errors="replace") if r.stderr else ""
-        raw = (out + "\n" + err).strip()
-        findings = [line.strip() for line in raw.split("\n") if line.strip()] if raw else []
-    except subprocess.TimeoutExpired:
-        findings = ["Scan timed out"]
-    except Exception as e:
-        findings = [str(e)]
+        # Findings are consumed line by line, so only a short stdout tail is kept
+        r = run_process(cmd, "nuclei", NUCLEI_TIMEOUT, max_bytes=4096, on_line=on_line, cancel=cancel)
     finally:
         Path(urls_file).unlink(missing_ok=True)
 
-    return {
+    total = sum(counts.values())
+    result = {
         "status": "info",
-        "message": f"{len(findings)} finding(s)" if findings else "No findings",
-        "results": findings[:50],
-        "raw_preview": "\n".join(findings[:30]),
+        "message": f"{total} finding(s)" if total else "No findings",
+        "results": findings,
+        "counts": dict(counts),
+        "total": total,
     }
+    if r.get("cancelled"):
+        result.update(status="cancelled", message=f"{r['error']}; {result['message']} so far")
+    elif r["timed_out"]:
+        result["message"] = f"Scan timed out after {NUCLEI_TIMEOUT}s; {result['message']} so far"
+    elif r["error"]:
+        result["message"] = r["error"]
+    elif r["exit_code"]:
+        result["raw_preview"] = r["stderr"][-2000:]
+    if not tool.capabilities.get("templates"):
+        result["warning"] = "No local nuclei-templates directory found; nuclei downloads templates on first run"
+    return result
@@ -1,20 +1,41 @@
 """Orchestrates security scans across servers and network tools."""
 
+import asyncio
 import base64
 import tempfile
+import threading
 import uuid
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
 from typing import Any, Callable, Optional
 
-from .builtin import run_builtin_checks
+from app.core.config import (
+    NMAP_PROFILE,
+    SCAN_CHECK_MODE,
+    SSH_BULK_COMPRESSION,
+    SSH_COMPRESSION,
+    SCAN_GLOBAL_MAX_SERVERS,
+    SCAN_MAX_ASYNC_SERVERS,
+    SCAN_MAX_PARALLEL_SERVERS,
+    SCAN_PHASE_LIMITS,
+)
+
+from .async_executor import AsyncSSHExecutor
+from .builtin import CHECK_MODES, run_builtin_checks, run_builtin_checks_async
+from .cache import cache_summary
+from .cancel import CancelToken
 from .executor import SSHExecutor
-from .lynis import run_lynis
-from .nikto import run_nikto
-from .nmap import run_nmap
+from .lynis import run_lynis, run_lynis_async
+from .nikto import prune_urls, run_nikto, url_target
+from .nmap import open_ports_by_host, run_nmap
 from .nuclei import run_nuclei
 from .openvas import run_openvas
+from .pool import ssh_pool
+from .probe import probe
+from .scheduler import Task, run_tasks
+from .tools import tool_registry
 from .vuls import run_vuls
 from .zmap import run_zmap
 
@@ -23,6 +44,24 @@ BUILTIN_TESTS = {
     "clamav", "rkhunter", "chkrootkit", "auditd", "apparmor", "unattended_upgrades", "sudo_users", "ssl_cert",
 }
 ALL_TESTS = list(BUILTIN_TESTS) + ["lynis", "vuls", "nikto", "zmap", "nmap", "nuclei"]
+SSH_BACKENDS = ("paramiko", "asyncssh")
+SSH_PORT = 22
+# Seconds for the no-op command that checks a reused pooled connection before the scan
+_POOL_PROBE_TIMEOUT = 10
+
+# Caps concurrent per-server scans across every job running in this process
+_global_server_slots = threading.BoundedSemaphore(SCAN_GLOBAL_MAX_SERVERS)
+
+
+@dataclass(frozen=True)
+class ServerScanOptions:
+    """Per-job settings for the SSH phase of each server."""
+
+    check_mode: str = SCAN_CHECK_MODE
+    reuse_connections: bool = True
+    ssh_compression: bool = SSH_COMPRESSION
+    bulk_compression: bool = SSH_BULK_COMPRESSION
+    force: bool = False
 
 
 def _derive_subnet(host: str) -> str | None:
@@ -50,6 +89,190 @@ def _derive_urls(servers: list[dict]) -> list[str]:
     return urls
 
 
+def _known_open_ports(server_results: dict[str, dict], nmap_result: dict | None) -> dict[str, set[int]]:
+    """
+    Open TCP ports per host from the open_ports check and/or Nmap (union of both).
+    Hosts whose listening ports could not be read are left out (unknown, not closed).
+    """
+    known: dict[str, set[int]] = {}
+    for server in server_results.values():
+        listening = (server.get("checks") or {}).get("open_ports", {}).get("listening")
+        if server.get("host") and listening is not None:
+            known.setdefault(server["host"], set()).update(listening)
+    for host, ports in open_ports_by_host(nmap_result).items():
+        known.setdefault(host, set()).update(ports)
+    return known
+
+
+def _cancelled_server(result: dict[str, Any], cancel: CancelToken, on_step: Callable[[], None]) -> dict[str, Any]:
+    """Mark a server the job was cancelled before reaching."""
+    result.update(error=cancel.reason, cancelled=True)
+    on_step()
+    return result
+
+
+def _scan_server(
+    server: dict,
+    tests: list[str],
+    on_step: Callable[[], None],
+    opts: ServerScanOptions = ServerScanOptions(),
+    cancel: Optional[CancelToken] = None,
+) -> dict[str, Any]:
+    """
+    Connect to one server and run its built-in checks and Lynis. Returns the server result.
+    With opts.reuse_connections the connection comes from (and returns to) the shared ssh_pool.
+    Cancelling aborts the connection; checks that did not finish are marked cancelled.
+    """
+    host = server.get("host", "")
+    user = server.get("user", "ubuntu")
+    key_data = base64.b64decode(server.get("key_base64", ""))
+    result = {"host": host, "user": user, "checks": {}, "lynis": None, "reachable": False}
+    cancel = cancel or CancelToken()
+
+    while not _global_server_slots.acquire(timeout=0.2):
+        if cancel.cancelled:
+            return _cancelled_server(result, cancel, on_step)
+    try:
+        if cancel.cancelled:
+            return _cancelled_server(result, cancel, on_step)
+        if opts.reuse_connections:
+            executor, err = ssh_pool.acquire(host=host, user=user, key_data=key_data, compress=opts.ssh_compression)
+            # An idle connection the server dropped only shows on its first command; reconnect once
+            if executor is not None and executor.reused:
+                probe = executor.run("true", timeout=_POOL_PROBE_TIMEOUT)
+                if probe.get("error") and not cancel.cancelled:
+                    executor, err = ssh_pool.replace(executor)
+        else:
+            executor = SSHExecutor(host=host, user=user, key_data=key_data, compress=opts.ssh_compression)
+            ok, err = executor.connect()
+            if not ok:
+                executor = None
+        if executor is None:
+            result["error"] = err or "SSH connection failed"
+            on_step()
+            return result
+
+        handle = cancel.on_cancel(executor.abort)
+        try:
+            result["reachable"] = True
+
+            # Lynis runs on its own channel, overlapping the built-in checks
+            with ThreadPoolExecutor(max_workers=1) as lynis_pool:
+                lynis_future = (
+                    lynis_pool.submit(run_lynis, executor, opts.bulk_compression) if "lynis" in tests else None
+                )
+
+                # Built-in checks
+                builtin_tests = [t for t in tests if t in BUILTIN_TESTS]
+                if builtin_tests:
+                    result["checks"] = run_builtin_checks(
+                        executor,
+                        builtin_tests,
+                        mode=opts.check_mode,
+                        bulk_compression=opts.bulk_compression,
+                        force=opts.force,
+                    )
+                    result["cache"] = cache_summary(result["checks"])
+                    on_step()
+
+                if lynis_future:
+                    result["lynis"] = lynis_future.result()
+                    on_step()
+        finally:
+            cancel.remove(handle)
+            ssh_pool.release(executor, reusable=opts.reuse_connections and not cancel.cancelled)
+    finally:
+        _global_server_slots.release()
+    if cancel.cancelled:
+        result["cancelled"] = True
+    return result
+
+
+async def _scan_server_async(
+    server: dict,
+    tests: list[str],
+    on_step: Callable[[], None],
+    opts: ServerScanOptions = ServerScanOptions(),
+    cancel: Optional[CancelToken] = None,
+) -> dict[str, Any]:
+    """Async variant of _scan_server using AsyncSSHExecutor."""
+    host = server.get("host", "")
+    user = server.get("user", "ubuntu")
+    key_data = base64.b64decode(server.get("key_base64", ""))
+    result = {"host": host, "user": user, "checks": {}, "lynis": None, "reachable": False}
+    cancel = cancel or CancelToken()
+
+    # Shares the process-wide cap with the thread backend without blocking the loop
+    while not _global_server_slots.acquire(blocking=False):
+        if cancel.cancelled:
+            return _cancelled_server(result, cancel, on_step)
+        await asyncio.sleep(0.05)
+    if cancel.cancelled:
+        _global_server_slots.release()
+        return _cancelled_server(result, cancel, on_step)
+    executor = AsyncSSHExecutor(host=host, user=user, key_data=key_data, compress=opts.ssh_compression)
+    handle = cancel.on_cancel(executor.abort)
+    try:
+        ok, err = await executor.connect()
+        if not ok:
+            result["error"] = err or "SSH connection failed"
+            on_step()
+            return result
+
+        result["reachable"] = True
+
+        async def checks() -> None:
+            builtin_tests = [t for t in tests if t in BUILTIN_TESTS]
+            if builtin_tests:
+                result["checks"] = await run_builtin_checks_async(
+                    executor,
+                    builtin_tests,
+                    mode=opts.check_mode,
+                    bulk_compression=opts.bulk_compression,
+                    force=opts.force,
+                )
+                result["cache"] = cache_summary(result["checks"])
+                on_step()
+
+        async def lynis() -> None:
+            if "lynis" in tests:
+                result["lynis"] = await run_lynis_async(executor, opts.bulk_compression)
+                on_step()
+
+        await asyncio.gather(checks(), lynis())
+    finally:
+        cancel.remove(handle)
+        await executor.close()
+        _global_server_slots.release()
+    if cancel.cancelled:
+        result["cancelled"] = True
+    return result
+
+
+async def _scan_servers_async(
+    targets: list[tuple[str, dict]],
+    tests: list[str],
+    limit: int,
+    on_step: Callable[[], None],
+    on_result: Callable[[str, dict], None],
+    opts: ServerScanOptions = ServerScanOptions(),
+    cancel: Optional[CancelToken] = None,
+) -> None:
+    """Scan all targets from one event loop, at most `limit` at a time."""
+    sem = asyncio.Semaphore(limit)
+
+    async def scan_one(name: str, server: dict) -> None:
+        async with sem:
+            try:
+                server_result = await _scan_server_async(server, tests, on_step, opts, cancel)
+            except Exception as e:
+                server_result = {"error": str(e)}
+                on_step()
+        on_result(name, server_result)
+
+    await asyncio.gather(*(scan_one(name, server) for name, server in targets))
+
+
 def run_scan(
     servers: list[dict],
     tests: list[str] | None = None,
@@ -57,11 +280,55 @@ def run_scan(
     subnet: str | None = None,
     openvas_config: dict | None = None,
     progress_callback: Optional[Callable[[int], None]] = None,
+    finding_callback: Optional[Callable[[str, dict], None]] = None,
+    event_callback: Optional[Callable[[str, dict], None]] = None,
     auto_mode: bool = False,
+    max_parallel_servers: int | None = None,
+    ssh_backend: str = "paramiko",
+    check_mode: str = SCAN_CHECK_MODE,
+    reuse_connections: bool = True,
+    ssh_compression: bool = SSH_COMPRESSION,
+    bulk_compression: bool = SSH_BULK_COMPRESSION,
+    force: bool = False,
+    nmap_profile: str = NMAP_PROFILE,
+    preflight: bool = True,
+    nuclei_options: dict | None = None,
+    cancel: CancelToken | None = None,
 ) -> dict[str, Any]:
     """
     Run security scans. If auto_mode or tests empty, runs ALL tests and auto-derives URLs/subnet.
+    finding_callback(tool, record) receives findings while tools are still running (Nuclei).
+    event_callback(event, data) is called as each server ("server", its result plus "name")
+    and each network tool ("tool", its result plus "tool") finishes.
+    Servers are scanned concurrently, up to max_parallel_servers per job
+    (default SCAN_MAX_PARALLEL_SERVERS) and SCAN_GLOBAL_MAX_SERVERS process-wide.
+    Per-server checks and network tools are independent phases scheduled together.
+    ssh_backend: "paramiko" (thread per host) or "asyncssh" (one event loop for all hosts).
+    check_mode: how built-in checks are executed per host (see builtin.CHECK_MODES).
+    reuse_connections: paramiko backend only; keep connections in the shared ssh_pool between jobs.
+    ssh_compression: zlib transport compression; bulk_compression: gzip large outputs remotely.
+    force: re-run fingerprinted checks instead of reusing cached results (see cache.check_cache).
+    nmap_profile: timing/parallelism profile for the single multi-host Nmap run (nmap.NMAP_PROFILES).
+    preflight: TCP-probe SSH ports and URL endpoints first; unreachable hosts are marked
+    without an SSH connect attempt and dead URLs are not passed to Nikto/Nuclei.
+    nuclei_options: severity, concurrency, rate_limit, bulk_size passed to run_nuclei.
+    cancel: cancelling it stops the job cooperatively: SSH connections are aborted, tool
+    processes killed and phases not yet started skipped. Unfinished steps are marked
+    cancelled, partial results are kept and the job status is "cancelled".
     """
+    if ssh_backend not in SSH_BACKENDS:
+        raise ValueError(f"Unknown SSH backend: {ssh_backend}")
+    if check_mode not in CHECK_MODES:
+        raise ValueError(f"Unknown check mode: {check_mode}")
+    opts = ServerScanOptions(
+        check_mode=check_mode,
+        reuse_connections=reuse_connections,
+        ssh_compression=ssh_compression,
+        bulk_compression=bulk_compression,
+        force=force,
+    )
+    cancel = cancel or CancelToken()
+    derived_urls = not urls
     if auto_mode or not tests:
         tests = ALL_TESTS
         urls = urls or _derive_urls(servers)
@@ -77,6 +344,14 @@ def run_scan(
         "progress": 0,
     }
 
+    # Tools missing on this machine are reported up front and never scheduled
+    # (zmap is kept: it falls back to a connect scan)
+    for tool in ("vuls", "nikto", "nmap", "nuclei", "openvas"):
+        if tool in tests and not tool_registry.available(tool):
+            info = tool_registry.get(tool)
+            results["network_scans"][tool] = {"status": "n/a", "message": info.message or f"{tool} not available"}
+    tests = [t for t in tests if t not in results["network_scans"]]
+
     total_steps = 0
     done_steps = 0
 
@@ -97,90 +372,185 @@ def run_scan(
         total_steps += 1
     total_steps = max(total_steps, 1)
 
+    lock = threading.Lock()
+
     def update_progress():
         nonlocal done_steps
-        done_steps += 1
-        results["progress"] = int(100 * done_steps / total_steps)
+        with lock:
+            done_steps += 1
+            results["progress"] = int(100 * done_steps / total_steps)
+            progress = results["progress"]
         if progress_callback:
-            progress_callback(results["progress"])
+            progress_callback(progress)
+
+    def emit(event: str, data: dict[str, Any]) -> None:
+        if event_callback:
+            event_callback(event, data)
+
+    def set_network_result(tool: str, value: dict[str, Any]) -> None:
+        with lock:
+            results["network_scans"][tool] = value
+        emit("tool", {"tool": tool, **value})
 
     # Per-server scans
+    scan_targets = []
     for server in servers:
         host = server.get("host", "")
-        user = server.get("user", "ubuntu")
         name = server.get("name", host)
-        key_b64 = server.get("key_base64", "")
-        if not host or not key_b64:
+        if not host or not server.get("key_base64", ""):
             continue
+        results["servers"][name] = {"host": host, "user": server.get("user", "ubuntu"), "checks": {}, "lynis": None, "reachable": False}
+        scan_targets.append((name, server))
 
-        key_data = base64.b64decode(key_b64)
-        results["servers"][name] = {"host": host, "user": user, "checks": {}, "lynis": None, "reachable": False}
+    # Preflight: one concurrent TCP probe of every SSH port and web endpoint
+    unreachable_hosts: set[str] = set()
+    if preflight:
+        web_tools = {"nikto", "nuclei"} & set(tests)
+        ssh_targets = {(server["host"], SSH_PORT) for _, server in scan_targets}
+        if "vuls" in tests:
+            ssh_targets |= {(s["host"], SSH_PORT) for s in servers if s.get("host") and s.get("key_base64")}
+        url_targets = {u: url_target(u) for u in (urls or [])} if web_tools else {}
+        states = probe(list(ssh_targets) + list(url_targets.values()))
 
-        executor = SSHExecutor(host=host, user=user, key_data=key_data)
-        try:
-            ok, err = executor.connect()
-            if not ok:
-                results["servers"][name]["error"] = err or "SSH connection failed"
+        unreachable_hosts = {host for host, port in ssh_targets if states[(host, port)] != "open"}
+        for name, server in list(scan_targets):
+            if server["host"] in unreachable_hosts:
+                scan_targets.remove((name, server))
+                results["servers"][name]["error"] = (
+                    f"Host unreachable: SSH port {SSH_PORT} {states[(server['host'], SSH_PORT)]} in preflight probe"
+                )
+                emit("server", {"name": name, **results["servers"][name]})
                 update_progress()
-                continue
+        skipped_urls = [u for u, target in url_targets.items() if states[target] != "open"]
+        if web_tools:
+            urls = [u for u in urls or [] if u not in skipped_urls]
+        results["preflight"] = {
+            "probed": len(states),
+            "unreachable_hosts": sorted(unreachable_hosts),
+            "skipped_urls": skipped_urls,
+        }
 
-            results["servers"][name]["reachable"] = True
+    def merge_server_result(name: str, server_result: dict) -> None:
+        with lock:
+            merged = results["servers"][name] = {**results["servers"][name], **server_result}
+        emit("server", {"name": name, **merged})
 
-            # Built-in checks
-            builtin_tests = [t for t in tests if t in BUILTIN_TESTS]
-            if builtin_tests:
-                results["servers"][name]["checks"] = run_builtin_checks(executor, builtin_tests)
-                update_progress()
+    def servers_phase(_inputs: dict) -> None:
+        if ssh_backend == "asyncssh":
+            limit = max(1, max_parallel_servers or SCAN_MAX_ASYNC_SERVERS)
+            asyncio.run(_scan_servers_async(scan_targets, tests, limit, update_progress, merge_server_result, opts, cancel))
+            return
+        workers = max(1, min(max_parallel_servers or SCAN_MAX_PARALLEL_SERVERS, len(scan_targets)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scan-server") as pool:
+            futures = {
+                pool.submit(_scan_server, server, tests, update_progress, opts, cancel): name
+                for name, server in scan_targets
+            }
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    server_result = future.result()
+                except Exception as e:
+                    server_result = {"error": str(e)}
+                    update_progress()
+                merge_server_result(name, server_result)
 
-            # Lynis
-            if "lynis" in tests:
-                results["servers"][name]["lynis"] = run_lynis(executor)
-                update_progress()
-        finally:
-            executor.close()
-
-    # Vuls (all servers) - use first server's key
-    if "vuls" in tests and servers:
-        key_b64 = next((s.get("key_base64") for s in servers if s.get("key_base64")), "")
-        if key_b64:
-            key_data = base64.b64decode(key_b64)
-            vuls_servers = [{"host": s["host"], "user": s.get("user", "ubuntu"), "name": s.get("name", s["host"])} for s in servers if s.get("host") and s.get("key_base64")]
-            if vuls_servers:
-                with tempfile.TemporaryDirectory() as tmp:
-                    results["network_scans"]["vuls"] = run_vuls(vuls_servers, key_data, tmp)
+    # Vuls (all servers, each with its own key)
+    def vuls_phase(_inputs: dict) -> None:
+        vuls_servers = [
+            {
+                "host": s["host"],
+                "user": s.get("user", "ubuntu"),
+                "name": s.get("name", s["host"]),
+                "key_data": base64.b64decode(s["key_base64"]),
+            }
+            for s in servers
+            if s.get("host") and s.get("key_base64") and s["host"] not in unreachable_hosts
+        ]
+        if vuls_servers:
+            with tempfile.TemporaryDirectory() as tmp:
+                set_network_result("vuls", run_vuls(vuls_servers, tmp, cancel=cancel))
         update_progress()
 
-    # Nikto
-    if "nikto" in tests and urls:
-        results["network_scans"]["nikto"] = run_nikto(urls)
+    def nikto_phase(inputs: dict) -> None:
+        # Derived URLs guess http and https for every host; skip ports known to be closed
+        targets, skipped = urls, []
+        if derived_urls:
+            with lock:
+                known = _known_open_ports(results["servers"], inputs.get("nmap"))
+            targets, skipped = prune_urls(urls, known)
+        nikto_result = run_nikto(targets, cancel=cancel)
+        if skipped:
+            nikto_result["skipped_urls"] = skipped
+        set_network_result("nikto", nikto_result)
         update_progress()
 
-    # ZMap
-    if "zmap" in tests and subnet:
-        results["network_scans"]["zmap"] = run_zmap(subnet)
+    def zmap_phase(_inputs: dict) -> None:
+        set_network_result("zmap", run_zmap(subnet, cancel=cancel))
         update_progress()
 
-    # Nmap
-    if "nmap" in tests and servers:
+    def nmap_phase(_inputs: dict) -> dict | None:
         hosts = [s.get("host", "").strip() for s in servers if s.get("host", "").strip()]
+        nmap_result = None
         if hosts:
-            results["network_scans"]["nmap"] = run_nmap(hosts)
+            nmap_result = run_nmap(hosts, profile=nmap_profile, cancel=cancel)
+            set_network_result("nmap", nmap_result)
         update_progress()
+        return nmap_result
 
-    # Nuclei
-    if "nuclei" in tests and urls:
-        results["network_scans"]["nuclei"] = run_nuclei(urls)
+    def nuclei_phase(_inputs: dict) -> None:
+        on_finding = (lambda record: finding_callback("nuclei", record)) if finding_callback else None
+        set_network_result("nuclei", run_nuclei(urls, on_finding=on_finding, cancel=cancel, **(nuclei_options or {})))
         update_progress()
 
-    # OpenVAS
-    if "openvas" in tests and openvas_config:
-        results["network_scans"]["openvas"] = run_openvas(
+    def openvas_phase(_inputs: dict) -> None:
+        set_network_result("openvas", run_openvas(
             host=openvas_config.get("host", ""),
             api_key=openvas_config.get("api_key", ""),
             targets=openvas_config.get("targets", []),
-        )
+        ))
         update_progress()
 
-    results["status"] = "completed"
-    results["progress"] = 100
+    def unless_cancelled(name: str, fn: Callable[[dict], Any]) -> Callable[[dict], Any]:
+        """Skip a network phase that has not started by the time the job is cancelled."""
+        def run(inputs: dict) -> Any:
+            if cancel.cancelled:
+                set_network_result(name, {"status": "cancelled", "message": cancel.reason})
+                return None
+            return fn(inputs)
+        return run
+
+    # Independent phases run concurrently, limited per resource class (SCAN_PHASE_LIMITS)
+    tasks = []
+    if scan_targets:
+        tasks.append(Task("servers", servers_phase, resource="ssh"))
+    if "vuls" in tests and servers:
+        tasks.append(Task("vuls", unless_cancelled("vuls", vuls_phase), resource="ssh"))
+    if "nikto" in tests and urls:
+        # Waits for open-port data to prune URLs: Nmap if it runs, else the per-server checks
+        nikto_deps = ("nmap",) if "nmap" in tests else ("servers",) if "open_ports" in tests else ()
+        tasks.append(Task("nikto", unless_cancelled("nikto", nikto_phase), deps=nikto_deps if derived_urls else (), resource="network"))
+    if "zmap" in tests and subnet:
+        tasks.append(Task("zmap", unless_cancelled("zmap", zmap_phase), resource="network"))
+    if "nmap" in tests and servers:
+        tasks.append(Task("nmap", unless_cancelled("nmap", nmap_phase), resource="network"))
+    if "nuclei" in tests and urls:
+        tasks.append(Task("nuclei", unless_cancelled("nuclei", nuclei_phase), resource="cpu"))
+    if "openvas" in tests and openvas_config:
+        tasks.append(Task("openvas", unless_cancelled("openvas", openvas_phase), resource="network"))
+
+    _, errors = run_tasks(tasks, SCAN_PHASE_LIMITS)
+    for phase, e in errors.items():
+        if phase != "servers":
+            set_network_result(phase, {"status": "error", "message": str(e)})
+    # Phases finish in any order; keep report output stable
+    order = [t.name for t in tasks]
+    results["network_scans"] = dict(sorted(results["network_scans"].items(), key=lambda kv: order.index(kv[0]) if kv[0] in order else len(order)))
+
+    if cancel.cancelled:
+        results["status"] = "cancelled"
+        results["cancel_reason"] = cancel.reason
+    else:
+        results["status"] = "completed"
+        results["progress"] = 100
     return results
@@ -0,0 +1,185 @@
+"""Bounded output capture for remote commands and local tool processes."""
+
+import re
+import shlex
+import zlib
+from typing import Callable, Optional
+
+ChunkCallback = Callable[[str, bytes], None]
+
+
+class OutputBuffer:
+    """
+    Streaming capture that keeps at most max_bytes of a stream: the first half
+    (head) and the most recent half (tail). total counts every byte written.
+    max_bytes=None keeps everything.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes
+        self._head_limit = None if max_bytes is None else max_bytes // 2
+        self._tail_limit = None if max_bytes is None else max_bytes - max_bytes // 2
+        self._head = bytearray()
+        self._tail = bytearray()
+        self.total = 0
+
+    @property
+    def truncated(self) -> bool:
+        return self.max_bytes is not None and self.total > self.max_bytes
+
+    def write(self, chunk: bytes) -> None:
+        if not chunk:
+            return
+        self.total += len(chunk)
+        if self._head_limit is None:
+            self._head += chunk
+            return
+        room = self._head_limit - len(self._head)
+        if room > 0:
+            self._head += chunk[:room]
+            chunk = chunk[room:]
+        if chunk and self._tail_limit:
+            self._tail += chunk
+            excess = len(self._tail) - self._tail_limit
+            if excess > 0:
+                del self._tail[:excess]
+
+    def getvalue(self) -> bytes:
+        """Captured bytes; when truncated, head and tail are joined by a marker line."""
+        if not self.truncated:
+            return bytes(self._head + self._tail)
+        dropped = self.total - len(self._head) - len(self._tail)
+        return bytes(self._head) + f"\n... [{dropped} bytes truncated] ...\n".encode() + bytes(self._tail)
+
+    def text(self) -> str:
+        return self.getvalue().decode("utf-8", errors="replace")
+
+
+class StreamSink:
+    """
+    Receives raw chunks of one stream from the wire. With gunzip=True, a stream
+    that starts with the gzip magic is decompressed on the fly (anything else is
+    passed through). Decoded data goes to the OutputBuffer and on_chunk.
+    """
+
+    _GZIP_MAGIC = b"\x1f\x8b"
+
+    def __init__(
+        self,
+        name: str,
+        buf: OutputBuffer,
+        on_chunk: Optional[ChunkCallback] = None,
+        gunzip: bool = False,
+    ):
+        self.name = name
+        self.buf = buf
+        self.on_chunk = on_chunk
+        self.wire_bytes = 0
+        self._gunzip = gunzip
+        self._decoder = None
+        self._sniff = b""
+
+    def write(self, data: bytes) -> None:
+        self.wire_bytes += len(data)
+        if self._gunzip:
+            data = self._sniff + data
+            if len(data) < len(self._GZIP_MAGIC):
+                self._sniff = data
+                return
+            self._sniff = b""
+            self._gunzip = False
+            if data.startswith(self._GZIP_MAGIC):
+                self._decoder = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+        if self._decoder is not None:
+            data = self._decoder.decompress(data)
+        self._emit(data)
+
+    def close(self) -> None:
+        """Flush any sniffed or buffered decompressor output at end of stream."""
+        if self._sniff:
+            data, self._sniff = self._sniff, b""
+            self._emit(data)
+        if self._decoder is not None:
+            self._emit(self._decoder.flush())
+
+    def _emit(self, data: bytes) -> None:
+        if not data:
+            return
+        self.buf.write(data)
+        if self.on_chunk:
+            self.on_chunk(self.name, data)
+
+
+# Exit status of a gzip-wrapped command, appended to its stderr
+_RC_MARKER = "__SSS_RC="
+_RC_PATTERN = re.compile(rf"\n?{_RC_MARKER}(\d+)\n?$")
+
+
+def gzip_wrap(command: str) -> str:
+    """
+    Wrap command so its stdout is gzip-compressed on the remote host. The real exit
+    status is reported on stderr (see pop_exit_marker); without gzip the command runs as-is.
+    """
+    quoted = shlex.quote(command)
+    return (
+        f"if command -v gzip >/dev/null 2>&1; then "
+        f"{{ sh -c {quoted}; printf '\\n{_RC_MARKER}%d\\n' $? >&2; }} | gzip -1 -c; "
+        f"else sh -c {quoted}; fi"
+    )
+
+
+def pop_exit_marker(stderr: str) -> tuple[str, int | None]:
+    """Strip the gzip_wrap exit marker from stderr. Returns (stderr, exit_code or None)."""
+    m = _RC_PATTERN.search(stderr)
+    if not m:
+        return stderr, None
+    return stderr[: m.start()], int(m.group(1))
+
+
+def timeout_result(timeout: int, out: OutputBuffer, err: OutputBuffer) -> dict:
+    """Result for a command that exceeded its timeout; keeps whatever output arrived."""
+    return {
+        "success": False,
+        "stdout": out.text(),
+        "stderr": err.text(),
+        "exit_code": -1,
+        "error": f"Command timed out after {timeout}s",
+        "stdout_bytes": out.total,
+        "stderr_bytes": err.total,
+        "truncated": out.truncated or err.truncated,
+    }
+
+
+def cancelled_result(reason: str = "Cancelled") -> dict:
+    """Result for a command aborted because its scan job was cancelled."""
+    return {
+        "success": False,
+        "stdout": "",
+        "stderr": "",
+        "exit_code": -1,
+        "error": reason,
+        "cancelled": True,
+    }
+
+
+def command_result(exit_code: int, out_sink: StreamSink, err_sink: StreamSink, compress_output: bool) -> dict:
+    """Result for a finished command; shared by the sync and async executors."""
+    out, err = out_sink.buf, err_sink.buf
+    stderr = err.text()
+    if compress_output:
+        stderr, wrapped_code = pop_exit_marker(stderr)
+        if wrapped_code is not None:
+            exit_code = wrapped_code
+    result = {
+        "success": exit_code == 0,
+        "stdout": out.text(),
+        "stderr": stderr,
+        "exit_code": exit_code,
+        "error": None,
+        "stdout_bytes": out.total,
+        "stderr_bytes": err.total,
+        "truncated": out.truncated or err.truncated,
+    }
+    if compress_output:
+        result["wire_bytes"] = out_sink.wire_bytes + err_sink.wire_bytes
+    return result
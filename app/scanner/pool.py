@@ -0,0 +1,111 @@
+"""Process-wide pool of authenticated SSH connections reused across scan jobs."""
+
+import threading
+import time
+from collections import OrderedDict
+
+from app.core.config import SSH_COMPRESSION, SSH_POOL_IDLE_TIMEOUT, SSH_POOL_MAX_SIZE
+
+from .executor import SSHExecutor, key_digest
+
+PoolKey = tuple[str, int, str, str, bool]
+
+
+class SSHConnectionPool:
+    """
+    Idle SSHExecutor connections keyed by (host, port, user, key digest, compression).
+    acquire() hands out a connected executor (reusing a healthy idle one when
+    possible); release() returns it. Idle connections expire after idle_timeout
+    seconds and the least recently used are closed beyond max_size.
+    """
+
+    def __init__(self, max_size: int = SSH_POOL_MAX_SIZE, idle_timeout: int = SSH_POOL_IDLE_TIMEOUT):
+        self.max_size = max(0, max_size)
+        self.idle_timeout = idle_timeout
+        self._idle: "OrderedDict[PoolKey, tuple[SSHExecutor, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(executor: SSHExecutor) -> PoolKey:
+        return (executor.host, executor.port, executor.user, key_digest(executor.key_data), executor.compress)
+
+    def acquire(
+        self,
+        host: str,
+        user: str,
+        key_data: bytes,
+        port: int = 22,
+        timeout: int = 30,
+        compress: bool = SSH_COMPRESSION,
+    ) -> tuple[SSHExecutor | None, str | None]:
+        """Return (connected executor, None) or (None, error_message)."""
+        key = (host, port, user, key_digest(key_data), compress)
+        with self._lock:
+            entry = self._idle.pop(key, None)
+        if entry is not None:
+            executor, idle_since = entry
+            if time.monotonic() - idle_since <= self.idle_timeout and executor.is_alive():
+                executor.reused = True
+                return executor, None
+            executor.close()
+        return self._connect(host, user, key_data, port, timeout, compress)
+
+    def replace(self, executor: SSHExecutor) -> tuple[SSHExecutor | None, str | None]:
+        """Close a handed-out executor whose connection turned out dead and connect afresh."""
+        executor.close()
+        return self._connect(
+            executor.host, executor.user, executor.key_data, executor.port, executor.timeout, executor.compress
+        )
+
+    @staticmethod
+    def _connect(
+        host: str, user: str, key_data: bytes, port: int, timeout: int, compress: bool
+    ) -> tuple[SSHExecutor | None, str | None]:
+        executor = SSHExecutor(host=host, user=user, key_data=key_data, port=port, timeout=timeout, compress=compress)
+        ok, err = executor.connect()
+        if not ok:
+            return None, err or "SSH connection failed"
+        return executor, None
+
+    def release(self, executor: SSHExecutor, reusable: bool = True) -> None:
+        """Return an executor to the pool, or close it if unhealthy or not reusable."""
+        if not reusable or self.max_size == 0 or not executor.is_alive():
+            executor.close()
+            return
+        key = self._key(executor)
+        to_close = []
+        with self._lock:
+            previous = self._idle.pop(key, None)
+            if previous is not None:
+                to_close.append(previous[0])
+            self._idle[key] = (executor, time.monotonic())
+            while len(self._idle) > self.max_size:
+                to_close.append(self._idle.popitem(last=False)[1][0])
+        for stale in to_close:
+            stale.close()
+        self.evict_idle()
+
+    def evict_idle(self) -> int:
+        """Close idle connections older than idle_timeout. Returns how many were closed."""
+        cutoff = time.monotonic() - self.idle_timeout
+        with self._lock:
+            expired = [k for k, (_, idle_since) in self._idle.items() if idle_since < cutoff]
+            stale = [self._idle.pop(k)[0] for k in expired]
+        for executor in stale:
+            executor.close()
+        return len(stale)
+
+    def close_all(self) -> None:
+        """Close every idle connection."""
+        with self._lock:
+            stale = [executor for executor, _ in self._idle.values()]
+            self._idle.clear()
+        for executor in stale:
+            executor.close()
+
+    def __len__(self) -> int:
+        return len(self._idle)
+
+
+# Singleton pool shared by all scan jobs in this process
+ssh_pool = SSHConnectionPool()
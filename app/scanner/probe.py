@@ -0,0 +1,84 @@
+"""Asyncio TCP connect prober for fleet preflight (no external tools, no privileges)."""
+
+import asyncio
+import time
+from typing import Iterable, Optional
+
+from app.core.config import PROBE_CONCURRENCY, PROBE_TIMEOUT
+
+Target = tuple[str, int]
+
+# Probe outcomes: "open" (connected), "closed" (refused: host is up), "filtered"
+# (no answer within timeout), "error" (unresolvable, no route, ...)
+PROBE_STATES = ("open", "closed", "filtered", "error")
+
+
+class _RateLimiter:
+    """Spaces connection attempts to at most `rate` per second across all workers."""
+
+    def __init__(self, rate: float) -> None:
+        self.interval = 1.0 / rate
+        self._next = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+async def _probe_one(host: str, port: int, timeout: float) -> str:
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    except asyncio.TimeoutError:
+        return "filtered"
+    except ConnectionRefusedError:
+        return "closed"
+    except OSError:
+        return "error"
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+    return "open"
+
+
+async def probe_async(
+    targets: Iterable[Target],
+    timeout: float = PROBE_TIMEOUT,
+    concurrency: int = PROBE_CONCURRENCY,
+    rate: Optional[float] = None,
+) -> dict[Target, str]:
+    """
+    TCP-connect every (host, port) target, at most `concurrency` at a time, each
+    within `timeout` seconds, and (with rate) at most `rate` new connects per second.
+    Returns {(host, port): state} (see PROBE_STATES).
+    """
+    pending = list(dict.fromkeys(targets))
+    pending.reverse()
+    results: dict[Target, str] = {}
+    limiter = _RateLimiter(rate) if rate else None
+
+    async def worker() -> None:
+        while pending:
+            host, port = pending.pop()
+            if limiter:
+                await limiter.wait()
+            results[(host, port)] = await _probe_one(host, port, timeout)
+
+    await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, len(pending))))))
+    return results
+
+
+def probe(
+    targets: Iterable[Target],
+    timeout: float = PROBE_TIMEOUT,
+    concurrency: int = PROBE_CONCURRENCY,
+    rate: Optional[float] = None,
+) -> dict[Target, str]:
+    """Blocking wrapper around probe_async for threads without an event loop."""
+    return asyncio.run(probe_async(targets, timeout=timeout, concurrency=concurrency, rate=rate))
@@ -0,0 +1,264 @@
+"""Shared runner for local scan tool processes (nmap, nikto, zmap, nuclei, vuls)."""
+
+import asyncio
+import os
+import signal
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+from app.core.config import (
+    PROCESS_CPU_LIMIT,
+    PROCESS_MEMORY_LIMIT_MB,
+    PROCESS_OUTPUT_MAX_BYTES,
+    PROCESS_TOOL_LIMITS,
+)
+
+from .cancel import CancelToken
+from .output import OutputBuffer, cancelled_result
+
+# on_line(stream, line) gets each complete stdout/stderr line (without the newline)
+LineCallback = Callable[[str, bytes], None]
+
+_READ_CHUNK = 65536
+# Longest line passed to on_line; longer lines are cut
+_MAX_LINE = 4 * 1024 * 1024
+# Grace period between SIGTERM and SIGKILL for the process group
+_KILL_GRACE = 2.0
+
+
+class _Stopped(Exception):
+    """The job's cancel token fired while the process was running."""
+
+
+@dataclass(frozen=True)
+class ProcessLimits:
+    """Resource limits applied to the child (0 = unlimited)."""
+
+    cpu_seconds: int = PROCESS_CPU_LIMIT
+    memory_mb: int = PROCESS_MEMORY_LIMIT_MB
+
+
+class ProcessStats:
+    """Per-tool counters: runs, failures, timeouts, wall time and peak output size."""
+
+    def __init__(self) -> None:
+        self._stats: dict[str, dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, tool: str, result: dict) -> None:
+        output = result.get("stdout_bytes", 0) + result.get("stderr_bytes", 0)
+        with self._lock:
+            s = self._stats.setdefault(tool, {
+                "runs": 0, "failures": 0, "timeouts": 0, "cancelled": 0,
+                "total_ms": 0, "max_ms": 0, "peak_output_bytes": 0, "last_exit_code": None,
+            })
+            s["runs"] += 1
+            s["failures"] += 0 if result.get("success") else 1
+            s["timeouts"] += 1 if result.get("timed_out") else 0
+            s["cancelled"] += 1 if result.get("cancelled") else 0
+            s["total_ms"] += result.get("elapsed_ms", 0)
+            s["max_ms"] = max(s["max_ms"], result.get("elapsed_ms", 0))
+            s["peak_output_bytes"] = max(s["peak_output_bytes"], output)
+            s["last_exit_code"] = result.get("exit_code")
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        with self._lock:
+            return {tool: dict(s) for tool, s in self._stats.items()}
+
+
+process_stats = ProcessStats()
+
+# Process-wide cap on concurrent processes per tool, shared by every job and event loop
+_tool_slots: dict[str, threading.BoundedSemaphore] = {}
+_tool_slots_lock = threading.Lock()
+
+
+def _slots(tool: str) -> threading.BoundedSemaphore:
+    with _tool_slots_lock:
+        if tool not in _tool_slots:
+            limit = PROCESS_TOOL_LIMITS.get(tool, PROCESS_TOOL_LIMITS["default"])
+            _tool_slots[tool] = threading.BoundedSemaphore(max(1, limit))
+        return _tool_slots[tool]
+
+
+def _preexec(limits: ProcessLimits) -> Optional[Callable[[], None]]:
+    """rlimit setter run in the child before exec (None when unlimited)."""
+    if not limits.cpu_seconds and not limits.memory_mb:
+        return None
+
+    def apply() -> None:
+        import resource
+        if limits.cpu_seconds:
+            resource.setrlimit(resource.RLIMIT_CPU, (limits.cpu_seconds, limits.cpu_seconds))
+        if limits.memory_mb:
+            size = limits.memory_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (size, size))
+
+    return apply
+
+
+async def _kill_group(proc: asyncio.subprocess.Process) -> None:
+    """SIGTERM the whole process group, then SIGKILL whatever is left after a grace period."""
+    for sig in (signal.SIGTERM, signal.SIGKILL):
+        try:
+            os.killpg(proc.pid, sig)
+        except (ProcessLookupError, PermissionError):
+            return
+        try:
+            await asyncio.wait_for(proc.wait(), _KILL_GRACE)
+            # The leader is gone; make sure no grandchild keeps running
+            if sig == signal.SIGTERM:
+                continue
+            return
+        except asyncio.TimeoutError:
+            continue
+
+
+async def _pump(reader: asyncio.StreamReader, name: str, buf: OutputBuffer, on_line: Optional[LineCallback]) -> None:
+    """Copy a pipe into buf, splitting complete lines out to on_line."""
+    partial = b""
+    while True:
+        data = await reader.read(_READ_CHUNK)
+        if not data:
+            break
+        buf.write(data)
+        if on_line is None:
+            continue
+        lines = (partial + data).split(b"\n")
+        partial = lines.pop()
+        if len(partial) > _MAX_LINE:
+            lines.append(partial[:_MAX_LINE])
+            partial = b""
+        for line in lines:
+            on_line(name, line)
+    if on_line is not None and partial:
+        on_line(name, partial)
+
+
+async def run_process_async(
+    argv: list[str],
+    tool: str,
+    timeout: float,
+    stdin: Optional[bytes] = None,
+    cwd: Optional[str] = None,
+    max_bytes: Optional[int] = PROCESS_OUTPUT_MAX_BYTES,
+    on_line: Optional[LineCallback] = None,
+    limits: ProcessLimits = ProcessLimits(),
+    cancel: Optional[CancelToken] = None,
+) -> dict:
+    """
+    Run a local tool in its own process group and wait for it.
+    stdout/stderr are streamed: lines go to on_line as they arrive and at most
+    max_bytes (head + tail) of each stream is kept. On timeout, cancellation of
+    the awaiting task or of the cancel token the whole process group is killed
+    and the output gathered so far is returned. At most PROCESS_TOOL_LIMITS[tool]
+    processes of a tool run at once across the process.
+    Returns dict with: success, stdout, stderr, exit_code, error, stdout_bytes,
+    stderr_bytes, truncated, elapsed_ms, timed_out, cancelled
+    """
+    slots = _slots(tool)
+    # Shared with threads and other event loops, so poll instead of blocking the loop
+    while not slots.acquire(blocking=False):
+        if cancel is not None and cancel.cancelled:
+            # Same shape as a run that was stopped, so callers can read every key
+            return {
+                **cancelled_result(cancel.reason or "Cancelled"),
+                "timed_out": False,
+                "stdout_bytes": 0,
+                "stderr_bytes": 0,
+                "truncated": False,
+                "elapsed_ms": 0,
+            }
+        await asyncio.sleep(0.05)
+
+    out, err = OutputBuffer(max_bytes), OutputBuffer(max_bytes)
+    start = time.monotonic()
+    result: dict[str, Any] = {"exit_code": -1, "error": None, "timed_out": False, "cancelled": False}
+    proc = None
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    handle = cancel.on_cancel(lambda: loop.call_soon_threadsafe(stop.set)) if cancel is not None else None
+    try:
+        if cancel is not None and cancel.cancelled:
+            raise _Stopped
+        proc = await asyncio.create_subprocess_exec(
+            *argv,
+            stdin=asyncio.subprocess.PIPE if stdin is not None else asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=cwd,
+            start_new_session=True,
+            preexec_fn=_preexec(limits),
+        )
+
+        async def feed() -> None:
+            if stdin is not None:
+                try:
+                    proc.stdin.write(stdin)
+                    await proc.stdin.drain()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                proc.stdin.close()
+
+        async def collect() -> int:
+            await asyncio.gather(
+                feed(),
+                _pump(proc.stdout, "stdout", out, on_line),
+                _pump(proc.stderr, "stderr", err, on_line),
+            )
+            return await proc.wait()
+
+        collector = asyncio.ensure_future(collect())
+        stopper = asyncio.ensure_future(stop.wait())
+        try:
+            await asyncio.wait({collector, stopper}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            stopper.cancel()
+        if collector.done():
+            result["exit_code"] = collector.result()
+        else:
+            await _kill_group(proc)
+            # Pipes are closed once the group is gone; keep the output read so far
+            try:
+                await asyncio.wait_for(collector, _KILL_GRACE)
+            except (asyncio.TimeoutError, Exception):
+                collector.cancel()
+            if cancel is not None and cancel.cancelled:
+                raise _Stopped
+            result["timed_out"] = True
+            result["error"] = f"Command timed out after {timeout}s"
+    except _Stopped:
+        result["cancelled"] = True
+        result["error"] = cancel.reason or "Cancelled"
+    except asyncio.CancelledError:
+        if proc is not None:
+            await asyncio.shield(_kill_group(proc))
+        result["cancelled"] = True
+        result["error"] = "Cancelled"
+        raise
+    except Exception as e:
+        if proc is not None and proc.returncode is None:
+            await _kill_group(proc)
+        result["error"] = str(e)
+    finally:
+        if cancel is not None:
+            cancel.remove(handle)
+        slots.release()
+        result.update({
+            "success": result["exit_code"] == 0 and not result["error"],
+            "stdout": out.text(),
+            "stderr": err.text(),
+            "stdout_bytes": out.total,
+            "stderr_bytes": err.total,
+            "truncated": out.truncated or err.truncated,
+            "elapsed_ms": int((time.monotonic() - start) * 1000),
+        })
+        process_stats.record(tool, result)
+    return result
+
+
+def run_process(argv: list[str], tool: str, timeout: float, **kwargs: Any) -> dict:
+    """Blocking wrapper around run_process_async for threads without an event loop."""
+    return asyncio.run(run_process_async(argv, tool, timeout, **kwargs))
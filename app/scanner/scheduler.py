@@ -0,0 +1,90 @@
+"""Dependency-aware scheduler for scan phases."""
+
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable
+
+RESOURCE_CLASSES = ("cpu", "network", "ssh")
+
+
+@dataclass
+class Task:
+    """
+    A scan phase node.
+    fn receives a dict of {dep_name: dep_output} and returns this node's output.
+    deps naming tasks that are not scheduled are ignored.
+    resource: "cpu" (local compute), "network" (local tool probing targets), "ssh" (remote sessions).
+    """
+
+    name: str
+    fn: Callable[[dict[str, Any]], Any]
+    deps: tuple[str, ...] = ()
+    resource: str = "network"
+
+
+def run_tasks(
+    tasks: list[Task], limits: dict[str, int]
+) -> tuple[dict[str, Any], dict[str, Exception]]:
+    """
+    Run tasks as soon as their dependencies finish, honouring per-resource-class limits.
+    Returns (outputs, errors) keyed by task name. A task that raises gets None as
+    output and its exception in errors; dependents still run.
+    """
+    by_name = {t.name: t for t in tasks}
+    if len(by_name) != len(tasks):
+        raise ValueError("Duplicate task names")
+    for t in tasks:
+        if t.resource not in RESOURCE_CLASSES:
+            raise ValueError(f"Unknown resource class: {t.resource}")
+    deps = {t.name: [d for d in t.deps if d in by_name] for t in tasks}
+    _check_acyclic(deps)
+
+    outputs: dict[str, Any] = {}
+    errors: dict[str, Exception] = {}
+    pending = [t.name for t in tasks]
+    running: dict[Future, Task] = {}
+    in_use = {r: 0 for r in RESOURCE_CLASSES}
+
+    max_workers = max(1, sum(max(1, limits.get(r, 1)) for r in RESOURCE_CLASSES))
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scan-phase") as pool:
+        while pending or running:
+            for name in list(pending):
+                task = by_name[name]
+                if any(d not in outputs for d in deps[name]):
+                    continue
+                if in_use[task.resource] >= max(1, limits.get(task.resource, 1)):
+                    continue
+                pending.remove(name)
+                in_use[task.resource] += 1
+                inputs = {d: outputs[d] for d in deps[name]}
+                running[pool.submit(task.fn, inputs)] = task
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                task = running.pop(future)
+                in_use[task.resource] -= 1
+                try:
+                    outputs[task.name] = future.result()
+                except Exception as e:
+                    outputs[task.name] = None
+                    errors[task.name] = e
+
+    return outputs, errors
+
+
+def _check_acyclic(deps: dict[str, list[str]]) -> None:
+    """Raise ValueError if the dependency graph has a cycle."""
+    state: dict[str, int] = {}
+
+    def visit(name: str) -> None:
+        if state.get(name) == 1:
+            raise ValueError(f"Dependency cycle at task: {name}")
+        if state.get(name) == 2:
+            return
+        state[name] = 1
+        for d in deps[name]:
+            visit(d)
+        state[name] = 2
+
+    for name in deps:
+        visit(name)
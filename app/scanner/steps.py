@@ -0,0 +1,37 @@
+"""Drive executor-agnostic step generators with a sync or an async executor."""
+
+from typing import Any, Callable, Generator
+
+# A plan yields zero-argument callables that make one executor call, is sent each
+# call's result (or has its exception thrown in) and returns its own result
+Steps = Generator[Callable[[], Any], Any, Any]
+
+
+def drive(steps: Steps) -> Any:
+    """Run a plan against a blocking executor."""
+    try:
+        call = next(steps)
+        while True:
+            try:
+                result = call()
+            except Exception as e:
+                call = steps.throw(e)
+            else:
+                call = steps.send(result)
+    except StopIteration as done:
+        return done.value
+
+
+async def drive_async(steps: Steps) -> Any:
+    """Run a plan against an async executor (each call returns an awaitable)."""
+    try:
+        call = next(steps)
+        while True:
+            try:
+                result = await call()
+            except Exception as e:
+                call = steps.throw(e)
+            else:
+                call = steps.send(result)
+    except StopIteration as done:
+        return done.value
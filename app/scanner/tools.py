@@ -0,0 +1,144 @@
+"""Registry of external scan tools: binaries, versions and capabilities, detected once and cached."""
+
+import importlib.util
+import os
+import re
+import shutil
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from app.core.config import TOOLS_REFRESH_TTL
+
+from .process import run_process
+
+# binary and version arguments per tool; "module" tools are Python packages
+TOOL_SPECS: dict[str, dict[str, Any]] = {
+    "nmap": {"binary": "nmap", "version_args": ["--version"]},
+    "nikto": {"binary": "nikto", "version_args": ["-Version"]},
+    "zmap": {"binary": "zmap", "version_args": ["--version"]},
+    "nuclei": {"binary": "nuclei", "version_args": ["-version"]},
+    "vuls": {"binary": "vuls", "version_args": ["version"]},
+    "openvas": {"module": "gvm"},
+}
+_VERSION_TIMEOUT = 5
+_NUCLEI_TEMPLATE_DIRS = ("nuclei-templates", ".local/nuclei-templates")
+
+
+@dataclass
+class ToolInfo:
+    """Detected state of one tool."""
+
+    name: str
+    available: bool = False
+    path: str | None = None
+    version: str | None = None
+    capabilities: dict[str, Any] = field(default_factory=dict)
+    message: str | None = None
+    checked_at: str = ""
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+def _version_line(binary: str, args: list[str]) -> tuple[bool, str | None]:
+    """Run the version command; (ran ok, first line mentioning a version)."""
+    r = run_process([binary, *args], "registry", _VERSION_TIMEOUT, max_bytes=4096)
+    if r["error"]:
+        return False, None
+    lines = [l.strip() for l in (r["stdout"] + "\n" + r["stderr"]).splitlines() if l.strip()]
+    line = next((l for l in lines if re.search(r"\d+\.\d+", l)), lines[0] if lines else None)
+    return r["success"], line
+
+
+def _major(version: str | None) -> int | None:
+    m = re.search(r"(\d+)\.\d+", version or "")
+    return int(m.group(1)) if m else None
+
+
+def _zmap_capabilities(path: str, version: str | None) -> dict[str, Any]:
+    raw = os.geteuid() == 0 if hasattr(os, "geteuid") else False
+    if not raw and shutil.which("getcap"):
+        r = run_process(["getcap", path], "registry", _VERSION_TIMEOUT, max_bytes=4096)
+        raw = "cap_net_raw" in r["stdout"]
+    major = _major(version)
+    # ZMap 4 scans several target ports in one sweep
+    return {"raw_socket": raw, "multi_port": major is not None and major >= 4}
+
+
+def _nuclei_capabilities() -> dict[str, Any]:
+    candidates = [os.environ.get("NUCLEI_TEMPLATES_DIR", "")]
+    candidates += [str(Path.home() / d) for d in _NUCLEI_TEMPLATE_DIRS]
+    templates = next((d for d in candidates if d and Path(d).is_dir()), None)
+    return {"templates": templates is not None, "templates_dir": templates}
+
+
+def detect_tool(name: str) -> ToolInfo:
+    """Probe one tool now (binary lookup, version, capabilities)."""
+    spec = TOOL_SPECS[name]
+    info = ToolInfo(name=name, checked_at=datetime.utcnow().isoformat())
+    if "module" in spec:
+        info.available = importlib.util.find_spec(spec["module"]) is not None
+        if not info.available:
+            info.message = f"python-{spec['module']} not installed"
+        return info
+
+    path = shutil.which(spec["binary"])
+    if path is None:
+        info.message = f"{name} not installed"
+        return info
+    info.path = path
+    ok, info.version = _version_line(path, spec["version_args"])
+    info.available = ok
+    if not ok:
+        info.message = f"{name} found at {path} but its version check failed"
+    elif name == "zmap":
+        info.capabilities = _zmap_capabilities(path, info.version)
+    elif name == "nuclei":
+        info.capabilities = _nuclei_capabilities()
+    return info
+
+
+class ToolRegistry:
+    """
+    Cached ToolInfo per tool. Entries older than ttl seconds are re-detected on
+    access; refresh() re-detects on demand.
+    """
+
+    def __init__(self, ttl: int = TOOLS_REFRESH_TTL):
+        self.ttl = ttl
+        self._tools: dict[str, tuple[ToolInfo, float]] = {}
+        self._lock = threading.Lock()
+
+    def refresh(self, names: list[str] | None = None) -> dict[str, dict[str, Any]]:
+        """Re-detect the given tools (default all). Returns their snapshots."""
+        names = [n for n in (names or TOOL_SPECS) if n in TOOL_SPECS]
+        detected = {name: detect_tool(name) for name in names}
+        now = time.monotonic()
+        with self._lock:
+            for name, info in detected.items():
+                self._tools[name] = (info, now)
+        return {name: info.to_dict() for name, info in detected.items()}
+
+    def get(self, name: str) -> ToolInfo:
+        with self._lock:
+            entry = self._tools.get(name)
+        if entry is None or time.monotonic() - entry[1] > self.ttl:
+            self.refresh([name])
+            with self._lock:
+                entry = self._tools[name]
+        return entry[0]
+
+    def available(self, name: str) -> bool:
+        return self.get(name).available
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        """Every tool's current info (stale entries are refreshed first)."""
+        return {name: self.get(name).to_dict() for name in TOOL_SPECS}
+
+
+# Singleton registry shared by all scan jobs in this process
+tool_registry = ToolRegistry()
@@ -1,68 +1,232 @@
 """Vuls CVE scanner integration."""
 
+import asyncio
 import json
 import os
-import subprocess
-import tempfile
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterable, Optional
 
-from .executor import SSHExecutor
+from app.core.config import VULS_MAX_PACKAGES, VULS_MAX_PARALLEL, VULS_TIMEOUT
+
+from .cancel import CancelToken
+from .process import run_process_async
+from .tools import tool_registry
+
+_HEADER_KEYS = ("serverName", "family", "release")
+
+
+def _safe_name(name: str, i: int) -> str:
+    return "".join(c if c.isalnum() or c in "-_" else "_" for c in name) or f"server{i}"
+
+
+def _cvss(cve: dict) -> float:
+    """Highest CVSS (v3, else v2) score across all sources of one scannedCves entry."""
+    best = 0.0
+    for contents in (cve.get("cveContents") or {}).values():
+        for c in contents or []:
+            score = c.get("cvss3Score") or c.get("cvss2Score") or 0
+            best = max(best, float(score))
+    return best
+
+
+def _severity(score: float) -> str:
+    if score >= 9.0:
+        return "critical"
+    if score >= 7.0:
+        return "high"
+    if score >= 4.0:
+        return "medium"
+    return "low" if score > 0 else "unknown"
+
+
+def _summarize(header: dict, cves: Iterable[tuple[str, dict]], packages: Iterable[tuple[str, dict]]) -> dict[str, Any]:
+    """
+    Reduce one Vuls result to per-package CVE counts, max CVSS and fixed-in version.
+    cves/packages are consumed one item at a time.
+    """
+    by_package: dict[str, dict[str, Any]] = {}
+    severities: dict[str, int] = {}
+    cve_count = 0
+    for cve_id, cve in cves:
+        cve_count += 1
+        score = _cvss(cve)
+        sev = _severity(score)
+        severities[sev] = severities.get(sev, 0) + 1
+        for affected in cve.get("affectedPackages") or []:
+            pkg = by_package.setdefault(
+                affected.get("name", ""), {"name": affected.get("name", ""), "cves": 0, "max_cvss": 0.0, "top_cves": []}
+            )
+            pkg["cves"] += 1
+            if affected.get("fixedIn"):
+                pkg["fixed_in"] = affected["fixedIn"]
+            if affected.get("notFixedYet"):
+                pkg["not_fixed_yet"] = True
+            pkg["max_cvss"] = max(pkg["max_cvss"], score)
+            # Keep the five highest-scored CVE ids per package
+            pkg["top_cves"] = sorted(pkg["top_cves"] + [(score, cve_id)], reverse=True)[:5]
+
+    for name, info in packages:
+        if name in by_package:
+            by_package[name]["version"] = "-".join(v for v in (info.get("version"), info.get("release")) if v)
+            if info.get("newVersion"):
+                by_package[name]["new_version"] = info["newVersion"]
+
+    ranked = sorted(by_package.values(), key=lambda p: (p["max_cvss"], p["cves"]), reverse=True)
+    for pkg in ranked:
+        pkg["top_cves"] = [cve_id for _, cve_id in pkg["top_cves"]]
+    lines = [
+        " ".join(filter(None, (p["name"], p.get("version")))) + f": {p['cves']} CVE(s), max CVSS {p['max_cvss']:.1f}"
+        for p in ranked[:20]
+    ]
+    return {
+        "server_name": header.get("serverName", ""),
+        "family": header.get("family", ""),
+        "release": header.get("release", ""),
+        "cve_count": cve_count,
+        "severity_counts": severities,
+        "package_count": len(ranked),
+        "packages": ranked[:VULS_MAX_PACKAGES],
+        "output": "\n".join(lines) or "No CVEs found",
+    }
+
+
+def _read_result(path: Path) -> dict[str, Any]:
+    """Summarize one result file, streaming it with ijson when installed."""
+    try:
+        import ijson
+    except ImportError:
+        ijson = None
+
+    if ijson is None:
+        with open(path) as f:
+            data = json.load(f)
+        return _summarize(data, data.get("scannedCves", {}).items(), data.get("packages", {}).items())
+
+    header: dict[str, Any] = {}
+    with open(path, "rb") as f:
+        for prefix, event, value in ijson.parse(f):
+            if prefix in _HEADER_KEYS and event == "string":
+                header[prefix] = value
+    with open(path, "rb") as cves_f, open(path, "rb") as pkgs_f:
+        return _summarize(
+            header,
+            ijson.kvitems(cves_f, "scannedCves", use_float=True),
+            ijson.kvitems(pkgs_f, "packages", use_float=True),
+        )
+
+
+def _latest_results(results_dir: Path) -> dict[str, Path]:
+    """Newest <server>.json per server anywhere under results/ (timestamped dirs)."""
+    latest: dict[str, Path] = {}
+    for path in results_dir.rglob("*.json"):
+        if "current" in path.parts or path.stem.endswith("_diff"):
+            continue
+        if path.stem not in latest or path.stat().st_mtime > latest[path.stem].stat().st_mtime:
+            latest[path.stem] = path
+    return latest
+
+
+async def _scan_one(config_path: Path, name: str, work_dir: str, cancel: Optional[CancelToken]) -> str | None:
+    """Run `vuls scan` for one configured server. Returns an error message or None."""
+    r = await run_process_async(
+        ["vuls", "scan", "-config", str(config_path), name],
+        "vuls",
+        VULS_TIMEOUT,
+        cwd=work_dir,
+        max_bytes=4096,
+        cancel=cancel,
+    )
+    if r.get("cancelled"):
+        return r["error"]
+    if r["timed_out"]:
+        return f"Scan timed out after {VULS_TIMEOUT}s"
+    if r["error"]:
+        return r["error"]
+    if r["exit_code"] != 0:
+        err = (r["stderr"] or r["stdout"]).strip()
+        return err[-300:] or f"vuls exited with {r['exit_code']}"
+    return None
+
+
+async def _scan_all(
+    config_path: Path, names: list[str], work_dir: str, max_parallel: int, cancel: Optional[CancelToken]
+) -> list[str | None]:
+    slots = asyncio.Semaphore(max(1, max_parallel))
+
+    async def scan(name: str) -> str | None:
+        async with slots:
+            return await _scan_one(config_path, name, work_dir, cancel)
+
+    return await asyncio.gather(*(scan(n) for n in names))
 
 
 def run_vuls(
-    servers: list[dict], key_data: bytes, work_dir: str
+    servers: list[dict],
+    work_dir: str,
+    max_parallel: int = VULS_MAX_PARALLEL,
+    cancel: Optional[CancelToken] = None,
 ) -> dict[str, Any]:
     """
     Run Vuls scan. Requires vuls binary and CVE DB.
-    servers: [{host, user, name?}]
-    Returns results per server or error if vuls not available.
+    servers: [{host, user, key_data, name?}]; each server uses its own key.
+    Up to max_parallel `vuls scan` processes run at once (one per server). Every
+    server's result file is read incrementally and reduced to a per-package
+    CVE summary. Returns results per server or error if vuls not available.
+    Cancelling kills the running scans; results already written are still read.
     """
-    try:
-        subprocess.run(["vuls", "version"], capture_output=True, check=True, timeout=5)
-    except (subprocess.CalledProcessError, FileNotFoundError, subprocess.TimeoutExpired):
+    if not tool_registry.available("vuls"):
         return {"status": "n/a", "message": "Vuls not installed or CVE DB not initialized"}
 
-    with tempfile.NamedTemporaryFile(mode="wb", suffix=".pem", delete=False) as f:
-        f.write(key_data)
-        key_path = f.name
-
     try:
+        key_dir = Path(work_dir) / "keys"
+        key_dir.mkdir(mode=0o700, exist_ok=True)
+        named = []
+        seen = set()
+        for i, s in enumerate(servers):
+            name = _safe_name(s.get("name") or f"server{i}", i)
+            if name in seen:
+                name = f"{name}_{i}"
+            seen.add(name)
+            key_path = key_dir / f"{name}.pem"
+            fd = os.open(key_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "wb") as f:
+                f.write(s["key_data"])
+            named.append((name, s, key_path))
+
         config_path = Path(work_dir) / "vuls_config.toml"
-        config = _build_vuls_config(servers, key_path)
-        config_path.write_text(config)
-
-        result = subprocess.run(
-            ["vuls", "scan", "-config", str(config_path)],
-            capture_output=True,
-            timeout=600,
-            cwd=work_dir,
-        )
+        config_path.write_text(_build_vuls_config(named))
 
-        report_path = Path(work_dir) / "results"
-        if report_path.exists():
-            json_files = list(report_path.glob("*.json"))
-            if json_files:
-                with open(json_files[0]) as jf:
-                    data = json.load(jf)
-                return {"status": "info", "data": data, "scanned": True}
-        return {"status": "info", "message": "Vuls scan completed", "stdout": result.stdout.decode()[:500] if result.stdout else ""}
+        names = [name for name, _, _ in named]
+        errors = dict(zip(names, asyncio.run(_scan_all(config_path, names, work_dir, max_parallel, cancel))))
+
+        files = _latest_results(Path(work_dir) / "results")
+        results = []
+        for name, s, _ in named:
+            if name in files:
+                try:
+                    summary = _read_result(files[name])
+                except Exception as e:
+                    summary = {"output": f"Could not read result: {e}"}
+            else:
+                summary = {"output": errors.get(name) or "No result file produced"}
+            results.append({**summary, "host": s.get("host", ""), "name": name, "success": name in files})
     except Exception as e:
         return {"status": "error", "message": str(e)}
-    finally:
-        try:
-            os.unlink(key_path)
-        except OSError:
-            pass
+
+    total = sum(r.get("cve_count", 0) for r in results)
+    scanned = sum(1 for r in results if r["success"])
+    return {
+        "status": "cancelled" if cancel is not None and cancel.cancelled else "info",
+        "message": f"{total} CVE(s) across {scanned}/{len(results)} server(s)",
+        "scanned": scanned > 0,
+        "results": results,
+    }
 
 
-def _build_vuls_config(servers: list[dict], key_path: str) -> str:
+def _build_vuls_config(named: list[tuple[str, dict, Path]]) -> str:
     lines = ['[default]\nscanMode = ["fast"]\n']
-    for i, s in enumerate(servers):
+    for name, s, key_path in named:
         host = s.get("host", "")
         user = s.get("user", "root")
-        name = "".join(c if c.isalnum() or c in "-_" else "_" for c in (s.get("name") or f"server{i}"))
-        if not name:
-            name = f"server{i}"
         lines.append(f'[servers.{name}]\nhost = "{host}"\nuser = "{user}"\nkeyPath = "{key_path}"\n')
     return "\n".join(lines)
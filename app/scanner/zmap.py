@@ -1,36 +1,147 @@
-"""ZMap subnet/port scanner."""
+"""ZMap subnet/port scanner, with an unprivileged asyncio connect-scan fallback."""
 
-import subprocess
-from typing import Any
+import ipaddress
+from typing import Any, Optional
 
+from app.core.config import (
+    ZMAP_FALLBACK_MAX_HOSTS,
+    ZMAP_FALLBACK_RATE,
+    ZMAP_MAX_IPS_PER_PORT,
+    ZMAP_RATE,
+    ZMAP_TIMEOUT,
+)
 
-def run_zmap(subnet: str, ports: str = "22,80,443") -> dict[str, Any]:
+from .cancel import CancelToken
+from .probe import probe
+from .process import run_process
+from .tools import tool_registry
+
+
+def _port_list(ports: str) -> list[str]:
+    return [p.strip() for p in ports.split(",") if p.strip().isdigit()]
+
+
+def _result(subnet: str, found: dict[str, list[str]], method: str, max_ips: int, **extra: Any) -> dict[str, Any]:
+    """Common result shape: ports -> responsive IPs (capped at max_ips), plus full counts."""
+    return {
+        "status": "info",
+        "subnet": subnet,
+        "method": method,
+        "ports": {port: ips[:max_ips] for port, ips in found.items()},
+        "counts": {port: len(ips) for port, ips in found.items()},
+        **extra,
+    }
+
+
+def _run_zmap_pass(
+    subnet: str, ports: list[str], cancel: Optional[CancelToken] = None
+) -> tuple[dict[str, list[str]] | None, str]:
+    """
+    One ZMap sweep over all ports. Returns (ports -> ips, "") or (None, reason) if
+    ZMap can't run; a cancelled sweep returns the ips found so far with the reason.
+    """
+    found: dict[str, dict[str, None]] = {port: {} for port in ports}
+
+    def on_line(stream: str, line: bytes) -> None:
+        if stream == "stdout":
+            ip, _, port = line.decode("utf-8", errors="replace").strip().partition(",")
+            if port in found:
+                found[port][ip] = None
+
+    r = run_process(
+        [
+            "zmap", "-p", ",".join(ports), "-r", str(ZMAP_RATE),
+            "-O", "csv", "-f", "saddr,sport", "-o", "-", subnet,
+        ],
+        "zmap",
+        ZMAP_TIMEOUT,
+        max_bytes=4096,
+        on_line=on_line,
+        cancel=cancel,
+    )
+    if r["cancelled"]:
+        return {port: list(ips) for port, ips in found.items()}, r["error"]
+    if r["timed_out"]:
+        return None, f"ZMap timed out after {ZMAP_TIMEOUT}s"
+    if r["error"]:
+        return None, r["error"]
+    if r["exit_code"] != 0:
+        # Typically missing raw-socket privileges (CAP_NET_RAW) or a ZMap without multi-port support
+        err = r["stderr"].strip().splitlines()
+        return None, (err[-1] if err else f"ZMap exited with {r['exit_code']}")[:200]
+    return {port: list(ips) for port, ips in found.items()}, ""
+
+
+def _connect_scan(subnet: str, ports: list[str], cancel: Optional[CancelToken] = None) -> dict[str, list[str]] | str:
     """
-    Run ZMap to discover responsive hosts on subnet.
-    Requires zmap binary (often needs root for raw sockets).
+    Async TCP connect sweep (no privileges). Returns ports -> ips, or an error message.
+    Targets are probed about a second's worth (ZMAP_FALLBACK_RATE) at a time; a
+    cancelled sweep stops between batches and returns the ips found so far.
     """
     try:
-        subprocess.run(["zmap", "--version"], capture_output=True, check=True, timeout=5)
-    except (subprocess.CalledProcessError, FileNotFoundError, subprocess.TimeoutExpired):
-        return {"status": "n/a", "message": "ZMap not installed or insufficient privileges"}
-
-    results = {}
-    for port in ports.split(","):
-        port = port.strip()
-        if not port.isdigit():
-            continue
-        try:
-            r = subprocess.run(
-                ["zmap", "-p", port, subnet, "-o", "-"],
-                capture_output=True,
-                timeout=120,
-            )
-            out = r.stdout.decode("utf-8", errors="replace") if r.stdout else ""
-            ips = [ip.strip() for ip in out.split("\n") if ip.strip()]
-            results[port] = ips[:100]
-        except subprocess.TimeoutExpired:
-            results[port] = ["Scan timed out"]
-        except Exception as e:
-            results[port] = [str(e)]
-
-    return {"status": "info", "subnet": subnet, "ports": results}
+        network = ipaddress.ip_network(subnet, strict=False)
+    except ValueError as e:
+        return f"Invalid subnet: {e}"
+    if network.num_addresses > ZMAP_FALLBACK_MAX_HOSTS + 2:
+        return (
+            f"Subnet {subnet} exceeds ZMAP_FALLBACK_MAX_HOSTS ({ZMAP_FALLBACK_MAX_HOSTS}) "
+            "for the connect-scan fallback"
+        )
+    hosts = [str(ip) for ip in network.hosts()]
+    targets = [(ip, int(port)) for port in ports for ip in hosts]
+    batch = max(1, int(ZMAP_FALLBACK_RATE))
+    states: dict[tuple[str, int], str] = {}
+    for start in range(0, len(targets), batch):
+        if cancel is not None and cancel.cancelled:
+            break
+        states.update(probe(targets[start : start + batch], rate=ZMAP_FALLBACK_RATE))
+    return {port: [ip for ip in hosts if states.get((ip, int(port))) == "open"] for port in ports}
+
+
+def run_zmap(
+    subnet: str,
+    ports: str = "22,80,443",
+    max_ips: int = ZMAP_MAX_IPS_PER_PORT,
+    cancel: Optional[CancelToken] = None,
+) -> dict[str, Any]:
+    """
+    Discover responsive hosts on subnet with one ZMap pass over all ports (one per
+    port before ZMap 4). Requires zmap binary with raw-socket privileges (see
+    tool_registry); if it is missing, unprivileged or fails, falls back to a
+    rate-limited asyncio TCP connect scan (ZMAP_FALLBACK_RATE connects/s). Both
+    return ports -> [ips], at most max_ips per port. A cancelled ZMap run keeps
+    the ips found so far and skips the fallback; a cancelled fallback keeps its own.
+    """
+    port_list = _port_list(ports)
+    if not port_list:
+        return {"status": "info", "subnet": subnet, "ports": {}}
+
+    tool = tool_registry.get("zmap")
+    if not tool.available:
+        found, zmap_error = None, tool.message or "ZMap not installed"
+    elif not tool.capabilities.get("raw_socket"):
+        found, zmap_error = None, "ZMap lacks raw-socket privileges"
+    elif tool.capabilities.get("multi_port"):
+        found, zmap_error = _run_zmap_pass(subnet, port_list, cancel)
+    else:
+        # ZMap < 4 takes one target port per sweep
+        found, zmap_error = {}, ""
+        for port in port_list:
+            port_found, zmap_error = _run_zmap_pass(subnet, [port], cancel)
+            if port_found is None:
+                found = None
+                break
+            found.update(port_found)
+            if cancel is not None and cancel.cancelled:
+                break
+    if cancel is not None and cancel.cancelled:
+        return {**_result(subnet, found or {}, "zmap", max_ips), "status": "cancelled", "message": cancel.reason}
+    if found is not None:
+        return _result(subnet, found, "zmap", max_ips)
+
+    found = _connect_scan(subnet, port_list, cancel)
+    if isinstance(found, str):
+        return {"status": "n/a", "message": f"{zmap_error}; {found}", "subnet": subnet}
+    if cancel is not None and cancel.cancelled:
+        return {**_result(subnet, found, "connect", max_ips), "status": "cancelled", "message": cancel.reason}
+    return _result(subnet, found, "connect", max_ips, message=f"{zmap_error}; used TCP connect scan")
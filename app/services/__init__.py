@@ -1,6 +1,19 @@
 """Business logic services."""
 
+from app.services.job_queue import QueueFull, ScanQueue, SQLiteJobQueue
+from app.services.job_store import JobStore, MemoryJobStore, SQLiteJobStore, create_job_store
 from app.services.report_service import ReportService
 from app.services.scan_service import ScanService, scan_service
 
-__all__ = ["ReportService", "ScanService", "scan_service"]
+__all__ = [
+    "JobStore",
+    "MemoryJobStore",
+    "QueueFull",
+    "ReportService",
+    "SQLiteJobQueue",
+    "SQLiteJobStore",
+    "ScanQueue",
+    "ScanService",
+    "create_job_store",
+    "scan_service",
+]
@@ -0,0 +1,258 @@
+"""Priority queues of scan jobs waiting for a run slot: in-process, or SQLite shared by workers."""
+
+import bisect
+import heapq
+import itertools
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterator
+
+from cryptography.fernet import Fernet
+
+from app.core.config import JOB_QUEUE_KEY, JOB_STORE_PATH, SCAN_QUEUE_DEFAULT_JOB_SECONDS, SCAN_QUEUE_MAX
+from app.core.serialization import dumps, loads
+from app.services.job_store import connect_sqlite, prepare_db_path
+
+# Lower rank starts first; ties keep arrival order
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+# Weight of the latest finished job in the average job duration
+DURATION_SMOOTHING = 0.3
+
+
+class QueueFull(Exception):
+    """The queue already holds its maximum number of pending jobs."""
+
+
+@dataclass(order=True)
+class QueuedJob:
+    """A pending job; ordering is (priority rank, arrival)."""
+
+    rank: int
+    seq: int
+    job_id: str = field(compare=False)
+    tenant: str = field(compare=False)
+    params: dict[str, Any] = field(compare=False, default_factory=dict)
+
+
+class ScanQueue:
+    """
+    Pending jobs in start order: by priority, then arrival. pop_next() skips jobs
+    whose tenant is already at its cap so one tenant cannot block the others.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self._items: list[QueuedJob] = []
+        self._seq = itertools.count()
+
+    def push(self, job_id: str, tenant: str, priority: str, params: dict[str, Any]) -> QueuedJob:
+        if len(self._items) >= self.max_size:
+            raise QueueFull(f"Scan queue is full ({self.max_size} jobs waiting)")
+        item = QueuedJob(PRIORITIES[priority], next(self._seq), job_id, tenant, params)
+        bisect.insort(self._items, item)
+        return item
+
+    def remove(self, job_id: str) -> QueuedJob | None:
+        for i, item in enumerate(self._items):
+            if item.job_id == job_id:
+                return self._items.pop(i)
+        return None
+
+    def pop_next(self, running_by_tenant: Counter, tenant_cap: int) -> QueuedJob | None:
+        """Remove and return the first job whose tenant is below tenant_cap (None if none can start)."""
+        for i, item in enumerate(self._items):
+            if running_by_tenant[item.tenant] < tenant_cap:
+                return self._items.pop(i)
+        return None
+
+    def __iter__(self) -> Iterator[QueuedJob]:
+        return iter(list(self._items))
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+def estimate_start_delays(
+    queued: list[QueuedJob], running_elapsed: list[float], slots: int, avg_duration: float
+) -> dict[str, float]:
+    """
+    Seconds until each queued job is expected to start, assuming every job takes
+    avg_duration and jobs start in queue order as the slots free up (tenant caps ignored).
+    """
+    free_at = [max(avg_duration - e, 0.0) for e in running_elapsed[:slots]]
+    free_at += [0.0] * (max(slots, 1) - len(free_at))
+    heapq.heapify(free_at)
+    delays = {}
+    for item in queued:
+        start = heapq.heappop(free_at)
+        delays[item.job_id] = start
+        heapq.heappush(free_at, start + avg_duration)
+    return delays
+
+
+def load_queue_key(path: Path) -> bytes:
+    """The Fernet key in path, generated (mode 0600) by whichever process gets there first."""
+    if not path.exists():
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with os.fdopen(os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "wb") as f:
+            f.write(Fernet.generate_key())
+        try:
+            # Atomic: a concurrent process never reads a half-written key
+            os.link(tmp, path)
+        except FileExistsError:
+            pass
+        finally:
+            os.unlink(tmp)
+    return path.read_bytes().strip()
+
+
+class SQLiteJobQueue:
+    """
+    Queue shared by the API and every worker process through the job database.
+    A worker claims a job with a lease that it renews by heartbeat; when a lease
+    runs out (the worker died) requeue_expired() puts the job back in line.
+    Claims enforce the global running-job budget and per-tenant caps across all
+    workers. Job parameters (including SSH keys) are stored Fernet-encrypted with
+    key (default JOB_QUEUE_KEY, else the key file next to the database) and only
+    until the job finishes; deleted rows are overwritten (secure_delete).
+    """
+
+    def __init__(self, path: Path = JOB_STORE_PATH, max_size: int = SCAN_QUEUE_MAX, key: str = JOB_QUEUE_KEY):
+        self.path = Path(path)
+        self.max_size = max_size
+        self._local = threading.local()
+        prepare_db_path(self.path)
+        self._fernet = Fernet(key or load_queue_key(self.path.with_suffix(".key")))
+        with self._conn() as conn:
+            # worker_id IS NULL while queued; rowid keeps arrival order across requeues
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS job_queue ("
+                " job_id TEXT PRIMARY KEY,"
+                " tenant TEXT NOT NULL,"
+                " rank INTEGER NOT NULL,"
+                " params BLOB NOT NULL,"
+                " worker_id TEXT,"
+                " lease_expires REAL,"
+                " started_at REAL,"
+                " attempts INTEGER NOT NULL DEFAULT 0)"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS queue_meta (key TEXT PRIMARY KEY, value REAL NOT NULL)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = connect_sqlite(self.path)
+            conn.execute("PRAGMA secure_delete=ON")
+        return conn
+
+    def push(self, job_id: str, tenant: str, priority: str, params: dict[str, Any]) -> None:
+        with self._conn() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            (waiting,) = conn.execute("SELECT COUNT(*) FROM job_queue WHERE worker_id IS NULL").fetchone()
+            if waiting >= self.max_size:
+                raise QueueFull(f"Scan queue is full ({self.max_size} jobs waiting)")
+            conn.execute(
+                "INSERT INTO job_queue (job_id, tenant, rank, params) VALUES (?, ?, ?, ?)",
+                (job_id, tenant, PRIORITIES[priority], self._fernet.encrypt(dumps(params))),
+            )
+
+    def remove(self, job_id: str) -> bool:
+        """Drop a job that has not been claimed yet."""
+        with self._conn() as conn:
+            cur = conn.execute("DELETE FROM job_queue WHERE job_id = ? AND worker_id IS NULL", (job_id,))
+        return cur.rowcount > 0
+
+    def claim(self, worker_id: str, max_running: int, tenant_cap: int, lease_seconds: float) -> QueuedJob | None:
+        """Lease the next job that fits the running budget and its tenant's cap (None if none can start)."""
+        now = time.time()
+        with self._conn() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            running = Counter(
+                tenant
+                for (tenant,) in conn.execute(
+                    "SELECT tenant FROM job_queue WHERE worker_id IS NOT NULL AND lease_expires > ?", (now,)
+                )
+            )
+            if sum(running.values()) >= max_running:
+                return None
+            rows = conn.execute(
+                "SELECT rowid, job_id, tenant, rank, params FROM job_queue"
+                " WHERE worker_id IS NULL ORDER BY rank, rowid"
+            )
+            for seq, job_id, tenant, rank, params in rows:
+                if running[tenant] < tenant_cap:
+                    conn.execute(
+                        "UPDATE job_queue SET worker_id = ?, lease_expires = ?, started_at = ?,"
+                        " attempts = attempts + 1 WHERE job_id = ?",
+                        (worker_id, now + lease_seconds, now, job_id),
+                    )
+                    return QueuedJob(rank, seq, job_id, tenant, loads(self._fernet.decrypt(params)))
+        return None
+
+    def heartbeat(self, job_id: str, worker_id: str, lease_seconds: float) -> bool:
+        """Renew a lease. False if the worker no longer holds it."""
+        with self._conn() as conn:
+            cur = conn.execute(
+                "UPDATE job_queue SET lease_expires = ? WHERE job_id = ? AND worker_id = ?",
+                (time.time() + lease_seconds, job_id, worker_id),
+            )
+        return cur.rowcount > 0
+
+    def complete(self, job_id: str, worker_id: str, duration: float | None = None) -> None:
+        """Remove a finished job; duration (seconds) of a completed job feeds avg_duration()."""
+        with self._conn() as conn:
+            conn.execute("DELETE FROM job_queue WHERE job_id = ? AND worker_id = ?", (job_id, worker_id))
+            if duration is not None:
+                avg = self._avg(conn)
+                conn.execute(
+                    "INSERT OR REPLACE INTO queue_meta (key, value) VALUES ('avg_duration', ?)",
+                    (avg + DURATION_SMOOTHING * (duration - avg),),
+                )
+
+    def requeue_expired(self, max_attempts: int) -> tuple[list[str], list[str]]:
+        """
+        Return jobs with lapsed leases to the queue, dropping those already claimed
+        max_attempts times. Returns (requeued job_ids, dropped job_ids).
+        """
+        with self._conn() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            expired = conn.execute(
+                "SELECT job_id, attempts FROM job_queue WHERE worker_id IS NOT NULL AND lease_expires <= ?",
+                (time.time(),),
+            ).fetchall()
+            requeued = [job_id for job_id, attempts in expired if attempts < max_attempts]
+            dropped = [job_id for job_id, attempts in expired if attempts >= max_attempts]
+            conn.executemany(
+                "UPDATE job_queue SET worker_id = NULL, lease_expires = NULL, started_at = NULL WHERE job_id = ?",
+                [(job_id,) for job_id in requeued],
+            )
+            conn.executemany("DELETE FROM job_queue WHERE job_id = ?", [(job_id,) for job_id in dropped])
+        return requeued, dropped
+
+    def pending(self) -> list[QueuedJob]:
+        """Unclaimed jobs in start order (without their parameters)."""
+        rows = self._conn().execute(
+            "SELECT rowid, job_id, tenant, rank FROM job_queue WHERE worker_id IS NULL ORDER BY rank, rowid"
+        )
+        return [QueuedJob(rank, seq, job_id, tenant) for seq, job_id, tenant, rank in rows]
+
+    def running_elapsed(self) -> list[float]:
+        """Seconds since each leased job started."""
+        now = time.time()
+        rows = self._conn().execute(
+            "SELECT started_at FROM job_queue WHERE worker_id IS NOT NULL AND lease_expires > ?", (now,)
+        )
+        return [now - started for (started,) in rows]
+
+    def avg_duration(self) -> float:
+        return self._avg(self._conn())
+
+    @staticmethod
+    def _avg(conn: sqlite3.Connection) -> float:
+        row = conn.execute("SELECT value FROM queue_meta WHERE key = 'avg_duration'").fetchone()
+        return row[0] if row else float(SCAN_QUEUE_DEFAULT_JOB_SECONDS)
@@ -0,0 +1,322 @@
+"""Scan job storage: in-memory for a single process, SQLite shared by all workers on a host."""
+
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from bisect import bisect_right
+from collections import OrderedDict
+from operator import itemgetter
+from pathlib import Path
+from typing import Any
+
+from app.core.config import JOB_STORE_BACKEND, JOB_STORE_HOT_SIZE, JOB_STORE_PATH, JOB_STORE_TTL
+from app.core.serialization import dumps, loads
+
+# Jobs in these states never change again; only they expire and are compressed
+FINISHED_STATUSES = ("completed", "cancelled", "error")
+# Seconds between sweeps for expired jobs (run lazily on writes)
+_PURGE_INTERVAL = 60
+
+
+def prepare_db_path(path: Path) -> None:
+    """Create the database's directory (0700) and file (0600): only the service user may read jobs."""
+    path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+    os.close(os.open(path, os.O_WRONLY | os.O_CREAT, 0o600))
+    # SQLite gives the -wal and -shm files the database file's mode
+    os.chmod(path, 0o600)
+
+
+def connect_sqlite(path: Path) -> sqlite3.Connection:
+    """Open a job database connection (WAL, so readers never block the writer)."""
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def _finished(job: dict[str, Any]) -> bool:
+    return job.get("status") in FINISHED_STATUSES
+
+
+class JobStore(ABC):
+    """
+    Storage for scan job documents (the dicts returned by the status endpoint),
+    keyed by job_id. Finished jobs expire ttl seconds after their last update
+    (ttl <= 0 keeps them). Cancellation requests are recorded so the process
+    running a job can pick them up. Each job also has an append-only event log
+    (increasing ids chosen by the job's owner, normally 1, 2, ...) that is
+    streamed to clients and expires with the job.
+    """
+
+    def __init__(self, ttl: int = JOB_STORE_TTL):
+        self.ttl = ttl
+
+    @abstractmethod
+    def put(self, job_id: str, job: dict[str, Any]) -> None:
+        """Store (or replace) the job document."""
+
+    @abstractmethod
+    def get(self, job_id: str) -> dict[str, Any] | None:
+        """The job document, or None if unknown or expired."""
+
+    def exists(self, job_id: str) -> bool:
+        """Whether get() would find the job (without decoding it where the backend can)."""
+        return self.get(job_id) is not None
+
+    @abstractmethod
+    def request_cancel(self, job_id: str) -> bool:
+        """Flag an unfinished job for cancellation. Returns False if unknown or finished."""
+
+    @abstractmethod
+    def cancel_requested(self, job_id: str) -> bool:
+        """Whether request_cancel() flagged the job."""
+
+    @abstractmethod
+    def append_events(self, job_id: str, events: list[tuple[int, str, dict[str, Any]]]) -> None:
+        """Add (id, event, data) entries, ids above any already logged, to the job's log."""
+
+    @abstractmethod
+    def events(
+        self, job_id: str, after: int = 0, limit: int = 500, kinds: tuple[str, ...] | None = None
+    ) -> list[tuple[int, str, dict[str, Any]]]:
+        """Up to limit (id, event, data) entries with id > after, oldest first, optionally only of the given kinds."""
+
+    @abstractmethod
+    def purge_expired(self) -> int:
+        """Delete expired finished jobs. Returns how many were removed."""
+
+    def _expired(self, updated_at: float, now: float) -> bool:
+        return self.ttl > 0 and updated_at < now - self.ttl
+
+
+class MemoryJobStore(JobStore):
+    """Process-local store: jobs are lost on restart and invisible to other workers."""
+
+    def __init__(self, ttl: int = JOB_STORE_TTL):
+        super().__init__(ttl)
+        # job_id -> (job, updated_at, cancel_requested)
+        self._jobs: "OrderedDict[str, tuple[dict[str, Any], float, bool]]" = OrderedDict()
+        self._events: dict[str, list[tuple[int, str, dict[str, Any]]]] = {}
+        self._lock = threading.Lock()
+        self._last_purge = time.time()
+
+    def put(self, job_id: str, job: dict[str, Any]) -> None:
+        now = time.time()
+        with self._lock:
+            previous = self._jobs.pop(job_id, None)
+            self._jobs[job_id] = (job, now, bool(previous and previous[2]))
+        if now - self._last_purge > _PURGE_INTERVAL:
+            self.purge_expired()
+
+    def get(self, job_id: str) -> dict[str, Any] | None:
+        with self._lock:
+            entry = self._jobs.get(job_id)
+        if entry is None or (_finished(entry[0]) and self._expired(entry[1], time.time())):
+            return None
+        return entry[0]
+
+    def request_cancel(self, job_id: str) -> bool:
+        with self._lock:
+            entry = self._jobs.get(job_id)
+            if entry is None or _finished(entry[0]):
+                return False
+            self._jobs[job_id] = (entry[0], entry[1], True)
+        return True
+
+    def cancel_requested(self, job_id: str) -> bool:
+        with self._lock:
+            entry = self._jobs.get(job_id)
+        return bool(entry and entry[2])
+
+    def append_events(self, job_id: str, events: list[tuple[int, str, dict[str, Any]]]) -> None:
+        with self._lock:
+            self._events.setdefault(job_id, []).extend(events)
+
+    def events(
+        self, job_id: str, after: int = 0, limit: int = 500, kinds: tuple[str, ...] | None = None
+    ) -> list[tuple[int, str, dict[str, Any]]]:
+        with self._lock:
+            log = self._events.get(job_id, [])
+            log = log[bisect_right(log, after, key=itemgetter(0)) :]
+        if kinds is not None:
+            log = [entry for entry in log if entry[1] in kinds]
+        return log[:limit]
+
+    def purge_expired(self) -> int:
+        now = time.time()
+        self._last_purge = now
+        with self._lock:
+            expired = [k for k, (job, updated, _) in self._jobs.items() if _finished(job) and self._expired(updated, now)]
+            for k in expired:
+                del self._jobs[k]
+                self._events.pop(k, None)
+        return len(expired)
+
+
+class SQLiteJobStore(JobStore):
+    """
+    Jobs in one SQLite database (WAL mode), so every uvicorn worker on the host
+    sees every job. Running jobs are stored as plain JSON and rewritten on each
+    update; finished jobs are zlib-compressed. The last hot_size finished jobs
+    read by this process stay decoded in an LRU (they never change).
+    """
+
+    def __init__(self, path: Path = JOB_STORE_PATH, ttl: int = JOB_STORE_TTL, hot_size: int = JOB_STORE_HOT_SIZE):
+        super().__init__(ttl)
+        self.path = Path(path)
+        self.hot_size = max(0, hot_size)
+        # job_id -> (job, updated_at)
+        self._hot: "OrderedDict[str, tuple[dict[str, Any], float]]" = OrderedDict()
+        self._hot_lock = threading.Lock()
+        self._local = threading.local()
+        self._last_purge = 0.0
+        prepare_db_path(self.path)
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " job_id TEXT PRIMARY KEY,"
+                " status TEXT NOT NULL,"
+                " data BLOB NOT NULL,"
+                " compressed INTEGER NOT NULL DEFAULT 0,"
+                " cancel_requested INTEGER NOT NULL DEFAULT 0,"
+                " created_at REAL NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status_updated ON jobs (status, updated_at)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS job_events ("
+                " job_id TEXT NOT NULL,"
+                " seq INTEGER NOT NULL,"
+                " event TEXT NOT NULL,"
+                " data BLOB NOT NULL,"
+                " PRIMARY KEY (job_id, seq))"
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread (sqlite3 connections are not shareable)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = connect_sqlite(self.path)
+        return conn
+
+    def _remember(self, job_id: str, job: dict[str, Any], updated_at: float) -> None:
+        if self.hot_size == 0:
+            return
+        with self._hot_lock:
+            self._hot[job_id] = (job, updated_at)
+            self._hot.move_to_end(job_id)
+            while len(self._hot) > self.hot_size:
+                self._hot.popitem(last=False)
+
+    def put(self, job_id: str, job: dict[str, Any]) -> None:
+        now = time.time()
+        data = dumps(job)
+        finished = _finished(job)
+        if finished:
+            data = zlib.compress(data, 6)
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT INTO jobs (job_id, status, data, compressed, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (job_id) DO UPDATE SET status = excluded.status, data = excluded.data,"
+                " compressed = excluded.compressed, updated_at = excluded.updated_at",
+                (job_id, job.get("status", ""), data, int(finished), now, now),
+            )
+        if finished:
+            self._remember(job_id, job, now)
+        else:
+            with self._hot_lock:
+                self._hot.pop(job_id, None)
+        if now - self._last_purge > _PURGE_INTERVAL:
+            self.purge_expired()
+
+    def get(self, job_id: str) -> dict[str, Any] | None:
+        now = time.time()
+        with self._hot_lock:
+            entry = self._hot.get(job_id)
+            if entry is not None:
+                self._hot.move_to_end(job_id)
+        if entry is not None:
+            return None if self._expired(entry[1], now) else entry[0]
+
+        row = self._conn().execute(
+            "SELECT data, compressed, updated_at FROM jobs WHERE job_id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        data, compressed, updated_at = row
+        job = loads(zlib.decompress(data) if compressed else data)
+        if _finished(job):
+            if self._expired(updated_at, now):
+                return None
+            self._remember(job_id, job, updated_at)
+        return job
+
+    def exists(self, job_id: str) -> bool:
+        with self._hot_lock:
+            entry = self._hot.get(job_id)
+        if entry is not None:
+            return not self._expired(entry[1], time.time())
+        row = self._conn().execute("SELECT status, updated_at FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return row is not None and not (row[0] in FINISHED_STATUSES and self._expired(row[1], time.time()))
+
+    def request_cancel(self, job_id: str) -> bool:
+        placeholders = ", ".join("?" * len(FINISHED_STATUSES))
+        with self._conn() as conn:
+            cur = conn.execute(
+                f"UPDATE jobs SET cancel_requested = 1 WHERE job_id = ? AND status NOT IN ({placeholders})",
+                (job_id, *FINISHED_STATUSES),
+            )
+        return cur.rowcount > 0
+
+    def cancel_requested(self, job_id: str) -> bool:
+        row = self._conn().execute("SELECT cancel_requested FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def append_events(self, job_id: str, events: list[tuple[int, str, dict[str, Any]]]) -> None:
+        with self._conn() as conn:
+            # A re-queued job's new owner continues from the stored document's event_id
+            conn.executemany(
+                "INSERT OR REPLACE INTO job_events (job_id, seq, event, data) VALUES (?, ?, ?, ?)",
+                [(job_id, seq, event, dumps(data)) for seq, event, data in events],
+            )
+
+    def events(
+        self, job_id: str, after: int = 0, limit: int = 500, kinds: tuple[str, ...] | None = None
+    ) -> list[tuple[int, str, dict[str, Any]]]:
+        query = "SELECT seq, event, data FROM job_events WHERE job_id = ? AND seq > ?"
+        params: list[Any] = [job_id, after]
+        if kinds is not None:
+            query += f" AND event IN ({', '.join('?' * len(kinds))})"
+            params += kinds
+        rows = self._conn().execute(query + " ORDER BY seq LIMIT ?", (*params, limit))
+        return [(seq, event, loads(data)) for seq, event, data in rows]
+
+    def purge_expired(self) -> int:
+        now = time.time()
+        self._last_purge = now
+        if self.ttl <= 0:
+            return 0
+        placeholders = ", ".join("?" * len(FINISHED_STATUSES))
+        with self._conn() as conn:
+            cur = conn.execute(
+                f"DELETE FROM jobs WHERE status IN ({placeholders}) AND updated_at < ?",
+                (*FINISHED_STATUSES, now - self.ttl),
+            )
+            conn.execute("DELETE FROM job_events WHERE job_id NOT IN (SELECT job_id FROM jobs)")
+        with self._hot_lock:
+            for job_id in [k for k, (_, updated) in self._hot.items() if self._expired(updated, now)]:
+                del self._hot[job_id]
+        return cur.rowcount
+
+
+def create_job_store(backend: str = JOB_STORE_BACKEND) -> JobStore:
+    """Job store for JOB_STORE_BACKEND ("sqlite" or "memory")."""
+    if backend == "memory":
+        return MemoryJobStore()
+    if backend == "sqlite":
+        return SQLiteJobStore()
+    raise ValueError(f"Unknown job store backend: {backend}")
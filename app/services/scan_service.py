@@ -1,42 +1,269 @@
 """Scan orchestration service."""
 
 import threading
+import time
 import uuid
-from datetime import datetime
-from typing import Any
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Callable, Iterator
 
-from app.core.config import REPORTS_DIR
+from app.core.config import (
+    JOB_CANCEL_POLL_INTERVAL,
+    JOB_STORE_FLUSH_INTERVAL,
+    REPORTS_DIR,
+    SCAN_EXECUTION,
+    SCAN_FINDING_EVENTS_MAX,
+    SCAN_JOB_DEADLINE,
+    SCAN_MAX_JOBS_PER_TENANT,
+    SCAN_MAX_RUNNING_JOBS,
+    SCAN_QUEUE_DEFAULT_JOB_SECONDS,
+    SCAN_QUEUE_MAX,
+)
 from app.report import generate_pdf_report
-from app.scanner import run_scan
+from app.scanner import CancelToken, run_scan
+from app.services.job_queue import DURATION_SMOOTHING, QueueFull, ScanQueue, SQLiteJobQueue, estimate_start_delays
+from app.services.job_store import JobStore, create_job_store
+
+# Most recent live findings kept in a running job's status
+_LIVE_FINDINGS_MAX = 200
+# Job fields carried by "status" events
+_STATUS_EVENT_FIELDS = ("status", "progress", "cancel_reason", "error")
+# Job fields kept in the compact status view
+_SUMMARY_FIELDS = (
+    "job_id",
+    "status",
+    "progress",
+    "priority",
+    "tenant",
+    "queued_at",
+    "started_at",
+    "timestamp",
+    "queue_position",
+    "estimated_start",
+    "cancel_reason",
+    "error",
+    "live_findings_total",
+    "preflight",
+)
+# Result sections served page by page
+RESULT_SECTIONS = ("servers", "network_scans")
+# Events read from the store per query
+_EVENT_PAGE = 500
+
+
+def _server_state(result: dict[str, Any]) -> dict[str, Any]:
+    """Compact entry for one server: reachability and its checks counted by status."""
+    state = {"host": result.get("host"), "reachable": result.get("reachable", False)}
+    if result.get("error"):
+        state["error"] = result["error"]
+    if result.get("cancelled"):
+        state["cancelled"] = True
+    checks = (result.get("checks") or {}).values()
+    state["checks"] = dict(Counter(c.get("status") for c in checks if isinstance(c, dict)))
+    if isinstance(result.get("lynis"), dict):
+        state["lynis"] = result["lynis"].get("status")
+    return state
+
+
+def _snapshot(job: dict[str, Any]) -> dict[str, Any]:
+    """Copy of a live job document that is safe to use while the scan keeps updating it."""
+    return {k: v.copy() if isinstance(v, (dict, list)) else v for k, v in job.items()}
 
 
 class ScanService:
-    """Manages scan jobs and report generation."""
+    """
+    Manages scan jobs and report generation. Job documents live in the job store
+    (shared by all workers with the SQLite backend); jobs submitted to this process
+    are also kept in memory until they finish; status changes are written through
+    at once, other updates at most every JOB_STORE_FLUSH_INTERVAL seconds.
+    At most max_running jobs run at once (max_per_tenant per tenant); the rest wait
+    in a priority queue of at most queue_max jobs and report their queue position
+    and estimated start. Every change is also appended to the job's event log
+    (status, progress, the first SCAN_FINDING_EVENTS_MAX findings, and server and
+    tool with their compact state only; their results are in the document),
+    written after the document that includes it; the document's event_id is the
+    id of the last event it includes; it doubles as the job's version, and
+    server_states / tool_states record the version each server and tool last
+    changed at. With execution="worker" jobs go to the shared SQLite
+    queue instead and run in `python -m app.worker` processes (see run_job).
+    """
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        store: JobStore | None = None,
+        max_running: int = SCAN_MAX_RUNNING_JOBS,
+        max_per_tenant: int = SCAN_MAX_JOBS_PER_TENANT,
+        queue_max: int = SCAN_QUEUE_MAX,
+        execution: str = SCAN_EXECUTION,
+    ) -> None:
+        if execution not in ("inline", "worker"):
+            raise ValueError(f"Unknown scan execution mode: {execution}")
+        self._store = store or create_job_store()
+        self.max_running = max(1, max_running)
+        self.max_per_tenant = max(1, max_per_tenant)
+        self._queue = ScanQueue(queue_max)
+        self._shared = SQLiteJobQueue(max_size=queue_max) if execution == "worker" else None
+        # Queued and running jobs of this process
         self._jobs: dict[str, dict[str, Any]] = {}
+        # Running job_id -> (tenant, start monotonic)
+        self._started: dict[str, tuple[str, float]] = {}
+        self._cancel_tokens: dict[str, CancelToken] = {}
+        # Running jobs whose document now belongs to another worker (see abandon())
+        self._abandoned: set[str] = set()
+        # Running jobs with updates not yet written to the store (see _flush())
+        self._dirty: set[str] = set()
+        # job_id -> events not yet written to the store, oldest first (see _emit())
+        self._pending_events: dict[str, list[tuple[int, str, dict[str, Any]]]] = {}
+        # Serializes store writes of running documents and of events (in id order)
+        self._flush_lock = threading.Lock()
+        self._avg_duration = float(SCAN_QUEUE_DEFAULT_JOB_SECONDS)
+        self._lock = threading.Lock()
 
-    def start_scan(self, servers: list[dict], auto_mode: bool = True) -> str:
-        """Start a new scan. Returns job_id."""
+    def start_scan(
+        self,
+        servers: list[dict],
+        auto_mode: bool = True,
+        scan_options: dict[str, Any] | None = None,
+        deadline: int | None = None,
+        priority: str = "normal",
+        tenant: str = "default",
+    ) -> str:
+        """
+        Queue a new scan; it starts as soon as the running-job budget and its tenant's
+        cap allow (higher priority first). scan_options are passed through to run_scan.
+        The job is cancelled deadline seconds after it starts (default SCAN_JOB_DEADLINE).
+        Raises QueueFull when the queue is at capacity. Returns job_id.
+        """
         job_id = str(uuid.uuid4())
-        self._jobs[job_id] = {"job_id": job_id, "status": "running", "progress": 0}
+        job = {
+            "job_id": job_id,
+            "status": "queued",
+            "progress": 0,
+            "priority": priority,
+            "tenant": tenant,
+            "queued_at": datetime.utcnow().isoformat(),
+        }
+        params = {"servers": servers, "auto_mode": auto_mode, "scan_options": scan_options or {}, "deadline": deadline}
+        if self._shared is not None:
+            # Document first: a worker may claim the job as soon as it is queued
+            self._store.put(job_id, job)
+            try:
+                self._shared.push(job_id, tenant, priority, params)
+            except QueueFull as e:
+                self._store.put(job_id, {**job, "status": "error", "error": str(e)})
+                raise
+            return job_id
+        with self._lock:
+            self._queue.push(job_id, tenant, priority, params)
+            self._jobs[job_id] = job
+            self._store.put(job_id, job)
+            self._dispatch()
+        self._write_events()
+        return job_id
 
-        thread = threading.Thread(
-            target=self._run_scan_task,
-            args=(job_id, servers, auto_mode),
-        )
-        thread.daemon = True
-        thread.start()
+    def _dispatch(self) -> None:
+        """Start queued jobs while run slots are free, then refresh queue positions. Caller holds _lock."""
+        running_by_tenant = Counter(tenant for tenant, _ in self._started.values())
+        while len(self._started) < self.max_running:
+            item = self._queue.pop_next(running_by_tenant, self.max_per_tenant)
+            if item is None:
+                break
+            job = self._jobs[item.job_id]
+            if self._store.cancel_requested(item.job_id):
+                # Cancelled from another worker while waiting
+                self._finish_queued(job)
+                continue
+            running_by_tenant[item.tenant] += 1
+            token = self._begin(item.job_id, item.tenant, item.params)
+            thread = threading.Thread(target=self._run_scan_task, args=(item.job_id, item.params, token))
+            thread.daemon = True
+            thread.start()
 
-        return job_id
+        for job_id, info in self._queue_info().items():
+            self._jobs[job_id].update(info)
+            self._store.put(job_id, self._jobs[job_id])
+
+    def _begin(self, job_id: str, tenant: str, params: dict[str, Any]) -> CancelToken:
+        """Mark a job running in this process and return its cancel token. Caller holds _lock."""
+        job = self._jobs.get(job_id) or self._store.get(job_id) or {"job_id": job_id, "progress": 0}
+        self._jobs[job_id] = job
+        self._started[job_id] = (tenant, time.monotonic())
+        token = CancelToken(params.get("deadline") or SCAN_JOB_DEADLINE or None)
+        self._cancel_tokens[job_id] = token
+        for key in ("queue_position", "estimated_start"):
+            job.pop(key, None)
+        job.update(status="running", started_at=datetime.utcnow().isoformat())
+        self._emit_status(job)
+        self._store.put(job_id, job)
+        return token
+
+    def run_job(
+        self,
+        job_id: str,
+        tenant: str,
+        params: dict[str, Any],
+        still_owner: Callable[[], bool] | None = None,
+    ) -> dict[str, Any]:
+        """
+        Run a job claimed from the shared queue in the calling thread, bypassing this
+        process's admission queue. params are as passed to start_scan. The final
+        document is only stored if still_owner() (the claim is still held) is true.
+        Returns the final job document.
+        """
+        with self._lock:
+            if self._store.cancel_requested(job_id):
+                job = self._store.get(job_id) or {"job_id": job_id}
+                self._finish_queued(job)
+            else:
+                job = None
+                token = self._begin(job_id, tenant, params)
+        self._write_events()
+        if job is not None:
+            return job
+        return self._run_scan_task(job_id, params, token, still_owner)
+
+    def _queue_info(self) -> dict[str, dict[str, Any]]:
+        """queue_position (1-based) and estimated_start per queued job. Caller holds _lock."""
+        if self._shared is not None:
+            queued = self._shared.pending()
+            elapsed = self._shared.running_elapsed()
+            avg_duration = self._shared.avg_duration()
+        else:
+            queued = list(self._queue)
+            now = time.monotonic()
+            elapsed = [now - started for _, started in self._started.values()]
+            avg_duration = self._avg_duration
+        delays = estimate_start_delays(queued, elapsed, self.max_running, avg_duration)
+        start = datetime.utcnow()
+        return {
+            item.job_id: {
+                "queue_position": position,
+                "estimated_start": (start + timedelta(seconds=delays[item.job_id])).isoformat(),
+            }
+            for position, item in enumerate(queued, 1)
+        }
+
+    def _finish_queued(self, job: dict[str, Any]) -> None:
+        """Mark a job cancelled before it started. Caller holds _lock."""
+        for key in ("queue_position", "estimated_start"):
+            job.pop(key, None)
+        job.update(status="cancelled", cancel_reason="Cancelled by user", timestamp=datetime.utcnow().isoformat())
+        self._emit_status(job)
+        self._store.put(job["job_id"], job)
+        self._jobs.pop(job["job_id"], None)
 
     def _run_scan_task(
         self,
         job_id: str,
-        servers: list[dict],
-        auto_mode: bool,
-    ) -> None:
-        """Background task to execute scan."""
+        params: dict[str, Any],
+        token: CancelToken,
+        still_owner: Callable[[], bool] | None = None,
+    ) -> dict[str, Any]:
+        """Execute a scan and store its results (unless abandoned or still_owner() is false)."""
+        servers = params["servers"]
+        done = threading.Event()
+        watcher = threading.Thread(target=self._watch_job, args=(job_id, token, done), daemon=True)
+        watcher.start()
         try:
             for s in servers:
                 s["name"] = (s.get("host_name") or s.get("host") or "unknown").strip() or s.get("host", "unknown")
@@ -47,32 +274,313 @@ class ScanService:
                 subnet=None,
                 openvas_config=None,
                 progress_callback=lambda p: self._update_progress(job_id, p),
-                auto_mode=auto_mode,
+                finding_callback=lambda tool, f: self._add_live_finding(job_id, tool, f),
+                event_callback=lambda event, data: self._add_event(job_id, event, data),
+                auto_mode=params["auto_mode"],
+                cancel=token,
+                **params["scan_options"],
             )
-            self._jobs[job_id] = results
+            results["job_id"] = job_id
         except Exception as e:
-            self._jobs[job_id] = {
+            results = {
                 "job_id": job_id,
                 "status": "error",
                 "error": str(e),
                 "timestamp": datetime.utcnow().isoformat(),
             }
+        finally:
+            done.set()
+            token.close()
+        # No flush of the running document may land after the final one
+        watcher.join()
+        owner = still_owner is None or still_owner()
+        with self._lock:
+            self._dirty.discard(job_id)
+            running = self._jobs.pop(job_id, None) or {}
+            if job_id in self._abandoned or not owner:
+                self._abandoned.discard(job_id)
+                self._pending_events.pop(job_id, None)
+            else:
+                for key in ("priority", "tenant", "queued_at", "started_at", "live_findings_total", "event_id"):
+                    if key in running:
+                        results.setdefault(key, running[key])
+                self._emit_status(results)
+                self._stamp_states(results, running)
+                self._store.put(job_id, results)
+            self._cancel_tokens.pop(job_id, None)
+            _, started = self._started.pop(job_id)
+            if results.get("status") == "completed":
+                duration = time.monotonic() - started
+                self._avg_duration += DURATION_SMOOTHING * (duration - self._avg_duration)
+            self._dispatch()
+        self._write_events()
+        return results
+
+    def _watch_job(self, job_id: str, token: CancelToken, done: threading.Event) -> None:
+        """
+        Until the job is done: write its coalesced updates to the store every
+        JOB_STORE_FLUSH_INTERVAL, and forward a cancel request recorded in the
+        store (e.g. by another worker) to its token.
+        """
+        next_cancel_check = time.monotonic() + JOB_CANCEL_POLL_INTERVAL
+        while not done.wait(min(JOB_STORE_FLUSH_INTERVAL, JOB_CANCEL_POLL_INTERVAL)):
+            self._flush(job_id)
+            if not token.cancelled and time.monotonic() >= next_cancel_check:
+                next_cancel_check = time.monotonic() + JOB_CANCEL_POLL_INTERVAL
+                if self._store.cancel_requested(job_id):
+                    self._cancel(job_id, token)
+
+    def _flush(self, job_id: str) -> None:
+        """Write a running job's document, then its new events, to the store if it changed since the last write."""
+        with self._flush_lock:
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job_id not in self._dirty or job is None:
+                    return
+                self._dirty.discard(job_id)
+                snapshot = _snapshot(job)
+                events = self._pending_events.pop(job_id, [])
+            # Outside _lock: the scan keeps reporting while the document and events are written
+            self._store.put(job_id, snapshot)
+            if events:
+                self._store.append_events(job_id, events)
+
+    def _write_events(self) -> None:
+        """
+        Write the pending events of jobs whose document is already stored (running
+        jobs with unwritten updates wait for their _flush()). Caller must not hold _lock.
+        """
+        with self._flush_lock:
+            with self._lock:
+                ready = [job_id for job_id in self._pending_events if job_id not in self._dirty]
+                pending = [(job_id, self._pending_events.pop(job_id)) for job_id in ready]
+            for job_id, events in pending:
+                self._store.append_events(job_id, events)
+
+    def _cancel(self, job_id: str, token: CancelToken, reason: str = "Cancelled by user") -> None:
+        if token.cancel(reason):
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is None or job.get("status") != "running":
+                    return
+                job["status"] = "cancelling"
+                self._emit_status(job)
+                self._dirty.add(job_id)
+            self._flush(job_id)
 
     def _update_progress(self, job_id: str, progress: int) -> None:
         """Update job progress."""
-        if job_id in self._jobs and isinstance(self._jobs[job_id], dict):
-            self._jobs[job_id]["progress"] = progress
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job.get("progress") != progress:
+                job["progress"] = progress
+                # Carries the finding count, which "finding" events stop tracking past their cap
+                total = job.get("live_findings_total", 0)
+                self._emit(job, "progress", {"progress": progress, "live_findings_total": total})
+                self._dirty.add(job_id)
+
+    def _add_live_finding(self, job_id: str, tool: str, finding: dict[str, Any]) -> None:
+        """Append a finding reported while the scan is still running."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            record = {"tool": tool, **finding}
+            live = job.setdefault("live_findings", [])
+            live.append(record)
+            if len(live) > _LIVE_FINDINGS_MAX:
+                del live[: len(live) - _LIVE_FINDINGS_MAX]
+            job["live_findings_total"] = job.get("live_findings_total", 0) + 1
+            if job["live_findings_total"] <= SCAN_FINDING_EVENTS_MAX:
+                self._emit(job, "finding", record)
+            self._dirty.add(job_id)
+
+    def _add_event(self, job_id: str, event: str, data: dict[str, Any]) -> None:
+        """
+        Record a server or network tool finishing while the scan runs. Its result
+        goes into the job document; the event carries only its compact state.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            if event == "server":
+                name = data["name"]
+                result = {k: v for k, v in data.items() if k != "name"}
+                state = _server_state(result)
+                job.setdefault("servers", {})[name] = result
+                self._emit(job, event, {"name": name, **state})
+                job.setdefault("server_states", {})[name] = {**state, "version": job["event_id"]}
+            elif event == "tool":
+                tool = data["tool"]
+                result = {k: v for k, v in data.items() if k != "tool"}
+                job.setdefault("network_scans", {})[tool] = result
+                self._emit(job, event, {"tool": tool, "status": result.get("status")})
+                job.setdefault("tool_states", {})[tool] = {"status": result.get("status"), "version": job["event_id"]}
+            else:
+                self._emit(job, event, data)
+            self._dirty.add(job_id)
+
+    @staticmethod
+    def _stamp_states(results: dict[str, Any], running: dict[str, Any]) -> None:
+        """Compact server/tool states for the final document, keeping the versions seen while running."""
+        version = results.get("event_id", 0)
+        seen = running.get("server_states", {})
+        results["server_states"] = {
+            name: {**_server_state(r), "version": seen.get(name, {}).get("version", version)}
+            for name, r in (results.get("servers") or {}).items()
+        }
+        seen = running.get("tool_states", {})
+        results["tool_states"] = {
+            tool: {"status": r.get("status"), "version": seen.get(tool, {}).get("version", version)}
+            for tool, r in (results.get("network_scans") or {}).items()
+        }
+
+    def _emit(self, job: dict[str, Any], event: str, data: dict[str, Any]) -> None:
+        """
+        Queue an event for the job's log under the next id. Caller holds _lock and
+        then stores job (or marks it dirty); the event is written after it (see
+        _flush() and _write_events()).
+        """
+        job["event_id"] = job.get("event_id", 0) + 1
+        self._pending_events.setdefault(job["job_id"], []).append((job["event_id"], event, data))
+
+    def _emit_status(self, job: dict[str, Any]) -> None:
+        self._emit(job, "status", {k: job[k] for k in _STATUS_EVENT_FIELDS if k in job})
+
+    def events(self, job_id: str, after: int = 0) -> list[tuple[int, str, dict[str, Any]]]:
+        """Events of a job with id > after, oldest first (see JobStore.events)."""
+        return self._store.events(job_id, after, _EVENT_PAGE)
+
+    def _iter_events(self, job_id: str, after: int, kinds: tuple[str, ...]) -> Iterator[tuple[str, dict[str, Any]]]:
+        while True:
+            batch = self._store.events(job_id, after, _EVENT_PAGE, kinds)
+            for after, event, data in batch:
+                yield event, data
+            if len(batch) < _EVENT_PAGE:
+                return
+
+    def get_summary(self, job_id: str, since: int | None = None) -> dict[str, Any] | None:
+        """
+        Compact status: state, progress, version, per-server check counts and per-tool
+        status, without result payloads. With since (a version from an earlier call),
+        also the full results of servers and tools updated after it and the live
+        findings reported after it.
+        """
+        job = self.get_status(job_id)
+        if job is None:
+            return None
+        summary = {k: job[k] for k in _SUMMARY_FIELDS if k in job}
+        version = summary["version"] = job.get("event_id", 0)
+        summary["server_states"] = job.get("server_states", {})
+        summary["tool_states"] = job.get("tool_states", {})
+        if since is None:
+            return summary
+        summary.update(servers={}, network_scans={}, live_findings=[])
+        if since >= version:
+            return summary
+        for section, states in (("servers", summary["server_states"]), ("network_scans", summary["tool_states"])):
+            results = job.get(section) or {}
+            summary[section] = {n: results[n] for n, st in states.items() if st["version"] > since and n in results}
+        findings = [data for _, data in self._iter_events(job_id, since, ("finding",))]
+        summary["live_findings"] = findings[-_LIVE_FINDINGS_MAX:]
+        return summary
+
+    def get_results(self, job_id: str, section: str = "servers", offset: int = 0, limit: int = 50) -> dict[str, Any] | None:
+        """
+        One page of a results section ("servers" or "network_scans"), ordered by name.
+        While the job runs, the servers and tools that have finished so far.
+        """
+        if section not in RESULT_SECTIONS:
+            raise ValueError(f"Unknown results section: {section}")
+        job = self.get_status(job_id)
+        if job is None:
+            return None
+        items = job.get(section) or {}
+        names = sorted(items)[offset : offset + limit]
+        return {
+            "job_id": job_id,
+            "status": job.get("status"),
+            "version": job.get("event_id", 0),
+            "section": section,
+            "total": len(items),
+            "offset": offset,
+            "limit": limit,
+            "items": {name: items[name] for name in names},
+        }
+
+    def cancel_scan(self, job_id: str, reason: str = "Cancelled by user") -> dict[str, Any] | None:
+        """
+        Request cancellation of a job. A queued job is dropped from the queue; a
+        running one stops cooperatively and ends with status "cancelled" and its
+        partial results. Jobs of another worker are flagged in the store and stop
+        within JOB_CANCEL_POLL_INTERVAL. Returns the job, or None if unknown.
+        """
+        with self._lock:
+            job = self._jobs[job_id] if self._queue.remove(job_id) is not None else None
+            if job is not None:
+                self._finish_queued(job)
+                self._dispatch()
+        if job is None and self._shared is not None and self._shared.remove(job_id):
+            job = self._store.get(job_id) or {"job_id": job_id}
+            with self._lock:
+                self._finish_queued(job)
+        if job is not None:
+            self._write_events()
+            return job
+        token = self._cancel_tokens.get(job_id)
+        if token is not None:
+            self._cancel(job_id, token, reason)
+            return self.get_status(job_id)
+        job = self._store.get(job_id)
+        if job is not None and self._store.request_cancel(job_id):
+            job = {**job, "status": "cancelling"}
+        return job
+
+    def abandon(self, job_id: str, reason: str) -> None:
+        """
+        Stop a running job whose document now belongs to someone else (its queue
+        lease was lost and the job re-queued) without writing to the store again.
+        """
+        with self._lock:
+            token = self._cancel_tokens.get(job_id)
+            if token is None:
+                return
+            self._abandoned.add(job_id)
+            # Progress, findings and events of the stopping scan are no longer recorded
+            self._jobs.pop(job_id, None)
+            self._dirty.discard(job_id)
+            self._pending_events.pop(job_id, None)
+        token.cancel(reason)
 
     def get_status(self, job_id: str) -> dict[str, Any] | None:
         """Get scan status by job_id."""
-        return self._jobs.get(job_id)
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                # Snapshot: the scan thread keeps mutating the live dict
+                snapshot = _snapshot(job)
+                if job["status"] == "queued":
+                    snapshot.update(self._queue_info().get(job_id, {}))
+                return snapshot
+            job = self._store.get(job_id)
+            if job is not None and job.get("status") == "queued" and self._shared is not None:
+                job = {**job, **self._queue_info().get(job_id, {})}
+            return job
+
+    def exists(self, job_id: str) -> bool:
+        """Whether the job is known (queued, running, or finished and not yet expired)."""
+        with self._lock:
+            if job_id in self._jobs:
+                return True
+        return self._store.exists(job_id)
 
     def generate_report(self, job_id: str) -> str:
         """Generate PDF report. Returns filename."""
-        data = self._jobs.get(job_id)
+        data = self.get_status(job_id)
         if not data:
             raise ValueError("Job not found")
-        if data.get("status") not in ("completed", "error"):
+        if data.get("status") not in ("completed", "cancelled", "error"):
             raise ValueError("Scan not yet completed")
 
         REPORTS_DIR.mkdir(parents=True, exist_ok=True)
@@ -0,0 +1,159 @@
+"""
+Scan worker: runs jobs from the shared SQLite queue outside the API process.
+
+Start the API with SCAN_EXECUTION=worker and run any number of
+`python -m app.worker` processes against the same JOB_STORE_PATH.
+"""
+
+import argparse
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from app.core.config import (
+    SCAN_MAX_JOBS_PER_TENANT,
+    SCAN_MAX_RUNNING_JOBS,
+    WORKER_CONCURRENCY,
+    WORKER_HEARTBEAT_INTERVAL,
+    WORKER_LEASE_SECONDS,
+    WORKER_MAX_ATTEMPTS,
+    WORKER_POLL_INTERVAL,
+)
+from app.scanner import tool_registry
+from app.services.job_queue import QueuedJob, SQLiteJobQueue
+from app.services.job_store import JobStore, create_job_store
+from app.services.scan_service import ScanService
+
+
+class ScanWorker:
+    """
+    Claims up to concurrency jobs at a time from the shared queue and runs each in
+    a thread, renewing their leases every WORKER_HEARTBEAT_INTERVAL seconds. Jobs
+    whose worker stopped heartbeating are re-queued by whichever worker notices
+    first. A job whose lease this worker lost is stopped here without writing
+    its result, which would overwrite the re-queued run's document.
+    """
+
+    def __init__(
+        self,
+        queue: SQLiteJobQueue | None = None,
+        store: JobStore | None = None,
+        concurrency: int = WORKER_CONCURRENCY,
+    ) -> None:
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.queue = queue or SQLiteJobQueue()
+        self.store = store or create_job_store()
+        self.concurrency = max(1, concurrency)
+        self._service = ScanService(self.store, execution="inline")
+        self._active: dict[str, threading.Thread] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def run_forever(self) -> None:
+        """Poll for jobs until stop(); then wait for running jobs to finish."""
+        threading.Thread(target=self._heartbeat_loop, daemon=True).start()
+        while not self._stop.is_set():
+            self._requeue_expired()
+            self._claim_jobs()
+            self._stop.wait(WORKER_POLL_INTERVAL)
+        for thread in list(self._active.values()):
+            thread.join()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    @property
+    def stopping(self) -> bool:
+        return self._stop.is_set()
+
+    def _claim_jobs(self) -> None:
+        while len(self._active) < self.concurrency and not self._stop.is_set():
+            item = self.queue.claim(self.worker_id, SCAN_MAX_RUNNING_JOBS, SCAN_MAX_JOBS_PER_TENANT, WORKER_LEASE_SECONDS)
+            if item is None:
+                return
+            thread = threading.Thread(target=self._run, args=(item,), daemon=True)
+            with self._lock:
+                self._active[item.job_id] = thread
+            thread.start()
+
+    def _run(self, item: QueuedJob) -> None:
+        started = time.monotonic()
+        duration = None
+        try:
+            results = self._service.run_job(
+                item.job_id,
+                item.tenant,
+                item.params,
+                still_owner=lambda: self.queue.heartbeat(item.job_id, self.worker_id, WORKER_LEASE_SECONDS),
+            )
+            if results.get("status") == "completed":
+                duration = time.monotonic() - started
+        finally:
+            self.queue.complete(item.job_id, self.worker_id, duration)
+            with self._lock:
+                self._active.pop(item.job_id, None)
+
+    def _heartbeat_loop(self) -> None:
+        while True:
+            time.sleep(WORKER_HEARTBEAT_INTERVAL)
+            with self._lock:
+                job_ids = list(self._active)
+            for job_id in job_ids:
+                if not self.queue.heartbeat(job_id, self.worker_id, WORKER_LEASE_SECONDS):
+                    # Re-queued elsewhere after missed heartbeats; stop our copy
+                    self._service.abandon(job_id, reason="Worker lease lost")
+
+    def _requeue_expired(self) -> None:
+        requeued, dropped = self.queue.requeue_expired(WORKER_MAX_ATTEMPTS)
+        for job_id in requeued:
+            job = self.store.get(job_id) or {"job_id": job_id}
+            for key in ("started_at", "live_findings", "live_findings_total", "servers", "network_scans", "server_states", "tool_states"):
+                job.pop(key, None)
+            # The log continues after the last event the stored document includes
+            job.update(status="queued", progress=0, event_id=job.get("event_id", 0) + 1)
+            self.store.put(job_id, job)
+            self.store.append_events(job_id, [(job["event_id"], "status", {"status": "queued", "progress": 0})])
+        for job_id in dropped:
+            error = f"Scan worker lost {WORKER_MAX_ATTEMPTS} times"
+            event_id = (self.store.get(job_id) or {}).get("event_id", 0) + 1
+            self.store.put(
+                job_id,
+                {
+                    "job_id": job_id,
+                    "status": "error",
+                    "error": error,
+                    "timestamp": datetime.utcnow().isoformat(),
+                    "event_id": event_id,
+                },
+            )
+            self.store.append_events(job_id, [(event_id, "status", {"status": "error", "error": error})])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run scan jobs from the shared queue.")
+    parser.add_argument("--concurrency", type=int, default=WORKER_CONCURRENCY, help="jobs run at once")
+    args = parser.parse_args()
+
+    worker = ScanWorker(concurrency=args.concurrency)
+    tool_registry.refresh()
+
+    def handle_signal(signum, _frame):
+        if worker.stopping:
+            # Second signal: exit now; leases lapse and the jobs are re-queued
+            sys.exit(1)
+        print(f"Worker {worker.worker_id}: finishing running jobs", file=sys.stderr, flush=True)
+        worker.stop()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+    print(f"Worker {worker.worker_id} started (concurrency {worker.concurrency})", file=sys.stderr, flush=True)
+    worker.run_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -5,7 +5,9 @@ interface ScanResultsProps {
 }
 
 export function ScanResults({ status }: ScanResultsProps) {
-  if (!status?.servers && !status?.network_scans) {
+  const liveFindings = status?.live_findings ?? [];
+
+  if (!status?.servers && !status?.network_scans && liveFindings.length === 0) {
     return (
       <section className="card results-section">
         <h2>Results</h2>
@@ -25,6 +27,26 @@ export function ScanResults({ status }: ScanResultsProps) {
       {status.error && (
         <p className="status-fail">Error: {status.error}</p>
       )}
+      {status.status === "cancelled" && (
+        <p className="status-cancelled">
+          Scan cancelled{status.cancel_reason ? ` (${status.cancel_reason})` : ""}; partial results
+        </p>
+      )}
+      {liveFindings.length > 0 && (
+        <div className="result-server">
+          <h4>Live findings ({status.live_findings_total ?? liveFindings.length})</h4>
+          {liveFindings.map((f, i) => (
+            <div key={i} className="result-check">
+              <span>
+                {f.tool}: {f.template_id}
+              </span>
+              <span className={`status-${f.severity}`}>
+                {f.severity} {f.url}
+              </span>
+            </div>
+          ))}
+        </div>
+      )}
       {Object.entries(servers).map(([name, srv]) => (
         <div
           key={name}
@@ -1,8 +1,10 @@
-import { useState, useCallback } from "react";
+import { useState, useCallback, useEffect, useRef } from "react";
 import { api } from "../services/api";
-import type { ScanStatus } from "../types/scan";
+import type { LiveFinding, ScanStatus, ServerState } from "../types/scan";
 
 const POLL_INTERVAL_MS = 1500;
+const LIVE_FINDINGS_MAX = 200;
+const FINAL_STATUSES: ScanStatus["status"][] = ["completed", "cancelled", "error"];
 
 export function useScan() {
   const [jobId, setJobId] = useState<string | null>(null);
@@ -10,28 +12,149 @@ export function useScan() {
   const [isScanning, setIsScanning] = useState(false);
   const [reportFilename, setReportFilename] = useState<string | null>(null);
   const [reportError, setReportError] = useState<string | null>(null);
+  const sourceRef = useRef<EventSource | null>(null);
+  // Version the streamed status has full results up to, and whether a fetch is running or owed
+  const resultsRef = useRef({ version: 0, inFlight: false, again: false });
 
-  const pollStatus = useCallback(async (id: string) => {
-    const data = await api.getScanStatus(id);
-    setStatus(data);
-
-    if (data.status === "completed" || data.status === "error") {
-      setIsScanning(false);
-      try {
-        const { filename } = await api.generateReport(id);
-        setReportFilename(filename);
-        setReportError(null);
-      } catch (err) {
-        setReportError(err instanceof Error ? err.message : "Report generation failed");
+  const closeStream = useCallback(() => {
+    sourceRef.current?.close();
+    sourceRef.current = null;
+  }, []);
+
+  useEffect(() => closeStream, [closeStream]);
+
+  // Fetch the full job once it finished, then generate the report
+  const finishScan = useCallback(async (id: string) => {
+    setStatus(await api.getScanStatus(id));
+    setIsScanning(false);
+    try {
+      const { filename } = await api.generateReport(id);
+      setReportFilename(filename);
+      setReportError(null);
+    } catch (err) {
+      setReportError(err instanceof Error ? err.message : "Report generation failed");
+    }
+  }, []);
+
+  // Fallback when the event stream is unavailable: poll for changes since the last version
+  const pollStatus = useCallback(
+    async (id: string, since = 0) => {
+      const data: ScanStatus = await api.getScanStatus(id, { compact: true, since });
+      if (FINAL_STATUSES.includes(data.status)) {
+        await finishScan(id);
+        return;
       }
+      setStatus((prev) => ({
+        ...prev,
+        ...data,
+        servers: { ...prev?.servers, ...data.servers },
+        network_scans: { ...prev?.network_scans, ...data.network_scans },
+        live_findings: [...(prev?.live_findings ?? []), ...(data.live_findings ?? [])].slice(-LIVE_FINDINGS_MAX),
+      }));
+      setTimeout(() => pollStatus(id, data.version ?? since), POLL_INTERVAL_MS);
+    },
+    [finishScan]
+  );
+
+  // Events only carry compact server/tool states; fetch the results that changed since the last fetch
+  const syncResults = useCallback(async (id: string) => {
+    const sync = resultsRef.current;
+    if (sync.inFlight) {
+      sync.again = true;
       return;
     }
-
-    setTimeout(() => pollStatus(id), POLL_INTERVAL_MS);
+    sync.inFlight = true;
+    try {
+      do {
+        sync.again = false;
+        const data: ScanStatus = await api.getScanStatus(id, { compact: true, since: sync.version });
+        sync.version = data.version ?? sync.version;
+        setStatus((prev) =>
+          prev
+            ? {
+                ...prev,
+                servers: { ...prev.servers, ...data.servers },
+                network_scans: { ...prev.network_scans, ...data.network_scans },
+              }
+            : prev
+        );
+      } while (sync.again);
+    } finally {
+      sync.inFlight = false;
+    }
   }, []);
 
+  // Apply pushed events to the status; the browser resumes from Last-Event-ID on reconnect
+  const streamStatus = useCallback(
+    (id: string) => {
+      const source = new EventSource(api.getScanEventsUrl(id));
+      sourceRef.current = source;
+
+      function on<T>(event: string, apply: (prev: ScanStatus, data: T) => ScanStatus) {
+        source.addEventListener(event, (e) => {
+          const data = JSON.parse((e as MessageEvent).data) as T;
+          setStatus((prev) => (prev ? apply(prev, data) : prev));
+        });
+      }
+
+      source.addEventListener("snapshot", (e) => {
+        const data = JSON.parse((e as MessageEvent).data) as ScanStatus;
+        resultsRef.current.version = data.event_id ?? 0;
+        setStatus(data);
+        if (FINAL_STATUSES.includes(data.status)) {
+          closeStream();
+          finishScan(id);
+        }
+      });
+      on<Pick<ScanStatus, "queue_position" | "estimated_start">>("queue", (prev, data) => ({ ...prev, ...data }));
+      // Also carries live_findings_total, which "finding" events stop tracking past the server's cap
+      on<Pick<ScanStatus, "progress" | "live_findings_total">>("progress", (prev, data) => ({ ...prev, ...data }));
+      on<LiveFinding>("finding", (prev, data) => ({
+        ...prev,
+        live_findings: [...(prev.live_findings ?? []), data].slice(-LIVE_FINDINGS_MAX),
+        live_findings_total: (prev.live_findings_total ?? 0) + 1,
+      }));
+      source.addEventListener("server", (e) => {
+        const { name, ...state } = JSON.parse((e as MessageEvent).data) as ServerState & { name: string };
+        const version = Number((e as MessageEvent).lastEventId);
+        setStatus((prev) =>
+          prev ? { ...prev, server_states: { ...prev.server_states, [name]: { ...state, version } } } : prev
+        );
+        syncResults(id);
+      });
+      source.addEventListener("tool", (e) => {
+        const { tool, ...state } = JSON.parse((e as MessageEvent).data) as { tool: string; status: string };
+        const version = Number((e as MessageEvent).lastEventId);
+        setStatus((prev) =>
+          prev ? { ...prev, tool_states: { ...prev.tool_states, [tool]: { ...state, version } } } : prev
+        );
+        syncResults(id);
+      });
+      // Side effects stay out of the updater, which StrictMode runs twice
+      source.addEventListener("status", (e) => {
+        const data = JSON.parse((e as MessageEvent).data) as Partial<ScanStatus>;
+        setStatus((prev) => (prev ? { ...prev, ...data } : prev));
+        if (data.status && FINAL_STATUSES.includes(data.status)) {
+          // The final document carries the full results
+          closeStream();
+          finishScan(id);
+        }
+      });
+
+      source.onerror = () => {
+        // Fall back to polling once the browser stops reconnecting
+        if (source.readyState === EventSource.CLOSED && sourceRef.current === source) {
+          sourceRef.current = null;
+          pollStatus(id);
+        }
+      };
+    },
+    [closeStream, finishScan, pollStatus, syncResults]
+  );
+
   const startScan = useCallback(
     async (servers: Array<{ host: string; user: string; key_base64: string }>) => {
+      closeStream();
       setReportFilename(null);
       setReportError(null);
       setStatus(null);
@@ -39,18 +162,23 @@ export function useScan() {
 
       const { job_id } = await api.startScan(servers);
       setJobId(job_id);
-      pollStatus(job_id);
+      streamStatus(job_id);
     },
-    [pollStatus]
+    [closeStream, streamStatus]
   );
 
+  const cancelScan = useCallback(async () => {
+    if (jobId) await api.cancelScan(jobId);
+  }, [jobId]);
+
   const reset = useCallback(() => {
+    closeStream();
     setJobId(null);
     setStatus(null);
     setIsScanning(false);
     setReportFilename(null);
     setReportError(null);
-  }, []);
+  }, [closeStream]);
 
   return {
     jobId,
@@ -59,6 +187,7 @@ export function useScan() {
     reportFilename,
     reportError,
     startScan,
+    cancelScan,
     reset,
   };
 }
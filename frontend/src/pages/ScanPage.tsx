@@ -21,6 +21,7 @@ export function ScanPage() {
     reportFilename,
     reportError,
     startScan,
+    cancelScan,
   } = useScan();
 
   const validServers = servers.filter((s) => s.host.trim() && s.keyBase64);
@@ -63,10 +64,28 @@ export function ScanPage() {
           <span className="btn-text">Start Full Scan</span>
           <span className="btn-desc">Runs all security checks automatically</span>
         </button>
+        {isScanning && (
+          <button
+            type="button"
+            className="btn btn-secondary"
+            onClick={cancelScan}
+            disabled={status?.status === "cancelling"}
+          >
+            {status?.status === "cancelling" ? "Cancelling..." : "Cancel Scan"}
+          </button>
+        )}
         <ProgressBar
           progress={status?.progress ?? 0}
-          text={status?.progress === 100 ? "Complete" : `Scanning... ${status?.progress ?? 0}%`}
-          isVisible={isScanning || (status?.progress === 100 && !!status)}
+          text={
+            status?.status === "cancelled"
+              ? "Cancelled"
+              : status?.status === "queued"
+                ? `Queued (position ${status.queue_position ?? "?"})`
+                : status?.progress === 100
+                ? "Complete"
+                : `Scanning... ${status?.progress ?? 0}%`
+          }
+          isVisible={isScanning || (!!status && (status.progress === 100 || status.status === "cancelled"))}
         />
       </section>
 
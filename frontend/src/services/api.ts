@@ -12,13 +12,28 @@ export const api = {
     return data as { job_id: string };
   },
 
-  async getScanStatus(jobId: string) {
-    const res = await fetch(`${API_BASE}/scan/${jobId}/status`);
+  // Compact status; with since, plus the results changed after that version; full = whole job
+  async getScanStatus(jobId: string, opts: { compact?: boolean; since?: number } = {}) {
+    const params = new URLSearchParams();
+    if (opts.compact) params.set("view", "compact");
+    if (opts.since !== undefined) params.set("since", String(opts.since));
+    const res = await fetch(`${API_BASE}/scan/${jobId}/status?${params}`);
     const data = await res.json();
     if (!res.ok) throw new Error(data.detail || "Failed to get status");
     return data;
   },
 
+  getScanEventsUrl(jobId: string): string {
+    return `${API_BASE}/scan/${jobId}/events`;
+  },
+
+  async cancelScan(jobId: string) {
+    const res = await fetch(`${API_BASE}/scan/${jobId}`, { method: "DELETE" });
+    const data = await res.json();
+    if (!res.ok) throw new Error(data.detail || "Failed to cancel scan");
+    return data as { job_id: string; status: string };
+  },
+
   async generateReport(jobId: string) {
     const res = await fetch(`${API_BASE}/report/generate`, {
       method: "POST",
@@ -8,14 +8,33 @@ export interface ServerInput {
 
 export interface ScanStatus {
   job_id: string;
-  status: "running" | "completed" | "error";
+  status: "queued" | "running" | "cancelling" | "completed" | "cancelled" | "error";
   progress: number;
   servers?: Record<string, ServerResult>;
   network_scans?: Record<string, NetworkScanResult>;
+  live_findings?: LiveFinding[];
+  live_findings_total?: number;
+  cancel_reason?: string;
+  queue_position?: number;
+  estimated_start?: string;
+  event_id?: number;
+  version?: number;
+  server_states?: Record<string, ServerState>;
+  tool_states?: Record<string, { status: string; version: number }>;
   error?: string;
   timestamp?: string;
 }
 
+export interface ServerState {
+  host: string;
+  reachable: boolean;
+  error?: string;
+  cancelled?: boolean;
+  checks: Record<string, number>;
+  lynis?: string;
+  version: number;
+}
+
 export interface ServerResult {
   host: string;
   user: string;
@@ -26,7 +45,7 @@ export interface ServerResult {
 }
 
 export interface CheckResult {
-  status: "pass" | "warn" | "fail" | "info" | "n/a";
+  status: "pass" | "warn" | "fail" | "info" | "n/a" | "cancelled";
   message?: string;
   findings?: string[];
 }
@@ -38,6 +57,14 @@ export interface LynisResult {
   suggestions?: string[];
 }
 
+export interface LiveFinding {
+  tool: string;
+  template_id: string;
+  name: string;
+  severity: string;
+  url: string;
+}
+
 export interface NetworkScanResult {
   status: string;
   message?: string;
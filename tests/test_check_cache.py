@@ -0,0 +1,66 @@
+"""Per-host check result cache: hits, invalidation and which results are stored."""
+
+import pytest
+
+from app.scanner import builtin
+from app.scanner.cache import CheckResultCache
+
+KEY = ("10.0.0.1", 22, "root", "ssh_config")
+
+
+@pytest.fixture
+def cache():
+    return CheckResultCache(ttl=60, max_entries=2)
+
+
+def test_hit_while_fingerprint_matches(cache):
+    cache.put(KEY, "fp1", {"status": "pass"}, 1500)
+    hit = cache.get(KEY, "fp1")
+    assert hit["status"] == "pass"
+    assert hit["cached"] is True
+    assert hit["saved_seconds"] == 1.5
+
+
+def test_changed_fingerprint_invalidates(cache):
+    cache.put(KEY, "fp1", {"status": "pass"}, 10)
+    assert cache.get(KEY, "fp2") is None
+    assert cache.get(KEY, "fp1") is None
+
+
+@pytest.mark.parametrize("result", [
+    {"status": "error", "error": "Connection reset"},
+    {"status": "cancelled", "error": "Cancelled by user"},
+    {"status": "info", "cancelled": True},
+])
+def test_unfinished_results_are_not_stored(cache, result):
+    cache.put(KEY, "fp1", result, 10)
+    assert cache.get(KEY, "fp1") is None
+    assert len(cache) == 0
+
+
+def test_lru_bound(cache):
+    for check in ("a", "b", "c"):
+        cache.put((*KEY[:3], check), "fp", {"status": "pass"}, 10)
+    assert len(cache) == 2
+    assert cache.get((*KEY[:3], "a"), "fp") is None
+
+
+def test_disabled_with_zero_ttl():
+    cache = CheckResultCache(ttl=0)
+    cache.put(KEY, "fp1", {"status": "pass"}, 10)
+    assert cache.get(KEY, "fp1") is None
+
+
+class _Executor:
+    host, port, user = KEY[:3]
+
+
+@pytest.mark.parametrize("raw", [
+    {"success": False, "stdout": "", "stderr": "", "exit_code": -1, "error": "Cancelled", "cancelled": True},
+    {"success": False, "stdout": "", "stderr": "", "exit_code": -1, "error": "Command timed out after 10s"},
+])
+def test_check_that_did_not_finish_is_not_cached(monkeypatch, cache, raw):
+    monkeypatch.setattr(builtin, "check_cache", cache)
+    result = builtin._check_result("ssh_config", raw)
+    builtin._store_result(_Executor(), "ssh_config", {"ssh_config": "fp1"}, result, raw)
+    assert len(cache) == 0
@@ -0,0 +1,229 @@
+"""SSHExecutor and AsyncSSHExecutor against an in-process asyncssh server running local commands."""
+
+import asyncio
+import threading
+import time
+
+import asyncssh
+import pytest
+
+from app.scanner import builtin, lynis
+from app.scanner.async_executor import AsyncSSHExecutor
+from app.scanner.cache import CheckResultCache
+from app.scanner.executor import SSHExecutor
+
+BACKENDS = ("paramiko", "asyncssh")
+
+
+class _Server(asyncssh.SSHServer):
+    def begin_auth(self, username: str) -> bool:
+        return True
+
+    def public_key_auth_supported(self) -> bool:
+        return True
+
+    def validate_public_key(self, username: str, key: asyncssh.SSHKey) -> bool:
+        return True
+
+
+async def _handle(process: asyncssh.SSHServerProcess) -> None:
+    """Run the requested command in a local shell, streaming its output back."""
+    proc = await asyncio.create_subprocess_shell(
+        process.command,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+
+    async def pump(src: asyncio.StreamReader, dst) -> None:
+        while chunk := await src.read(65536):
+            dst.write(chunk)
+            await dst.drain()
+
+    try:
+        await asyncio.gather(pump(proc.stdout, process.stdout), pump(proc.stderr, process.stderr))
+        process.exit(await proc.wait())
+    except Exception:
+        # The client closed the channel (e.g. after its timeout)
+        proc.kill()
+        process.close()
+
+
+@pytest.fixture(scope="module")
+def ssh_server():
+    """(port, client private key) of a server on 127.0.0.1, run on its own event loop thread."""
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    host_key = asyncssh.generate_private_key("ssh-ed25519")
+    client_key = asyncssh.generate_private_key("ssh-ed25519").export_private_key("openssh")
+
+    async def start() -> asyncssh.SSHAcceptor:
+        return await asyncssh.create_server(
+            _Server, "127.0.0.1", 0, server_host_keys=[host_key], process_factory=_handle, encoding=None,
+            sftp_factory=True,
+        )
+
+    acceptor = asyncio.run_coroutine_threadsafe(start(), loop).result(10)
+    yield acceptor.sockets[0].getsockname()[1], client_key
+    acceptor.close()
+    loop.call_soon_threadsafe(loop.stop)
+
+
+def run(backend: str, server: tuple[int, bytes], command: str, **kwargs) -> dict:
+    port, key = server
+    if backend == "paramiko":
+        with SSHExecutor("127.0.0.1", "scan", key, port=port, timeout=10) as executor:
+            return executor.run(command, **kwargs)
+
+    async def run_async() -> dict:
+        async with AsyncSSHExecutor("127.0.0.1", "scan", key, port=port, timeout=10) as executor:
+            return await executor.run(command, **kwargs)
+
+    return asyncio.run(run_async())
+
+
+def run_with(backend: str, server: tuple[int, bytes], check, check_async, *args, **kwargs) -> dict:
+    """check(executor, ...) with the sync backend, or check_async(executor, ...) with the async one."""
+    port, key = server
+    if backend == "paramiko":
+        with SSHExecutor("127.0.0.1", "scan", key, port=port, timeout=10) as executor:
+            return check(executor, *args, **kwargs)
+
+    async def run_async() -> dict:
+        async with AsyncSSHExecutor("127.0.0.1", "scan", key, port=port, timeout=10) as executor:
+            return await check_async(executor, *args, **kwargs)
+
+    return asyncio.run(run_async())
+
+
+def run_checks(backend: str, server: tuple[int, bytes], tests: list[str], **kwargs) -> dict:
+    return run_with(backend, server, builtin.run_builtin_checks, builtin.run_builtin_checks_async, tests, **kwargs)
+
+
+@pytest.fixture
+def fake_checks(monkeypatch, tmp_path):
+    """Two local checks (one fingerprinted by a file's content) and an empty check cache."""
+    marker = tmp_path / "fingerprint"
+    marker.write_text("v1")
+    monkeypatch.setattr(builtin, "CHECKS", {
+        "hello": {"command": "echo hello", "timeout": 5, "parse": lambda r: {"out": r["stdout"].strip()}},
+        "slow": {
+            "command": "sleep 0.2; echo slow; exit 1",
+            "timeout": 5,
+            "fingerprint": f"cat {marker}",
+            "parse": lambda r: {"out": r["stdout"].strip()},
+        },
+    })
+    monkeypatch.setattr(builtin, "check_cache", CheckResultCache(ttl=60))
+    return marker
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_exit_code_and_streams(ssh_server, backend):
+    r = run(backend, ssh_server, "echo out; echo err >&2; exit 3")
+    assert r["exit_code"] == 3
+    assert not r["success"]
+    assert r["error"] is None
+    assert r["stdout"] == "out\n"
+    assert r["stderr"] == "err\n"
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_timeout_keeps_partial_output(ssh_server, backend):
+    started = time.monotonic()
+    r = run(backend, ssh_server, "echo started; sleep 10", timeout=1)
+    assert time.monotonic() - started < 5
+    assert r["exit_code"] == -1
+    assert "timed out" in r["error"]
+    assert r["stdout"] == "started\n"
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_truncation_keeps_head_and_tail(ssh_server, backend):
+    r = run(backend, ssh_server, "printf head; head -c 100000 /dev/zero | tr '\\0' x; printf tail", max_bytes=1000)
+    assert r["success"]
+    assert r["truncated"]
+    assert r["stdout_bytes"] == 100008
+    assert r["stdout"].startswith("head" + "x" * 496)
+    assert r["stdout"].endswith("x" * 496 + "tail")
+    assert "bytes truncated" in r["stdout"]
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_compressed_output_keeps_exit_code(ssh_server, backend):
+    chunks = []
+    r = run(
+        backend, ssh_server, "seq 1 20000; exit 2", compress_output=True, max_bytes=4096,
+        on_chunk=lambda stream, data: chunks.append(data) if stream == "stdout" else None,
+    )
+    assert r["exit_code"] == 2
+    assert r["stderr"] == ""
+    assert b"".join(chunks).decode() == "".join(f"{i}\n" for i in range(1, 20001))
+
+
+def test_is_alive_keeps_the_connection_usable(ssh_server):
+    port, key = ssh_server
+    with SSHExecutor("127.0.0.1", "scan", key, port=port, timeout=10) as executor:
+        assert executor.is_alive()
+        time.sleep(0.2)
+        assert executor.is_alive()
+        assert executor.run("echo ok")["stdout"] == "ok\n"
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("mode", builtin.CHECK_MODES)
+def test_builtin_checks_in_every_mode(ssh_server, fake_checks, backend, mode):
+    results = run_checks(backend, ssh_server, ["slow", "unknown", "hello"], mode=mode)
+    assert list(results) == ["slow", "hello"]
+    assert results["hello"] == {"out": "hello", "success": True}
+    assert results["slow"] == {"out": "slow", "success": False}
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_builtin_checks_reuse_results_while_the_fingerprint_holds(ssh_server, fake_checks, backend):
+    run_checks(backend, ssh_server, ["slow", "hello"])
+    assert run_checks(backend, ssh_server, ["slow", "hello"])["slow"]["cached"]
+    assert "cached" not in run_checks(backend, ssh_server, ["slow"], force=True)["slow"]
+    fake_checks.write_text("v2")
+    assert "cached" not in run_checks(backend, ssh_server, ["slow"])["slow"]
+
+
+@pytest.fixture
+def lynis_report(monkeypatch, tmp_path):
+    """A local lynis-report.dat that the Lynis check "audits" and reads."""
+    report = tmp_path / "lynis-report.dat"
+    report.write_text(
+        "lynis_version=3.0.9\nhardening_index=71\n"
+        "warning[]=SSH-7408|Weak SSH setting|PermitRootLogin|Disable root login\n"
+        "suggestion[]=PKGS-7370|Install debsums|-|-\n"
+    )
+    monkeypatch.setattr(lynis, "LYNIS_REPORT_PATH", str(report))
+    monkeypatch.setattr(lynis, "LYNIS_COMMAND", f"stat -c '%Y %s' {report}")
+    monkeypatch.setattr(lynis, "_CAT_REPORT", f"cat {report}")
+    monkeypatch.setattr(lynis, "_report_cache", lynis.OrderedDict())
+    return report
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("compress_output", [False, True])
+def test_lynis_reads_and_parses_the_report(ssh_server, lynis_report, backend, compress_output):
+    r = run_with(backend, ssh_server, lynis.run_lynis, lynis.run_lynis_async, compress_output=compress_output)
+    assert r["hardening_index"] == 71
+    assert r["warnings"] == ["[SSH-7408] Weak SSH setting (PermitRootLogin)"]
+    assert [s["test_id"] for s in r["suggestion_details"]] == ["PKGS-7370"]
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_lynis_empty_report_is_unreadable(ssh_server, lynis_report, backend):
+    lynis_report.write_text("")
+    r = run_with(backend, ssh_server, lynis.run_lynis, lynis.run_lynis_async)
+    assert r["status"] == "info"
+    assert "report is empty" in r["message"]
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_lynis_failed_read_is_unreadable(ssh_server, lynis_report, backend, monkeypatch):
+    monkeypatch.setattr(lynis, "LYNIS_REPORT_PATH", str(lynis_report) + ".missing")
+    r = run_with(backend, ssh_server, lynis.run_lynis, lynis.run_lynis_async)
+    assert r["status"] == "info"
+    assert r["message"].startswith("Lynis report not readable")
@@ -0,0 +1,110 @@
+"""SQLite job queue shared by workers: claims, leases and re-queueing."""
+
+import sqlite3
+import sys
+
+import pytest
+from cryptography.fernet import Fernet
+
+import app.services  # noqa: F401  (registers the module below)
+from app.services.job_queue import QueueFull, SQLiteJobQueue
+from app.services.job_store import MemoryJobStore
+from app.worker import ScanWorker
+
+scan_service = sys.modules["app.services.scan_service"]
+
+LEASE = 60
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return SQLiteJobQueue(tmp_path / "jobs.db", max_size=10, key=Fernet.generate_key())
+
+
+def test_claims_follow_priority_then_arrival(queue):
+    queue.push("low", "a", "low", {})
+    queue.push("normal-1", "a", "normal", {})
+    queue.push("high", "a", "high", {})
+    queue.push("normal-2", "a", "normal", {})
+    claimed = [queue.claim("w", 10, 10, LEASE).job_id for _ in range(4)]
+    assert claimed == ["high", "normal-1", "normal-2", "low"]
+    assert queue.claim("w", 10, 10, LEASE) is None
+
+
+def test_claims_respect_running_budget_and_tenant_cap(queue):
+    for job_id, tenant in (("a1", "a"), ("a2", "a"), ("b1", "b"), ("b2", "b")):
+        queue.push(job_id, tenant, "normal", {})
+    assert queue.claim("w1", 3, 1, LEASE).job_id == "a1"
+    # a2 waits for tenant a; b1 starts ahead of it
+    assert queue.claim("w2", 3, 1, LEASE).job_id == "b1"
+    assert queue.claim("w3", 3, 1, LEASE) is None
+    queue.complete("a1", "w1")
+    assert queue.claim("w3", 3, 1, LEASE).job_id == "a2"
+    # Global budget of 2 reached
+    assert queue.claim("w4", 2, 5, LEASE) is None
+
+
+def test_push_rejects_when_full(tmp_path):
+    queue = SQLiteJobQueue(tmp_path / "jobs.db", max_size=1, key=Fernet.generate_key())
+    queue.push("a", "t", "normal", {})
+    with pytest.raises(QueueFull):
+        queue.push("b", "t", "normal", {})
+
+
+def test_params_are_encrypted_at_rest(queue):
+    queue.push("a", "t", "normal", {"servers": [{"key_base64": "SECRET-KEY"}]})
+    (params,) = sqlite3.connect(queue.path).execute("SELECT params FROM job_queue").fetchone()
+    assert b"SECRET-KEY" not in params
+    assert queue.claim("w", 1, 1, LEASE).params == {"servers": [{"key_base64": "SECRET-KEY"}]}
+
+
+def test_heartbeat_fails_once_the_lease_is_requeued(queue):
+    queue.push("a", "t", "normal", {"n": 1})
+    queue.claim("w1", 1, 1, 0)
+    assert queue.requeue_expired(max_attempts=3) == (["a"], [])
+    assert not queue.heartbeat("a", "w1", LEASE)
+    item = queue.claim("w2", 1, 1, LEASE)
+    assert (item.job_id, item.params) == ("a", {"n": 1})
+    assert queue.heartbeat("a", "w2", LEASE)
+    # A renewed lease is not re-queued
+    assert queue.requeue_expired(max_attempts=3) == ([], [])
+
+
+def test_requeue_drops_jobs_after_max_attempts(queue):
+    queue.push("a", "t", "normal", {})
+    queue.claim("w", 1, 1, 0)
+    assert queue.requeue_expired(max_attempts=2) == (["a"], [])
+    queue.claim("w", 1, 1, 0)
+    assert queue.requeue_expired(max_attempts=2) == ([], ["a"])
+    assert queue.pending() == []
+
+
+def test_lost_owner_does_not_store_the_final_document(monkeypatch):
+    monkeypatch.setattr(scan_service, "run_scan", lambda **_: {"status": "completed"})
+    store = MemoryJobStore()
+    store.put("a", {"job_id": "a", "status": "queued", "progress": 0})
+    service = scan_service.ScanService(store=store, execution="inline")
+    params = {"servers": [], "auto_mode": True, "scan_options": {}, "deadline": None}
+    assert service.run_job("a", "t", params, still_owner=lambda: False)["status"] == "completed"
+    assert store.get("a")["status"] == "running"
+
+
+def test_worker_requeues_and_drops_lapsed_jobs(queue, monkeypatch):
+    monkeypatch.setattr("app.worker.WORKER_MAX_ATTEMPTS", 2)
+    store = MemoryJobStore()
+    store.put("a", {"job_id": "a", "status": "running", "progress": 40, "servers": {"web": {}}, "event_id": 7})
+    store.append_events("a", [(7, "progress", {"progress": 40})])
+    queue.push("a", "t", "normal", {})
+    worker = ScanWorker(queue=queue, store=store)
+
+    queue.claim("w", 1, 1, 0)
+    worker._requeue_expired()
+    job = store.get("a")
+    assert (job["status"], job["progress"], job["event_id"]) == ("queued", 0, 8)
+    assert "servers" not in job
+    assert store.events("a", 7) == [(8, "status", {"status": "queued", "progress": 0})]
+
+    queue.claim("w", 1, 1, 0)
+    worker._requeue_expired()
+    assert store.get("a")["status"] == "error"
+    assert store.events("a", 8)[0][:2] == (9, "status")
@@ -0,0 +1,16 @@
+"""Nmap timing profiles."""
+
+import importlib
+
+from app.core import config
+from app.scanner.nmap import NMAP_PROFILES
+
+
+def test_default_profile_keeps_baseline_timing(monkeypatch):
+    monkeypatch.delenv("NMAP_PROFILE", raising=False)
+    assert importlib.reload(config).NMAP_PROFILE == "standard"
+    assert NMAP_PROFILES["standard"] == ["-T4"]
+
+
+def test_configured_profile_exists():
+    assert config.NMAP_PROFILE in NMAP_PROFILES
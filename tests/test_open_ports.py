@@ -0,0 +1,45 @@
+"""Listening ports from the open_ports check and the Nikto URL pruning built on them."""
+
+from app.scanner.builtin import _parse_open_ports
+from app.scanner.nikto import prune_urls
+from app.scanner.orchestrator import _known_open_ports
+
+SS_OUTPUT = """\
+State  Recv-Q Send-Q Local Address:Port  Peer Address:Port Process
+LISTEN 0      128          0.0.0.0:22         0.0.0.0:*     users:(("sshd",pid=1,fd=3))
+LISTEN 0      511          [::]:443              [::]:*
+LISTEN 0      4096     127.0.0.1:5432         0.0.0.0:*
+LISTEN 0      4096         [::1]:6379            [::]:*
+LISTEN 0      128                *:8080              *:*
+"""
+
+NETSTAT_OUTPUT = """\
+Active Internet connections (only servers)
+Proto Recv-Q Send-Q Local Address           Foreign Address         State       PID/Program name
+tcp        0      0 0.0.0.0:80              0.0.0.0:*               LISTEN      10/nginx
+tcp        0      0 127.0.0.1:3306          0.0.0.0:*               LISTEN      11/mysqld
+"""
+
+
+def test_ss_output_skips_loopback():
+    assert _parse_open_ports({"stdout": SS_OUTPUT})["listening"] == [22, 443, 8080]
+
+
+def test_netstat_output():
+    assert _parse_open_ports({"stdout": NETSTAT_OUTPUT})["listening"] == [80]
+
+
+def test_missing_tools_leave_ports_unknown():
+    assert _parse_open_ports({"stdout": "N/A\n"})["listening"] is None
+    assert _parse_open_ports({"stdout": ""})["listening"] is None
+
+
+def test_unknown_ports_do_not_prune_urls():
+    servers = {
+        "web": {"host": "10.0.0.1", "checks": {"open_ports": _parse_open_ports({"stdout": "N/A\n"})}},
+        "db": {"host": "10.0.0.2", "checks": {"open_ports": _parse_open_ports({"stdout": NETSTAT_OUTPUT})}},
+    }
+    known = _known_open_ports(servers, None)
+    assert known == {"10.0.0.2": {80}}
+    urls = ["http://10.0.0.1", "https://10.0.0.1", "http://10.0.0.2", "https://10.0.0.2"]
+    assert prune_urls(urls, known) == (urls[:3], ["https://10.0.0.2"])
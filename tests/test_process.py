@@ -0,0 +1,57 @@
+"""Local tool runner: result shape and cancellation of runs waiting for a tool slot."""
+
+import pytest
+
+from app.scanner import nmap
+from app.scanner.cancel import CancelToken
+from app.scanner.process import _slots, run_process
+
+RESULT_KEYS = {
+    "success", "stdout", "stderr", "exit_code", "error", "stdout_bytes",
+    "stderr_bytes", "truncated", "elapsed_ms", "timed_out", "cancelled",
+}
+
+
+@pytest.fixture
+def busy_tool():
+    """Hold every slot of a tool so the next run has to wait."""
+    held = []
+
+    def hold(tool: str) -> None:
+        slots = _slots(tool)
+        while slots.acquire(blocking=False):
+            held.append(slots)
+
+    yield hold
+    for slots in held:
+        slots.release()
+
+
+def test_finished_run_has_every_key():
+    r = run_process(["sh", "-c", "echo out; exit 4"], "test-finished", 10)
+    assert set(r) == RESULT_KEYS
+    assert r["exit_code"] == 4
+    assert r["stdout"] == "out\n"
+    assert not r["timed_out"] and not r["cancelled"]
+
+
+def test_cancelled_while_waiting_for_a_slot(busy_tool):
+    busy_tool("test-waiting")
+    cancel = CancelToken()
+    cancel.cancel("Stopped by test")
+    r = run_process(["sh", "-c", "echo never"], "test-waiting", 10, cancel=cancel)
+    assert set(r) == RESULT_KEYS
+    assert r["cancelled"]
+    assert not r["timed_out"]
+    assert r["error"] == "Stopped by test"
+
+
+def test_nmap_cancelled_while_waiting_reports_cancelled(busy_tool, monkeypatch):
+    monkeypatch.setattr(nmap.tool_registry, "available", lambda name: True)
+    busy_tool("nmap")
+    cancel = CancelToken()
+    cancel.cancel("Stopped by test")
+    result = nmap.run_nmap(["192.0.2.1"], cancel=cancel)
+    assert result["status"] == "cancelled"
+    assert result["message"].startswith("Stopped by test")
+    assert result["results"][0]["output"] == "Stopped by test"
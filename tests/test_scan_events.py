@@ -0,0 +1,58 @@
+"""Scan service event log: ids, write order and the finding-event cap."""
+
+import sys
+
+import pytest
+
+import app.services  # noqa: F401  (registers the module below)
+from app.services.job_store import MemoryJobStore, SQLiteJobStore
+
+scan_service = sys.modules["app.services.scan_service"]
+
+
+@pytest.fixture
+def fake_scan(monkeypatch):
+    """run_scan stand-in reporting 5 findings, a finished server and progress."""
+
+    def run_scan(progress_callback, finding_callback, event_callback, cancel, **_):
+        for i in range(5):
+            finding_callback("nuclei", {"id": i})
+        event_callback("server", {"name": "web", "host": "10.0.0.1", "reachable": True, "checks": {}})
+        progress_callback(100)
+        return {"status": "completed", "servers": {"web": {"host": "10.0.0.1", "reachable": True, "checks": {}}}}
+
+    monkeypatch.setattr(scan_service, "run_scan", run_scan)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def service(request, tmp_path):
+    store = MemoryJobStore() if request.param == "memory" else SQLiteJobStore(tmp_path / "jobs.db")
+    return scan_service.ScanService(store=store)
+
+
+def _run(service: "scan_service.ScanService") -> tuple[dict, list]:
+    job_id = service.start_scan([{"host": "10.0.0.1"}])
+    # Inline jobs run in a thread; wait for the final document
+    for _ in range(500):
+        job = service.get_status(job_id)
+        if job["status"] == "completed" and service._store.events(job_id, job["event_id"] - 1):
+            break
+        scan_service.time.sleep(0.01)
+    return job, service.events(job_id)
+
+
+def test_events_are_logged_in_order_up_to_the_document_version(fake_scan, service):
+    job, events = _run(service)
+    ids = [event_id for event_id, _, _ in events]
+    assert ids == list(range(1, len(ids) + 1))
+    assert ids[-1] == job["event_id"]
+    assert events[-1][1] == "status" and events[-1][2]["status"] == "completed"
+    assert job["server_states"]["web"]["version"] == next(i for i, e, _ in events if e == "server")
+
+
+def test_finding_events_stop_at_the_cap(fake_scan, service, monkeypatch):
+    monkeypatch.setattr(scan_service, "SCAN_FINDING_EVENTS_MAX", 2)
+    job, events = _run(service)
+    assert [data["id"] for _, e, data in events if e == "finding"] == [0, 1]
+    assert job["live_findings_total"] == 5
+    assert ("progress", {"progress": 100, "live_findings_total": 5}) in [(e, d) for _, e, d in events]
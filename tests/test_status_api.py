@@ -0,0 +1,64 @@
+"""Status endpoint: ETag / If-None-Match and compact deltas since a version."""
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.responses import ResponseCache
+from app.api.routes import scan as routes
+from app.services.job_store import MemoryJobStore
+from app.services.scan_service import ScanService
+
+
+@pytest.fixture
+def service(monkeypatch):
+    service = ScanService(store=MemoryJobStore())
+    monkeypatch.setattr(routes, "scan_service", service)
+    monkeypatch.setattr(routes, "response_cache", ResponseCache())
+    return service
+
+
+@pytest.fixture
+def client(service):
+    app = FastAPI()
+    app.include_router(routes.router, prefix="/api/scan")
+    return TestClient(app)
+
+
+@pytest.fixture
+def running_job(service):
+    """A running job (as a worker would store it) with one finished server."""
+    service._store.put("job", {"job_id": "job", "status": "running", "progress": 0})
+    service._jobs["job"] = {"job_id": "job", "status": "running", "progress": 0}
+    service._add_event("job", "server", {"name": "web", "host": "10.0.0.1", "reachable": True, "checks": {}})
+    return service._jobs["job"]
+
+
+def test_matching_etag_returns_304(client, running_job):
+    first = client.get("/api/scan/job/status")
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert etag.startswith('W/"')
+    assert client.get("/api/scan/job/status", headers={"If-None-Match": etag}).status_code == 304
+
+    running_job["progress"] = 50
+    changed = client.get("/api/scan/job/status", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+
+def test_compact_since_returns_only_newer_results(client, service, running_job):
+    version = client.get("/api/scan/job/status", params={"view": "compact"}).json()["version"]
+    assert version == running_job["event_id"]
+
+    service._add_event("job", "server", {"name": "db", "host": "10.0.0.2", "reachable": False, "checks": {}})
+    delta = client.get("/api/scan/job/status", params={"view": "compact", "since": version}).json()
+    assert list(delta["servers"]) == ["db"]
+    assert set(delta["server_states"]) == {"web", "db"}
+
+    current = client.get("/api/scan/job/status", params={"view": "compact", "since": delta["version"]}).json()
+    assert current["servers"] == {}
+
+
+def test_unknown_job_is_404(client, service):
+    assert client.get("/api/scan/missing/status").status_code == 404
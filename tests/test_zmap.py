@@ -0,0 +1,43 @@
+"""ZMap connect-scan fallback."""
+
+import pytest
+
+from app.scanner import zmap
+from app.scanner.cancel import CancelToken
+from app.scanner.tools import ToolInfo
+
+
+@pytest.fixture
+def fallback(monkeypatch):
+    """No ZMap; probe() batches are recorded and every even host is open."""
+    batches = []
+
+    def probe(targets, rate=None):
+        batches.append(targets)
+        return {t: "open" if int(t[0].rsplit(".", 1)[1]) % 2 == 0 else "filtered" for t in targets}
+
+    monkeypatch.setattr(zmap.tool_registry, "get", lambda name: ToolInfo(name, message="ZMap not installed"))
+    monkeypatch.setattr(zmap, "probe", probe)
+    monkeypatch.setattr(zmap, "ZMAP_FALLBACK_RATE", 100)
+    return batches
+
+
+def test_connect_scan_probes_in_batches(fallback):
+    r = zmap.run_zmap("10.0.0.0/24", ports="22,80")
+    assert r["method"] == "connect"
+    assert r["counts"] == {"22": 127, "80": 127}
+    assert [len(b) for b in fallback] == [100] * 5 + [8]
+
+
+def test_cancelled_connect_scan_stops_between_batches(fallback, monkeypatch):
+    token = CancelToken()
+
+    def probe_then_cancel(targets, rate=None):
+        token.cancel("Cancelled by user")
+        return {t: "open" for t in targets}
+
+    monkeypatch.setattr(zmap, "probe", probe_then_cancel)
+    r = zmap.run_zmap("10.0.0.0/24", ports="22,80", cancel=token)
+    assert r["status"] == "cancelled"
+    assert r["message"] == "Cancelled by user"
+    assert r["counts"] == {"22": 100, "80": 0}